@@ -1,32 +1,36 @@
 from flask import Flask, jsonify, request, send_file
 from user.index import validate_username_exists, user_register, user_login, get_all_user, get_user_by_name, change_user_status, delete_user, edit_user, reset_password
-from connect.detect.detect_trans import process_degradation_list
+from connect.detect.detect_trans import process_degradation_list, process_string_details, STRING_DETAIL_FIELDS, MAX_DETAIL_STRINGS
 from connect.detect.get_history_data import get_power_loss_data
 
-from connect.overview.index import get_overview_data,get_overview_station_map_latest,get_overview_station_info,get_json_file_state, get_overview_station_map
+from connect.overview.index import get_overview_data,get_overview_station_map_latest,get_overview_station_info,get_json_file_state, get_overview_station_map, get_overview_station_map_geometry, get_overview_station_map_properties
 from connect.merge.index import get_merge_results, get_merge_map, get_merge_image, save_merge_data
 # from process.merge.index import mc_pdf2jpg, get_mc_image_path, get_merged_image_path, get_merged_label_path, get_mc_geo_data_path, process_mc_image, seg_predict_merge,split_plot
 # from process.merge.fusion import data_fusion
 from process.impute.index import get_station_info_orm, get_station_chart_orm, get_station_origin_data_orm_optimized
 from connect.impute.index import save_imputed_result_orm
-from process.impute.model import impute, repair
 from process.plan.index import get_plan_data, export_report, export_maintain_report_only, export_runtime_report_only, STATION_NAME_MAPPING, CENTER_TO_STATION, CENTER_NAME_MAPPING
-from process.index import run_process_schedule # run_process_schedule 为定时函数,run_process_manual 为手动执行函数
 from apscheduler.schedulers.background import BackgroundScheduler
+from process.runner import run_pipeline_once, run_queued_requests
+from process.pipeline import STATION_STAGES
+from schema.ledger import list_stage_records, enqueue_pipeline_request, list_pipeline_requests
+from schema.results_cache import get_string_result, results_cache_stats
+from process.metrics import read_metrics, summarize_metrics
 from datetime import datetime
 import pytz
 import os
-import json
 from dotenv import load_dotenv
-from schema.models import create_station_models, create_impute_model, create_user_model,  create_power_models
+from schema.registry import StationModelRegistry, get_station_models, get_impute_model, get_power_models, get_user_model
 from schema.session import DatabaseManager
 import zipfile
 import io
 import logging
 import base64
 from flask_cors import CORS # 导入 Flask-CORS
+from connect.response import init_response_encoding, array_response
 
 app = Flask(__name__)
+init_response_encoding(app) # orjson 编码、gzip/br 压缩
 
 CORS(app, resources={r"/*": {"origins": "https://dt-frontend-two.vercel.app"}})
 
@@ -74,28 +78,31 @@ global_schedule_time = os.getenv('SCHEDULE_TIME', '1,0').strip().split(',') # 
 global_api_username = os.getenv('API_USERNAME', 'dtzhejiang').strip()
 global_api_password = os.getenv('API_PASSWORD', 'zkYs!23').strip()
 
-# 动态创建表
-global_station_models = {station_name: create_station_models(station_name) for station_name in global_station_list} # 各场站的数据表模型
-global_impute_models = {station_name: create_impute_model(station_name) for station_name in global_station_list} # 各场站的impute对应的表模型
-global_user_model = create_user_model() # 用户表模型
+# 动态创建表（懒加载：第一次访问某个场站时才创建该场站的表模型）
+global_station_models = StationModelRegistry(get_station_models, global_station_list) # 各场站的数据表模型
+global_impute_models = StationModelRegistry(get_impute_model, global_station_list) # 各场站的impute对应的表模型
+global_user_model = get_user_model() # 用户表模型
 # 创建功率损失和预测表模型
-global_power_models = {station_name: create_power_models(station_name) for station_name in global_station_list} # 各场站的功率损失和预测表模型
+global_power_models = StationModelRegistry(get_power_models, global_station_list) # 各场站的功率损失和预测表模型
 
 logger.info("当前运行模式：{} 数据库类型：{} 项目根目录：{} 场站列表：{}".format(env_name, os.getenv('DB_TYPE', 'sqlite').strip().lower(), global_repo_abs_path, global_station_list))
 
-# 定义定时任务
+# 定义定时任务（获得流水线全局锁后执行，锁被占用时跳过）
 def scheduled_task(kairosdb_url, repo_abs_path):
     try:
         logger.info(f"\t定时器函数于 {datetime.now(pytz.timezone('Asia/Shanghai'))} 开始执行，正在创建前一天的数据...")
-        run_process_schedule(kairosdb_url, repo_abs_path, global_time_window, global_database_manager, global_station_models, global_impute_models, global_station_list, global_api_username, global_api_password)
-        logger.info(f"\t定时器函数于 {datetime.now(pytz.timezone('Asia/Shanghai'))} 执行完成！")
+        if run_pipeline_once(kairosdb_url, repo_abs_path, global_time_window, global_database_manager, global_station_models, global_impute_models, global_station_list, global_api_username, global_api_password):
+            logger.info(f"\t定时器函数于 {datetime.now(pytz.timezone('Asia/Shanghai'))} 执行完成！")
     except Exception as e:
         logger.error(f"Error in scheduled_task: {e}")
 
-# 创建调度器
-scheduler = BackgroundScheduler()
-scheduler.add_job(func=scheduled_task, trigger='cron', hour=int(global_schedule_time[0]), minute=int(global_schedule_time[1]), timezone=pytz.timezone('Asia/Shanghai'), args=[global_kairosdb_url, global_repo_abs_path])
-scheduler.start()
+# 执行 /api/admin/pipeline/run 写入的排队请求（仅 python app.py 单进程运行时使用，gunicorn 部署时由 process.runner 执行）
+def queued_task(kairosdb_url, repo_abs_path):
+    try:
+        run_queued_requests(kairosdb_url, repo_abs_path, global_time_window, global_database_manager, global_station_models, global_impute_models,
+                            global_api_username, global_api_password)
+    except Exception as e:
+        logger.error(f"Error in queued_task: {e}")
 
 # 定义不需要验证token的路径
 EXCLUDE_PATHS = [
@@ -103,6 +110,8 @@ EXCLUDE_PATHS = [
     '/api/user/register',
     '/api/user/validate_name',
 ]
+# 仅管理员（token 中 user_type 为 admin）可访问的路径前缀
+ADMIN_PATH_PREFIX = '/api/admin/'
 
 # 创建一个全局的装饰器，应用到所有路由
 @app.before_request
@@ -130,9 +139,24 @@ def before_request():
     except Exception as e:
         return jsonify({'message': '无效的token'}), 401
 
+    if request.path.startswith(ADMIN_PATH_PREFIX) and request.user.get('user_type') != 'admin':
+        return jsonify({'message': '需要管理员权限'}), 403
+
 
 ###注意！需前端传入场站名字、时间（精确到日期）
 #============impute api start==============
+# 单次请求的设备数上限（device_ids 参数）
+MAX_QUERY_DEVICES = 200
+
+def get_device_param():
+    """
+    读取设备参数：device_ids=a,b,c 时返回列表（多个组串一次查询，返回列式结构），否则返回 device_id
+    """
+    device_ids = request.args.get('device_ids')
+    if device_ids:
+        return [device.strip() for device in device_ids.split(',') if device.strip()]
+    return request.args.get('device_id')
+
 @app.route('/api/station/detail')
 def station_detail():
     station_name = request.args.get('station_name')
@@ -152,7 +176,9 @@ def station_data():
     start_time = request.args.get('start_time')
     end_time = request.args.get('end_time')
     variable = request.args.get('variable')
-    device_id = request.args.get('device_id')
+    device_id = get_device_param()
+    if isinstance(device_id, list) and len(device_id) > MAX_QUERY_DEVICES:
+        return jsonify({'error': f'单次最多查询 {MAX_QUERY_DEVICES} 个设备'}), 400
     # 获取对应场站的表模型
     station_model = global_station_models.get(station_name)
     impute_model = global_impute_models.get(station_name)
@@ -166,12 +192,14 @@ def station_chart():
     station_name = request.args.get('station_name')
     start_time = request.args.get('start_time')
     variable = request.args.get('variable')
-    device_id = request.args.get('device_id')
+    device_id = get_device_param()
+    if isinstance(device_id, list) and len(device_id) > MAX_QUERY_DEVICES:
+        return jsonify({'error': f'单次最多查询 {MAX_QUERY_DEVICES} 个设备'}), 400
     # 获取对应场站的表模型
     station_model = global_station_models.get(station_name)
     # 调用 ORM 函数，传递数据库管理器和模型
     res = get_station_chart_orm(station_name, device_id, start_time, variable, global_repo_abs_path, global_database_manager, station_model)
-    return res
+    return array_response(res)
 
 
 @app.route('/api/station/impute')
@@ -183,7 +211,8 @@ def station_model_impute():
 
     # 获取对应场站的表模型
     station_model = global_station_models.get(station_name)
-    # 调用 impute 函数，传递数据库管理器和模型
+    # 调用 impute 函数，传递数据库管理器和模型（pypots 在第一次调用时才导入）
+    from process.impute.model import impute
     res = impute(station_name, device_id, start_time, variable, global_repo_abs_path, global_database_manager, station_model)
     return res
 
@@ -213,7 +242,8 @@ def station_model_repair():
 
     # 获取对应场站的表模型
     station_model = global_station_models.get(station_name)
-    # 调用 impute 函数，传递数据库管理器和模型
+    # 调用 impute 函数，传递数据库管理器和模型（pypots 在第一次调用时才导入）
+    from process.impute.model import repair
     res = repair(station_name, device_id, start_time, variable, global_repo_abs_path, global_database_manager, station_model)
     return res
 # #============repair api end================
@@ -461,8 +491,38 @@ def api_save_merge_data():
 def get_file_name_list():
     date = request.args.get('date')
     station_name = request.args.get('station_name')
-    data = process_degradation_list(date, station_name, global_repo_abs_path)
-    return jsonify(data), 200
+    # compact=1 时组串节点只含编号和标量得分，曲线和诊断结果通过 get-string-details 按需获取
+    compact = request.args.get('compact', '0') in ('1', 'true')
+    data = process_degradation_list(date, station_name, global_repo_abs_path, compact=compact)
+    return array_response(data)
+
+
+@app.route('/api/detect/get-string-details', methods=['POST'])
+def get_string_details():
+    """
+    批量获取组串明细接口
+    
+    请求体:
+    - station_name: 场站名称
+    - date: 日期，格式为 'YYYY-MM-DD'
+    - strings: 组串标识列表，如 ['BT001-I001-PV1', ...]
+    - fields: 可选，需要的字段，可选 historyIntensity、diagnosisResults、anomalyDates
+    
+    返回:
+    - {组串标识: {字段: 值}}，不存在的组串不返回
+    """
+    data = request.get_json() or {}
+    select_strings = data.get('strings') or []
+    fields = data.get('fields')
+    if not isinstance(select_strings, list) or not select_strings:
+        return jsonify({'error': 'strings 不能为空'}), 400
+    if len(select_strings) > MAX_DETAIL_STRINGS:
+        return jsonify({'error': f'单次最多请求 {MAX_DETAIL_STRINGS} 个组串'}), 400
+    unknown = [field for field in fields or [] if field not in STRING_DETAIL_FIELDS]
+    if unknown:
+        return jsonify({'error': f'未知字段: {unknown}'}), 400
+    result = process_string_details(data.get('date'), data.get('station_name'), select_strings, global_repo_abs_path, fields)
+    return array_response(result)
 
 
 @app.route('/api/detect/get-power-loss', methods=['GET'])
@@ -474,6 +534,7 @@ def get_power_loss():
     - station_name: 场站名称
     - selectString: 组串标识，如 'BT001-I001-PV1'
     - date: 日期，格式为 'YYYY-MM-DD'
+    - format: 可选，f32 时数值数组以 float32 二进制返回（见 connect/response.py）
     
     返回:
     - history_loss: 历史30天的功率损失数据数组
@@ -491,7 +552,7 @@ def get_power_loss():
     power_models = global_power_models.get(station_name)
     
     result = get_power_loss_data(station_name, select_string, date, global_repo_abs_path, global_database_manager, station_model, power_models)
-    return jsonify(result), 200
+    return array_response(result)
 
 @app.route('/api/detect/get-string-diagnosis', methods=['GET'])
 def get_string_diagnosis():
@@ -523,20 +584,12 @@ def get_string_diagnosis():
         # 构造查询键
         string_key = f"{box_id.zfill(3)}-{inverter_id.zfill(3)}-{string_id.zfill(3)}"
         
-        # 尝试从results JSON文件获取数据
-        results_file_path = os.path.join(global_repo_abs_path, 'data', station_name, 'results', f"{date}.json")
-        if os.path.exists(results_file_path):
-            with open(results_file_path, 'r', encoding='utf-8') as f:
-                results_data = json.load(f)
-            
-            # 尝试获取诊断结果
-            results = results_data.get('results', {})
-            if string_key in results and 'diagnosis_results' in results[string_key]:
-                diagnosis_results = results[string_key]['diagnosis_results']
-                # 转换为百分比格式
-                for item in diagnosis_results:
-                    item['rate'] = round(item['rate'] * 100)
-                return jsonify({'diagnosis_results': diagnosis_results}), 200
+        # 尝试从结果库获取该组串的诊断结果
+        string_result = get_string_result(global_repo_abs_path, station_name, date, string_key)
+        if string_result and 'diagnosis_results' in string_result:
+            # 转换为百分比格式（缓存中的结果只读，复制后再修改）
+            diagnosis_results = [dict(item, rate=round(item['rate'] * 100)) for item in string_result['diagnosis_results']]
+            return jsonify({'diagnosis_results': diagnosis_results}), 200
         
         # 如果没有找到数据，返回默认诊断结果
         default_results = [
@@ -725,6 +778,19 @@ def api_get_overview_station_map():
     # return get_overview_station_map(station_name, process_date, global_repo_abs_path, global_time_window)
     return get_overview_station_map_latest(station_name, process_date, global_repo_abs_path)
 
+@app.route('/api/overview/station-map/geometry', methods=['GET'])  # 场站地图几何形状，带 version 请求时浏览器长期缓存
+def api_get_overview_station_map_geometry():
+    station_name = request.args.get('station_name')
+    version = request.args.get('version')
+    return get_overview_station_map_geometry(station_name, global_repo_abs_path, version)
+
+@app.route('/api/overview/station-map/properties', methods=['GET'])  # 场站地图当天颜色属性，带 since 时只返回变化的属性
+def api_get_overview_station_map_properties():
+    station_name = request.args.get('station_name')
+    process_date = request.args.get('process_date')
+    since = request.args.get('since')
+    return get_overview_station_map_properties(station_name, process_date, global_repo_abs_path, since)
+
 @app.route('/api/overview/station-info', methods=['GET'])  # 场站概览界面左侧geojson地图数据的读取
 def api_get_overview_station_info():
     station_name = request.args.get('station_name')
@@ -867,7 +933,79 @@ def resetPassword():
 
 #============main api end==============
 
+#============admin api start==============
+@app.route('/api/admin/db-pool', methods=['GET'])
+def api_db_pool_stats():
+    return jsonify({
+        'db_type': global_database_manager.db_type,
+        'pools': global_database_manager.get_pool_stats()
+    }), 200
+
+@app.route('/api/admin/results-cache', methods=['GET'])
+def api_results_cache_stats():
+    return jsonify(results_cache_stats()), 200
+
+@app.route('/api/admin/pipeline/run', methods=['POST'])
+def api_pipeline_run():
+    """
+    手动触发流水线：指定日期，可选场站与阶段子集，默认续跑（跳过已成功且输入未变化的阶段）；
+    请求写入 PipelineRequest 表后立即返回 202，执行状态见 /api/admin/pipeline/requests
+    """
+    data = request.get_json() or {}
+    process_date = data.get('process_date')
+    station_list = data.get('station_list') or global_station_list
+    stages = data.get('stages') or None
+    resume = bool(data.get('resume', True))
+
+    try:
+        datetime.strptime(process_date or '', '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'message': 'process_date 格式应为 YYYY-MM-DD'}), 400
+    unknown_stations = [name for name in station_list if name not in global_station_list]
+    unknown_stages = [stage for stage in (stages or []) if stage not in STATION_STAGES]
+    if unknown_stations or unknown_stages:
+        return jsonify({'message': '未知的场站或阶段', 'stations': unknown_stations, 'stages': unknown_stages}), 400
+
+    # 只写入请求，由流水线进程（process.runner）领取执行，Web worker 不运行流水线
+    queued = enqueue_pipeline_request(global_database_manager, process_date, station_list, stages, resume,
+                                      requested_by=request.user.get('username'))
+    return jsonify({'message': '已加入执行队列', 'request_id': queued['id'], 'process_date': process_date, 'station_list': station_list,
+                    'stages': stages or list(STATION_STAGES), 'resume': resume}), 202
+
+
+@app.route('/api/admin/pipeline/requests', methods=['GET'])
+def api_pipeline_requests():
+    return jsonify({'requests': list_pipeline_requests(global_database_manager, request.args.get('status'))}), 200
+
+
+@app.route('/api/admin/pipeline/runs', methods=['GET'])
+def api_pipeline_runs():
+    process_date = request.args.get('process_date')
+    station_name = request.args.get('station_name')
+    return jsonify({'runs': list_stage_records(global_database_manager, process_date, station_name)}), 200
+
+
+@app.route('/api/admin/pipeline-metrics', methods=['GET'])
+def api_pipeline_metrics():
+    """
+    流水线埋点：date 为运行日期（默认今天），可按 station / stage / span 过滤；detail=1 时返回原始记录
+    """
+    date_str = request.args.get('date')
+    records = read_metrics(global_repo_abs_path, date_str, request.args.get('station'), request.args.get('stage'), request.args.get('span'))
+    result = {'count': len(records), 'summary': summarize_metrics(records)}
+    if request.args.get('detail') == '1':
+        result['records'] = records
+    return jsonify(result), 200
+#============admin api end==============
+
 
 
 if __name__ == '__main__':
+    # 仅在 python app.py 单进程运行时由 Web 进程启动定时器；
+    # gunicorn 部署时 Web worker 不启动定时器，由 python -m process.runner 单独运行
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(func=scheduled_task, trigger='cron', hour=int(global_schedule_time[0]), minute=int(global_schedule_time[1]), timezone=pytz.timezone('Asia/Shanghai'), args=[global_kairosdb_url, global_repo_abs_path])
+    scheduler.add_job(func=queued_task, trigger='interval', seconds=int(os.getenv('PIPELINE_REQUEST_POLL_SECONDS', '30').strip()),
+                      max_instances=1, coalesce=True, args=[global_kairosdb_url, global_repo_abs_path])
+    scheduler.start()
     app.run(host='0.0.0.0', port=1022, debug=False)
@@ -1,22 +1,42 @@
-import os
-import json
-def _get_result_file_path(date, station_name, repo_abs_path):
+from functools import partial
+from schema.results_cache import get_results, get_results_index, pid_index
+
+# 组串明细接口可返回的字段：前端字段名 -> 结果字段名
+STRING_DETAIL_FIELDS = {
+    'historyIntensity': 'history_intensity',
+    'diagnosisResults': 'diagnosis_results',
+    'anomalyDates': 'anomaly_dates',
+}
+# 组串明细接口单次请求的组串数上限
+MAX_DETAIL_STRINGS = 500
+
+def _load_results(date, station_name, repo_abs_path):
     """
-    构建结果文件的完整路径
+    读取某天的结果（与原 JSON 文件结构相同），命中缓存时不再查询
     
     Args:
         date (str): 日期，格式为 "YYYY-MM-DD"
         station_name (str): 电站名称
         
     Returns:
-        str: JSON文件的完整路径
+        dict: {'date': ..., 'results': {...}}（只读），结果不存在时抛出 FileNotFoundError
     """
-    results_path = os.path.join(repo_abs_path, 'data', station_name, 'results', f"{date}.json")
-    return results_path
+    results_data = get_results(repo_abs_path, station_name, date)
+    if results_data is None:
+        raise FileNotFoundError(f"{station_name} {date} results")
+    return results_data
+
+def _find_string(date, station_name, selectString, repo_abs_path):
+    """
+    按前端组串编号 BTxxx-Ixxx-PVx 查找组串结果，不存在时返回 None
+    """
+    results = _load_results(date, station_name, repo_abs_path)['results']
+    device_id = get_results_index(repo_abs_path, station_name, date, 'pid', pid_index).get(selectString)
+    return results.get(device_id) if device_id else None
 
 def process_anomaly_history(date, station_name, selectString, repo_abs_path):
     """
-    从日期对应的 JSON 文件中读取异常日期数据
+    从日期对应的结果中读取异常日期数据
     
     Args:
         date (str): 日期，格式为 "YYYY-MM-DD"
@@ -25,21 +45,11 @@ def process_anomaly_history(date, station_name, selectString, repo_abs_path):
     Returns:
         dict: 格式为 {"BTxxx-Ixxx-PVx": [0,1,0,...]} 的字典，其中数组表示每天是否异常
     """
-    file_path = _get_result_file_path(date, station_name, repo_abs_path)
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            results_data = json.load(f)
         anomaly_dates = {}
-        results = results_data.get('results', {})
-        for device_id, device_data in results.items():
-            dates = device_data.get('anomaly_dates', [])
-            box_id = device_id.split('-')[0]
-            inverter_id = device_id.split('-')[1]
-            string_id = str(int(device_id.split('-')[2]))  # 转为整数再转回字符串，去掉前导零
-            pid = f"BT{box_id}-I{inverter_id}-PV{string_id}"
-            if pid != selectString:
-                continue
-            anomaly_dates[pid] = dates
+        device_data = _find_string(date, station_name, selectString, repo_abs_path)
+        if device_data is not None:
+            anomaly_dates[selectString] = device_data.get('anomaly_dates', [])
         return anomaly_dates
     except FileNotFoundError:
         return {}
@@ -49,7 +59,7 @@ def process_anomaly_history(date, station_name, selectString, repo_abs_path):
 
 def process_rdc_positions(date, station_name, selectString, repo_abs_path):
     """
-    从指定日期的JSON文件中读取30天的降维坐标数据
+    从指定日期的结果中读取30天的降维坐标数据
     
     Args:
         date (str): 日期，格式为 "YYYY-MM-DD"
@@ -64,140 +74,170 @@ def process_rdc_positions(date, station_name, selectString, repo_abs_path):
             }
         }
     """
-    file_path = _get_result_file_path(date, station_name, repo_abs_path)
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            results_data = json.load(f)
         rdc_positions = {}
-        results = results_data.get('results', {})
-        for device_id, device_data in results.items():
-            if device_data.get('anomaly_identifier') != 'normal':
-                continue
-            positions = device_data.get('rdc_posistion', [])
-            if not isinstance(positions, list):
-                continue
-            
-            # 转换设备ID
-            box_id = device_id.split('-')[0]
-            inverter_id = device_id.split('-')[1]
-            string_id = str(int(device_id.split('-')[2]))
-            pid = f"BT{box_id}-I{inverter_id}-PV{string_id}"
-            if pid != selectString:
-                continue
-            
-            # 初始化设备数据结构
-            rdc_positions[pid] = {
-                "x": [],
-                "y": []
-            }
-            
-            # 分离x和y坐标
-            for pos in positions:
-                if len(pos) == 2:
-                    rdc_positions[pid]["x"].append(pos[0])
-                    rdc_positions[pid]["y"].append(pos[1])
+        device_data = _find_string(date, station_name, selectString, repo_abs_path)
+        if device_data is None or device_data.get('anomaly_identifier') != 'normal':
+            return rdc_positions
+        positions = device_data.get('rdc_posistion', [])
+        if not isinstance(positions, list):
+            return rdc_positions
+        
+        # 初始化设备数据结构
+        rdc_positions[selectString] = {
+            "x": [],
+            "y": []
+        }
+        
+        # 分离x和y坐标
+        for pos in positions:
+            if len(pos) == 2:
+                rdc_positions[selectString]["x"].append(pos[0])
+                rdc_positions[selectString]["y"].append(pos[1])
         
         return rdc_positions
         
     except FileNotFoundError:
-        print(f"File not found: {file_path}")
+        print(f"Results not found: {station_name} {date}")
         return {}
     except Exception as e:
         print(f"Error processing RDC positions: {str(e)}")
         return {}
 
-def process_degradation_list(date, station_name, repo_abs_path):
+def _degradation_tree(data, compact=False):
     """
-    从日期对应的 JSON 文件中读取数据并转换为树状结构
+    将一天的结果转换为 汇流箱 / 逆变器 / 组串 三级树状结构，结果版本不变时由缓存复用
+
+    Args:
+        compact: 精简模式，组串节点只保留编号和标量得分，不含电流曲线和诊断结果
+    """
+    # 创建根节点
+    tree = {
+        "name": "datu",
+        "level": 1,
+        "key": "DTZJJK,CDTGF,Q1",
+        "degradeRate": "",
+        "anomalyValue": "",
+        "children": []
+    }
+    
+    # 用于临时存储不同层级的节点
+    box_nodes = {}
+    inverter_nodes = {}
+    
+    # 处理每个设备的数据
+    results = data.get('results', {})
+    for device_id, device_data in results.items():
+        box_id, inverter_id, string_id = device_id.split('-')
+        
+        degrade_rate = device_data.get('degradation_score', 0)
+
+        
+        # 获取异常标识符
+        anomaly_identifier = device_data.get('anomaly_identifier', 'normal')
+        if anomaly_identifier == 'zero' or degrade_rate == 'N/A':
+            degrade_rate = ''
+        # 处理汇流箱层级 - 使用三位数格式
+        box_key = f"DTZJJK,CDTGF,Q1,BT{box_id.zfill(3)}"
+        if box_key not in box_nodes:
+            box_node = {
+                "name": f"{box_id.zfill(3)}号箱变器",
+                "level": 2,
+                "key": box_key,
+                "degradeRate": "",
+                "anomalyValue": "",
+                "children": []
+            }
+            box_nodes[box_key] = box_node
+            tree["children"].append(box_node)
+        
+        # 处理逆变器层级 - 使用三位数格式
+        inverter_key = f"{box_key},I{inverter_id.zfill(3)}"
+        if inverter_key not in inverter_nodes:
+            inverter_node = {
+                "name": f"{inverter_id.zfill(3)}号逆变器",
+                "level": 3,
+                "key": inverter_key,
+                "degradeRate": "",
+                "anomalyValue": "",
+                "children": []
+            }
+            inverter_nodes[inverter_key] = inverter_node
+            box_nodes[box_key]["children"].append(inverter_node)
+        
+        # 处理组串层级 - string_id 不需要补齐
+        string_id_no_zeros = str(int(string_id))
+        anomaly_value = "零电流" if anomaly_identifier == "zero" else "单口接两串" if anomaly_identifier == "double" else device_data.get('anomaly_score', 0)
+        string_node = {
+            "name": f"{string_id_no_zeros.zfill(3)}号组串电流",
+            "level": 4,
+            "key": f"{inverter_key},PVINV_DCI{string_id_no_zeros}",
+            "degradeRate": degrade_rate,
+            "anomalyValue": anomaly_value,
+            "anomalyIdentifier": anomaly_identifier,
+        }
+        if not compact:
+            string_node["diagnosisResults"] = device_data.get('diagnosis_results', [])
+            string_node["historyIntensity"] = device_data.get('history_intensity', [])
+        inverter_nodes[inverter_key]["children"].append(string_node)
+    
+    return tree
+
+def process_degradation_list(date, station_name, repo_abs_path, compact=False):
+    """
+    从日期对应的结果中读取数据并转换为树状结构
     
     Args:
         date (str): 日期，格式为 "YYYY-MM-DD"
         station_name (str): 电站名称
+        compact (bool): 精简模式，组串只返回编号和标量得分，曲线等明细通过 process_string_details 按需获取
         
     Returns:
         dict: 树状结构数据
     """
-    file_path = _get_result_file_path(date, station_name, repo_abs_path)
-    
     try:
-        # 读取JSON文件
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        # 创建根节点
-        tree = {
-            "name": "datu",
-            "level": 1,
-            "key": "DTZJJK,CDTGF,Q1",
-            "degradeRate": "",
-            "anomalyValue": "",
-            "children": []
-        }
-        
-        # 用于临时存储不同层级的节点
-        box_nodes = {}
-        inverter_nodes = {}
-        
-        # 处理每个设备的数据
-        results = data.get('results', {})
-        for device_id, device_data in results.items():
-            box_id, inverter_id, string_id = device_id.split('-')
-            
-            degrade_rate = device_data.get('degradation_score', 0)
-
-            
-            # 获取异常标识符
-            anomaly_identifier = device_data.get('anomaly_identifier', 'normal')
-            if anomaly_identifier == 'zero' or degrade_rate == 'N/A':
-                degrade_rate = ''
-            # 处理汇流箱层级 - 使用三位数格式
-            box_key = f"DTZJJK,CDTGF,Q1,BT{box_id.zfill(3)}"
-            if box_key not in box_nodes:
-                box_node = {
-                    "name": f"{box_id.zfill(3)}号箱变器",
-                    "level": 2,
-                    "key": box_key,
-                    "degradeRate": "",
-                    "anomalyValue": "",
-                    "children": []
-                }
-                box_nodes[box_key] = box_node
-                tree["children"].append(box_node)
-            
-            # 处理逆变器层级 - 使用三位数格式
-            inverter_key = f"{box_key},I{inverter_id.zfill(3)}"
-            if inverter_key not in inverter_nodes:
-                inverter_node = {
-                    "name": f"{inverter_id.zfill(3)}号逆变器",
-                    "level": 3,
-                    "key": inverter_key,
-                    "degradeRate": "",
-                    "anomalyValue": "",
-                    "children": []
-                }
-                inverter_nodes[inverter_key] = inverter_node
-                box_nodes[box_key]["children"].append(inverter_node)
-            
-            # 处理组串层级 - string_id 不需要补齐
-            string_id_no_zeros = str(int(string_id))
-            anomaly_value = "零电流" if anomaly_identifier == "zero" else "单口接两串" if anomaly_identifier == "double" else device_data.get('anomaly_score', 0)
-            string_node = {
-                "name": f"{string_id_no_zeros.zfill(3)}号组串电流",
-                "level": 4,
-                "key": f"{inverter_key},PVINV_DCI{string_id_no_zeros}",
-                "degradeRate": degrade_rate,
-                "anomalyValue": anomaly_value,
-                "anomalyIdentifier": anomaly_identifier,
-                "diagnosisResults": device_data.get('diagnosis_results', []),
-                "historyIntensity": device_data.get('history_intensity', []),
-            }
-            inverter_nodes[inverter_key]["children"].append(string_node)
-        
+        # 树结构由当天结果派生，结果未变化时直接复用
+        name = 'degradation_tree_compact' if compact else 'degradation_tree'
+        tree = get_results_index(repo_abs_path, station_name, date, name, partial(_degradation_tree, compact=compact))
+        if tree is None:
+            raise FileNotFoundError(f"{station_name} {date} results")
         return tree
         
     except FileNotFoundError:
-        print(f"File not found: {file_path}")
+        print(f"Results not found: {station_name} {date}")
         return {}
     except Exception as e:
         print(f"Error processing degradation list: {str(e)}")
         return {}
+
+def process_string_details(date, station_name, select_strings, repo_abs_path, fields=None):
+    """
+    批量读取组串明细（电流曲线、诊断结果等），配合精简模式的树状结构按需加载
+    
+    Args:
+        date (str): 日期，格式为 "YYYY-MM-DD"
+        station_name (str): 电站名称
+        select_strings (list): 组串编号列表，如 ["BT001-I001-PV1", ...]
+        fields (list, optional): 需要的字段，取值见 STRING_DETAIL_FIELDS，默认 historyIntensity 和 diagnosisResults
+        
+    Returns:
+        dict: 格式为 {"BTxxx-Ixxx-PVx": {"historyIntensity": [...], "diagnosisResults": [...]}}，不存在的组串不返回
+    """
+    fields = fields or ['historyIntensity', 'diagnosisResults']
+    try:
+        results = _load_results(date, station_name, repo_abs_path)['results']
+        index = get_results_index(repo_abs_path, station_name, date, 'pid', pid_index)
+        details = {}
+        for select_string in select_strings:
+            device_id = index.get(select_string)
+            device_data = results.get(device_id) if device_id else None
+            if device_data is None:
+                continue
+            details[select_string] = {field: device_data.get(STRING_DETAIL_FIELDS[field], []) for field in fields}
+        return details
+    except FileNotFoundError:
+        print(f"Results not found: {station_name} {date}")
+        return {}
+    except Exception as e:
+        print(f"Error processing string details: {str(e)}")
+        return {}
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 import os
 import json
+from schema.results_cache import get_string_result
 
 
 def get_power_loss_data(station_name, select_string, date, repo_abs_path, database_manager=None, station_model=None, power_models=None):
@@ -29,45 +30,40 @@ def get_power_loss_data(station_name, select_string, date, repo_abs_path, databa
         inverter_id = parts[1][1:]  # 去掉 'I' 前缀
         string_id = parts[2][2:]  # 去掉 'PV' 前缀
         
-        # 尝试从results JSON文件获取数据
-        results_file_path = os.path.join(repo_abs_path, 'data', station_name, 'results', f"{date}.json")
-        if os.path.exists(results_file_path):
-            try:
-                with open(results_file_path, 'r', encoding='utf-8') as f:
-                    results_data = json.load(f)
+        # 尝试从结果库获取数据
+        string_key = f"{box_id.zfill(3)}-{inverter_id.zfill(3)}-{string_id.zfill(3)}"
+        try:
+            # 读取该组串的结果（格式如 "001-001-001"）
+            string_result = get_string_result(repo_abs_path, station_name, date, string_key)
+            
+            if string_result is not None:
+                history_loss = string_result.get('history_loss', [])
+                future_loss = string_result.get('future_loss', [])
                 
-                # 尝试直接从results对象获取数据（格式如 "001-001-001"）
-                results = results_data.get('results', {})
-                string_key = f"{box_id.zfill(3)}-{inverter_id.zfill(3)}-{string_id.zfill(3)}"
+                # 生成日期范围
+                end_datetime = datetime.strptime(date, '%Y-%m-%d')
+                start_datetime = end_datetime - timedelta(days=30)
                 
-                if string_key in results:
-                    history_loss = results[string_key].get('history_loss', [])
-                    future_loss = results[string_key].get('future_loss', [])
-                    
-                    # 生成日期范围
-                    end_datetime = datetime.strptime(date, '%Y-%m-%d')
-                    start_datetime = end_datetime - timedelta(days=30)
-                    
-                    history_dates = []
-                    current_date = start_datetime
-                    while current_date <= end_datetime:
-                        history_dates.append(current_date.strftime('%m-%d'))
-                        current_date += timedelta(days=1)
-                    
-                    future_dates = []
-                    current_date = end_datetime + timedelta(days=1)
-                    for _ in range(7):
-                        future_dates.append(current_date.strftime('%m-%d'))
-                        current_date += timedelta(days=1)
-                    
-                    return {
-                        'history_loss': history_loss,
-                        'future_loss': future_loss,
-                        'history_dates': history_dates,
-                        'future_dates': future_dates
-                    }
-            except Exception as e:
-                print(f"Error parsing results JSON file: {str(e)}")
+                history_dates = []
+                current_date = start_datetime
+                while current_date <= end_datetime:
+                    history_dates.append(current_date.strftime('%m-%d'))
+                    current_date += timedelta(days=1)
+                
+                future_dates = []
+                current_date = end_datetime + timedelta(days=1)
+                for _ in range(7):
+                    future_dates.append(current_date.strftime('%m-%d'))
+                    current_date += timedelta(days=1)
+                
+                return {
+                    'history_loss': history_loss,
+                    'future_loss': future_loss,
+                    'history_dates': history_dates,
+                    'future_dates': future_dates
+                }
+        except Exception as e:
+            print(f"Error reading results store: {str(e)}")
 
         # 解析日期
         end_datetime = datetime.strptime(date, '%Y-%m-%d')
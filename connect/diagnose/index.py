@@ -2,7 +2,9 @@ import json
 import os
 import re
 import time
-import sqlite3
+from schema.sqlite import sqlite_connect
+from schema.results_store import latest_results_date
+from schema.results_cache import get_results
 from datetime import datetime, timedelta 
 def get_station_diagnosis(station_name,date,sample_factor, sample_size):
     print(station_name,date,sample_factor, sample_size)
@@ -17,6 +19,15 @@ def get_station_diagnosis(station_name,date,sample_factor, sample_size):
 
 def get_json(station_name, date,folder_option):
     results_json={}
+    if folder_option == 'results':
+        # 组串结果在结果库中，取不晚于 date 的最近一天
+        found_date = latest_results_date('.', station_name, date)
+        if found_date is None:
+            print(f"'{date}' {folder_option} does not exist.")
+            return
+        if found_date != date:
+            print(f"before target_date found {found_date}.")
+        return get_results('.', station_name, found_date)
     station_results_folder ='./data/'+station_name+'/'+folder_option+'/'
     # print(station_results_folder)
     if not os.path.exists(station_results_folder):
@@ -237,7 +248,7 @@ def get_string_data_fromdb(station_name, date, box_id, inverter_id, string_id):
     end_date = int(time.mktime(end_time.timetuple()))
 
     # 连接到数据库
-    conn = sqlite3.connect('./database/datang.db')
+    conn = sqlite_connect('./database/datang.db')
     cursor = conn.cursor()
 
     # 查询相同 box_id 和 inverter_id 下所有 string_id 的数据
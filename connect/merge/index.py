@@ -1,6 +1,7 @@
 import json
 from flask import jsonify, send_from_directory, abort
 import os
+from schema.jsonfile import update_json
 
 def get_repo_abs_path():
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -67,52 +68,45 @@ def save_merge_data(station_name,match_data,ocr_data, repo_abs_path):
     # match_path = f'./merge/{station_name}/config/matches.json'  # 1对1，仅修改匹配
     # result_path = f'./merge/{station_name}/config/results.json'  # 1对多，修改匹配和结果
 
-    def modify_data(match_path, result_path, match_data, ocr_data):
-        try:
-            # 1 修改1对1的matches文件，修改ocr和最佳地理匹配
-            with open(match_path, 'r', encoding='utf-8') as match_file:
-                match_file_data = json.load(match_file)
-
-                for key, value in match_data.items():
-                    match_file_data[int(key) - 1]['gpcode'] = value
-
-                for key, value in ocr_data.items():
-                    match_file_data[int(key) - 1]['dpocr'] = value
+    def modify_matches(match_file_data):
+        # 1 修改1对1的matches文件，修改ocr和最佳地理匹配
+        for key, value in match_data.items():
+            match_file_data[int(key) - 1]['gpcode'] = value
 
-            # 保存修改后的json
-            with open(match_path, 'w', encoding='utf-8') as match_file:
-                json.dump(match_file_data, match_file, ensure_ascii=False, indent=4)
+        for key, value in ocr_data.items():
+            match_file_data[int(key) - 1]['dpocr'] = value
+        return match_file_data
 
-            # 2 修改1对多的results文件，修改ocr和最佳地理匹配
-            with open(result_path, 'r', encoding='utf-8') as result_file:
-                result_file_data = json.load(result_file)
+    def modify_results(result_file_data):
+        # 2 修改1对多的results文件，修改ocr和最佳地理匹配
+        for key, value in match_data.items():
+            specific_idx = int(key) - 1
+            specific_key = value
 
-                for key, value in match_data.items():
-                    specific_idx = int(key) - 1
-                    specific_key = value
+            specific_value = result_file_data[specific_idx]['matched_results'].get(specific_key)
 
-                    specific_value = result_file_data[specific_idx]['matched_results'].get(specific_key)
+            # 创建新的字典
+            new_dict = {}
+            if specific_key in result_file_data[specific_idx]['matched_results']:
+                new_dict[specific_key] = specific_value
 
-                    # 创建新的字典
-                    new_dict = {}
-                    if specific_key in result_file_data[specific_idx]['matched_results']:
-                        new_dict[specific_key] = specific_value
+            # 添加其他键值对
+            for key, value in result_file_data[specific_idx]['matched_results'].items():
+                if key != specific_key:
+                    new_dict[key] = value
 
-                    # 添加其他键值对
-                    for key, value in result_file_data[specific_idx]['matched_results'].items():
-                        if key != specific_key:
-                            new_dict[key] = value
+            # 更新 result_data 中的 matched_results
+            result_file_data[specific_idx]['matched_results'] = new_dict
 
-                    # 更新 result_data 中的 matched_results
-                    result_file_data[specific_idx]['matched_results'] = new_dict
-
-                for key, value in ocr_data.items():
-                    result_file_data[int(key) - 1]['dpocr'] = value
-
-            # 保存修改后的json
-            with open(result_path, 'w', encoding='utf-8') as result_file:
-                json.dump(result_file_data, result_file, ensure_ascii=False, indent=4)
+        for key, value in ocr_data.items():
+            result_file_data[int(key) - 1]['dpocr'] = value
+        return result_file_data
 
+    def modify_data(match_path, result_path, match_data, ocr_data):
+        try:
+            # 读-改-写并原子保存修改后的json
+            update_json(match_path, modify_matches, indent=4)
+            update_json(result_path, modify_results, indent=4)
         except Exception as e:
             print(e)
 
@@ -2,7 +2,16 @@ import json
 from flask import jsonify
 import os
 import random
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from schema.results_store import results_exist
+from schema.results_cache import get_results
+from schema.jsonfile import write_json, read_json, file_version
+from process.overview.map import MAP_DAY_PROPERTIES, map_properties_path, extract_map_properties
+from connect.response import conditional_json
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
@@ -14,11 +23,8 @@ def get_repo_abs_path():
     return backend_dir
 
 def get_json_file_state(station_name, process_date, repo_abs_path):
-    result_path = os.path.join(repo_abs_path, 'data', station_name, 'results', process_date + '.json')
-    # result_path = os.path.join(repo_abs_path, 'data', station_name, 'maps', process_date + '.json')
-    
-    # 直接检查文件是否存在
-    return {"json_file_state": os.path.exists(result_path)}
+    # 检查当天结果是否存在
+    return {"json_file_state": results_exist(repo_abs_path, station_name, process_date)}
 
 """
     根据 confidence 值计算颜色（从红色渐变到绿色）。
@@ -246,19 +252,17 @@ def transform_result_json(result_json,degradation_dict,anomaly_dict, time_window
     return transformed_json,degradation_dict,anomaly_dict
 
 def get_result(station_name, process_date,degradation_dict,anomaly_dict, repo_abs_path, time_window):
-    result_path = os.path.join(repo_abs_path, 'data',station_name,'results',process_date+'.json')
-    # 尝试读取文件
+    # 尝试读取当天结果
     try:
-        with open(result_path, 'r', encoding='utf-8') as result_file:
-            result_json = json.load(result_file)
-            transformed_result,degradation_dict,anomaly_dict = transform_result_json(result_json,degradation_dict,anomaly_dict, time_window)
-            print("degradation_dict: {}".format(degradation_dict))
+        result_json = get_results(repo_abs_path, station_name, process_date)
+        if result_json is None:
+            print(f"Not find results: {station_name} {process_date}")
+            return {},degradation_dict,anomaly_dict
+        transformed_result,degradation_dict,anomaly_dict = transform_result_json(result_json,degradation_dict,anomaly_dict, time_window)
+        print("degradation_dict: {}".format(degradation_dict))
         return transformed_result,degradation_dict,anomaly_dict
-    except FileNotFoundError:
-        print(f"Not find file: {result_path}")
-        return {},degradation_dict,anomaly_dict
     except Exception as e:
-        print(f"Error reading file: {result_path}")
+        print(f"Error reading results: {station_name} {process_date}")
         return {},degradation_dict,anomaly_dict
     
 def update_geojson(panel_geo_data,transformed_result,anoly_max_theshold,color_mappsings):
@@ -288,46 +292,197 @@ def transform_dict2list(statistics_dict):
         })
     return result_list
 
+# 地图几何形状、当天属性和合并后的 GeoJSON 的进程内缓存，按源文件版本失效
+MAP_CACHE_ENTRIES = 32
+# 带版本号请求几何形状时浏览器的缓存时间（秒）
+MAP_GEOMETRY_MAX_AGE = 365 * 24 * 3600
+# 没有当天地图时的置灰属性（字体颜色与 confidence2color_* 对无结果组串的取值一致）
+MAP_GREY_PROPERTIES = {'anomaly_color': '#555', 'anomaly_font_color': '#ffffff', 'degradation_color': '#555', 'degradation_font_color': '#ffffff'}
+_map_cache = OrderedDict()
+_map_cache_lock = threading.Lock()
+
+
+def _map_cached(key, version, build):
+    with _map_cache_lock:
+        entry = _map_cache.get(key)
+        if entry is not None and entry[0] == version:
+            _map_cache.move_to_end(key)
+            return entry[1]
+    value = build()
+    with _map_cache_lock:
+        _map_cache[key] = (version, value)
+        _map_cache.move_to_end(key)
+        while len(_map_cache) > MAP_CACHE_ENTRIES:
+            _map_cache.popitem(last=False)
+    return value
+
+
+def _version_tag(*versions):
+    return hashlib.sha1(repr(versions).encode('utf-8')).hexdigest()[:16]
+
+
+def _last_modified(*versions):
+    # 只取文件版本 (inode, 修改时间, 大小) 中的修改时间
+    mtimes = [version[1] for version in versions if version and isinstance(version[1], int)]
+    if not mtimes:
+        return None
+    return datetime.fromtimestamp(max(mtimes) / 1e9, timezone.utc)
+
+
+def _map_geometry_paths(repo_abs_path, station_name):
+    config_dir = os.path.join(repo_abs_path, 'merge', station_name, 'config')
+    return os.path.join(config_dir, 'geo.json'), os.path.join(config_dir, 'geo_label.json')
+
+
+def get_map_geometry(station_name, repo_abs_path):
+    """
+    场站地图的几何形状（geo.json 去掉随日期变化的属性）和标注，geo.json / geo_label.json 不变时由缓存复用
+
+    Returns:
+        dict: {'version': 版本号, 'panel_geo': GeoJSON, 'panel_geo_label': 标注, 'source_versions': 源文件版本,
+               'base_properties': geo.json 中原有的随日期变化的属性 {要素名: {属性: 值}}}（只读）
+    """
+    geo_path, label_path = _map_geometry_paths(repo_abs_path, station_name)
+    source_versions = (file_version(geo_path), file_version(label_path))
+
+    def build():
+        panel_geo_data, _ = read_json(geo_path)
+        panel_label_data, _ = read_json(label_path)
+        base_properties = {}
+        for feature in panel_geo_data.get('features', []):
+            feature_properties = feature.get('properties', {})
+            base_properties[feature_properties.get('name')] = {key: feature_properties.pop(key) for key in MAP_DAY_PROPERTIES if key in feature_properties}
+        return {
+            'base_properties': base_properties,
+            'version': _version_tag(*source_versions),
+            'panel_geo': panel_geo_data,
+            'panel_geo_label': panel_label_data,
+            'source_versions': source_versions,
+        }
+
+    return _map_cached(('geometry', station_name), source_versions, build)
+
+
+def get_map_properties(station_name, process_date, repo_abs_path):
+    """
+    当天每个地图要素随日期变化的属性 {要素名: {属性: 值}}；没有当天属性文件时兼容读取旧的整份地图文件，都没有时全部置灰
+
+    Returns:
+        tuple: (属性（只读）, 源文件版本)
+    """
+    props_path = map_properties_path(repo_abs_path, station_name, process_date)
+    legacy_path = os.path.join(repo_abs_path, 'data', station_name, 'maps', f'{process_date}.json')
+    props_version = file_version(props_path)
+    legacy_version = None if props_version else file_version(legacy_path)
+    source_version = props_version or legacy_version
+
+    def build():
+        try:
+            if props_version:
+                return read_json(props_path)[0].get('properties', {})
+            if legacy_version:
+                legacy_data = read_json(legacy_path)[0]
+                return extract_map_properties(legacy_data.get('panel_geo', legacy_data))
+        except Exception as e:
+            logger.error(f"{station_name} {process_date} 地图属性读取失败，地图全部置灰: {e}")
+        # 与 set_grey_color 作用于 geo.json 的结果一致：颜色置灰，字体颜色沿用 geo.json，没有时为白色
+        geometry = get_map_geometry(station_name, repo_abs_path)
+        return {name: {**MAP_GREY_PROPERTIES, **base, 'anomaly_color': MAP_GREY_PROPERTIES['anomaly_color'],
+                       'degradation_color': MAP_GREY_PROPERTIES['degradation_color']}
+                for name, base in geometry['base_properties'].items()}
+
+    # 置灰的属性依赖几何形状，版本中一并带上
+    version = source_version or ('grey', get_map_geometry(station_name, repo_abs_path)['version'])
+    return _map_cached(('properties', station_name, process_date), version, build), version
+
+
+def _merge_map(geometry, properties):
+    features = []
+    for feature in geometry['panel_geo'].get('features', []):
+        feature_properties = feature.get('properties', {})
+        features.append(dict(feature, properties={**feature_properties, **properties.get(feature_properties.get('name'), {})}))
+    return dict(geometry['panel_geo'], features=features)
+
+
 def get_overview_station_map_latest(station_name, process_date, repo_abs_path):
-    origin_geo_path = os.path.join(repo_abs_path, 'merge', station_name, 'config', 'geo.json')
-    current_geo_path = os.path.join(repo_abs_path, 'data', station_name, 'maps', f'{process_date}.json')
-    geo_label_path = os.path.join(repo_abs_path, 'merge', station_name, 'config', 'geo_label.json')
+    # 源文件未变化时只检查文件版本，浏览器重新验证直接返回 304
+    try:
+        geometry = get_map_geometry(station_name, repo_abs_path)
+        properties, properties_version = get_map_properties(station_name, process_date, repo_abs_path)
+    except FileNotFoundError as e:
+        return jsonify({'error': f'无法读取geo文件: {e}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'无法读取地图文件: {e}'}), 500
 
-    # 读取geo_label_path对应的文件
+    version = (geometry['version'], properties_version)
+    etag = _version_tag(*version)
+
+    def build():
+        return _map_cached(('merged', station_name, process_date), version, lambda: {
+            'panel_geo': _merge_map(geometry, properties),
+            'panel_geo_label': geometry['panel_geo_label']
+        })
+
+    return conditional_json(etag, _last_modified(*geometry['source_versions'], properties_version), build)
+
+
+def get_overview_station_map_geometry(station_name, repo_abs_path, version=None):
+    """
+    场站地图几何形状和标注；请求带的 version 与当前版本一致时允许浏览器长期缓存
+    """
     try:
-        with open(geo_label_path, 'r', encoding='utf-8') as label_file:
-            panel_label_data = json.load(label_file)
+        geometry = get_map_geometry(station_name, repo_abs_path)
     except Exception as e:
-        return jsonify({'error': f'无法读取geo_label文件: {e}'}), 500
+        return jsonify({'error': f'无法读取geo文件: {e}'}), 500
 
-    # 优先读取current_geo_path，如果文件损坏或无法读取则回退到origin_geo_path
-    panel_geo_data = None
-    if os.path.exists(current_geo_path):
-        try:
-            with open(current_geo_path, 'r', encoding='utf-8') as geo_file:
-                panel_geo_data = json.load(geo_file)
-        except Exception as e:
-            # 读取失败，尝试读取原始geo.json
-            try:
-                with open(origin_geo_path, 'r', encoding='utf-8') as geo_file:
-                    panel_geo_data = json.load(geo_file)
-            except Exception as e2:
-                return jsonify({'error': f'无法读取geo文件: {e2}'}), 500
-    else:
-        try:
-            with open(origin_geo_path, 'r', encoding='utf-8') as geo_file:
-                panel_geo_data = json.load(geo_file)
-            
-            panel_geo_data = set_grey_color(panel_geo_data)
-        except Exception as e:
-            return jsonify({'error': f'无法读取geo文件: {e}'}), 500
+    def build():
+        return {key: geometry[key] for key in ('version', 'panel_geo', 'panel_geo_label')}
 
-    merged_data = {
-        'panel_geo': panel_geo_data,
-        'panel_geo_label': panel_label_data
-    }
+    immutable = version == geometry['version']
+    return conditional_json(geometry['version'], _last_modified(*geometry['source_versions']), build,
+                            max_age=MAP_GEOMETRY_MAX_AGE if immutable else None, immutable=immutable)
 
-    return jsonify(merged_data)
+
+def get_overview_station_map_properties(station_name, process_date, repo_abs_path, since=None):
+    """
+    当天地图要素的颜色属性；指定 since 日期时只返回相对该日期发生变化的属性
+
+    Returns:
+        {'date', 'geometry_version', 'properties': {要素名: {属性: 值}}}；
+        指定 since 时另有 'since' 和 'removed': {要素名: [属性]}，properties 只含新增或变化的属性，
+        removed 为 since 当天有而当天没有的属性（当天不存在的要素列出其全部属性），前端需删除
+    """
+    try:
+        geometry = get_map_geometry(station_name, repo_abs_path)
+        properties, properties_version = get_map_properties(station_name, process_date, repo_abs_path)
+        since_properties, since_version = get_map_properties(station_name, since, repo_abs_path) if since else (None, None)
+    except Exception as e:
+        return jsonify({'error': f'无法读取地图文件: {e}'}), 500
+
+    def build():
+        data = {'date': process_date, 'geometry_version': geometry['version']}
+        if since_properties is None:
+            data['properties'] = properties
+            return data
+        changed = {}
+        removed = {}
+        for name, feature_properties in properties.items():
+            previous = since_properties.get(name, {})
+            diff = {key: value for key, value in feature_properties.items() if key not in previous or previous[key] != value}
+            if diff:
+                changed[name] = diff
+        for name, previous in since_properties.items():
+            current = properties.get(name, {})
+            missing = [key for key in previous if key not in current]
+            if missing:
+                removed[name] = missing
+        data['since'] = since
+        data['properties'] = changed
+        data['removed'] = removed
+        return data
+
+    etag = _version_tag(geometry['version'], properties_version, since_version)
+    return conditional_json(etag, _last_modified(*geometry['source_versions'], properties_version, since_version), build)
 
     
 def matches2mapping(matches_json_path):
@@ -464,8 +619,7 @@ def save_overview_station_map(station_name, process_date, repo_abs_path, time_wi
         output_dir = os.path.join(repo_abs_path,'data', station_name,'maps')
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, f'{process_date}.json')
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(merged_data, f, ensure_ascii=False, indent=2)
+        write_json(output_path, merged_data, indent=2)
 
         print("电厂：{} 日期：{} 的地图文件已保存到 {}".format(station_name,process_date,output_path))
     except FileNotFoundError:
@@ -474,8 +628,6 @@ def save_overview_station_map(station_name, process_date, repo_abs_path, time_wi
         print(f"Error reading file: { geo_path }")
 
 def get_overview_station_info(station_name, process_date, repo_abs_path):
-    result_json_path = os.path.join(repo_abs_path, 'data', station_name, 'results', f'{process_date}.json')
-
     degradation_dict = {
         '低效组串数量': 0,
         '正常组串数量': 0
@@ -497,7 +649,8 @@ def get_overview_station_info(station_name, process_date, repo_abs_path):
         'futureWeekLoss': 0   
     }
     
-    if not os.path.exists(result_json_path):
+    results_json = get_results(repo_abs_path, station_name, process_date)
+    if results_json is None:
         station_info = {
             'degradation_info': transform_dict2list(degradation_dict),
             'anomaly_info': transform_dict2list(anomaly_dict),
@@ -506,11 +659,9 @@ def get_overview_station_info(station_name, process_date, repo_abs_path):
         }
         return jsonify(station_info)
     
-    # 读取结果文件，增加损坏校验
+    # 读取场站当日统计，增加异常校验
     try:
-        with open(result_json_path, 'r', encoding='utf-8') as result_file:
-            result_json = json.load(result_file)
-        station_statistics = result_json.get('statistics', {})
+        station_statistics = results_json.get('statistics') or {}
 
         fault_string_count = station_statistics.get('fault_string_count', 0)
         total_strings = station_statistics.get('total_strings', 0)
@@ -537,8 +688,8 @@ def get_overview_station_info(station_name, process_date, repo_abs_path):
             'futureWeekLoss': round(float(station_statistics.get('future_week_loss', 0)), 2)
         }
     except Exception as e:
-        # 文件损坏或无法读取，返回默认结果
-        logger.error(f"{result_json_path} 文件损坏或无法读取，返回默认结果: {e}")
+        # 结果无法读取，返回默认结果
+        logger.error(f"{station_name} {process_date} 统计数据无法读取，返回默认结果: {e}")
 
     station_info = {
         'degradation_info': transform_dict2list(degradation_dict),
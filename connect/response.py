@@ -0,0 +1,209 @@
+# 接口响应编码：
+#   1. JSON 编码使用 orjson（未安装时回退到 Flask 默认编码器），所有 jsonify / 直接返回 dict、list 的接口都生效
+#   2. 按请求头 Accept-Encoding 协商 br / gzip 压缩 JSON、GeoJSON 响应
+#   3. 数值数组较大的接口支持 ?format=f32 返回二进制格式：
+#        [4 字节小端 uint32 头部长度][UTF-8 JSON 头部，空格补齐到 4 字节][小端 float32 数据]
+#      头部为原 JSON 结构，其中长度不小于 F32_MIN_ARRAY_LENGTH 的浮点数组替换为 {"$f32": [起始下标, 长度]}，
+#      前端用 new Float32Array(buffer, 4 + 头部长度) 按下标取出；null 编码为 NaN。
+#      整数数组（时间戳、编号等）保持 JSON，float32 只能精确表示绝对值不超过 2^24 的整数
+#   4. conditional_json：带 ETag / Last-Modified 的 JSON 响应，浏览器重新验证命中时返回 304，不构建响应体
+import os
+import gzip
+import json
+import struct
+import logging
+
+import numpy as np
+from flask import Response, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/geo+json', 'text/plain', 'text/html', 'text/csv'}
+
+F32_MIMETYPE = 'application/x-float32-pack'
+F32_MIN_ARRAY_LENGTH = 8
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    orjson 编码器；带 indent 等参数的调用和 orjson 无法编码的对象回退到 Flask 默认实现
+    """
+
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def _dumps_bytes(self, obj):
+        # datetime 交给 Flask 的 default 处理，保持与原接口相同的 HTTP 日期格式
+        return orjson.dumps(obj, default=self.default, option=self.options)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return self._dumps_bytes(obj).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = self._dumps_bytes(obj)
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def _compress_min_bytes():
+    # 使用时读取：模块在 load_dotenv 之前被导入
+    return int(os.getenv('RESPONSE_COMPRESS_MIN_BYTES', '1024').strip())
+
+
+def _negotiate_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """
+    after_request：按 Accept-Encoding 压缩较大的文本响应
+    """
+    if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < _compress_min_bytes():
+        return response
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+    try:
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    except Exception as e:
+        logger.warning(f"compress response failed: {e}")
+        return response
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    # 压缩后的字节与原响应不同，强 ETag 改为弱 ETag
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_response_encoding(app):
+    """
+    为 Flask 应用启用 orjson 编码和响应压缩
+    """
+    if orjson is not None:
+        app.json_provider_class = OrjsonProvider
+        app.json = OrjsonProvider(app)
+    else:
+        logger.warning("orjson 未安装，使用 Flask 默认 JSON 编码器")
+    app.after_request(compress_response)
+
+
+def conditional_json(etag, last_modified, build, max_age=None, immutable=False):
+    """
+    带 ETag / Last-Modified 的 JSON 响应
+
+    Args:
+        etag: 响应版本（通常由源文件版本计算），压缩后会变为弱 ETag，比较时按弱比较
+        last_modified: 源文件最后修改时间（datetime，UTC），未知时为 None
+        build: 构建响应数据的函数，只在需要返回响应体时调用
+        max_age: 缓存秒数，为 None 时要求浏览器每次重新验证
+        immutable: 响应内容与 URL 一一对应、永不变化（如带版本号的请求）
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif not request.if_none_match and last_modified is not None and request.if_modified_since is not None \
+            and last_modified.replace(microsecond=0) <= request.if_modified_since:
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.cache_control.immutable = immutable
+    return response
+
+
+def _is_float_list(obj):
+    return len(obj) >= F32_MIN_ARRAY_LENGTH and all(value is None or isinstance(value, (float, np.floating)) for value in obj)
+
+
+def pack_f32(data):
+    """
+    将数据中的浮点数组打包为 float32 二进制格式（格式见模块说明），整数数组保持 JSON
+    """
+    arrays = []
+    offset = 0
+
+    def walk(obj):
+        nonlocal offset
+        if isinstance(obj, dict):
+            return {key: walk(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            if _is_float_list(obj):
+                arrays.append(np.asarray(obj, dtype='<f4'))
+                ref = {'$f32': [offset, len(obj)]}
+                offset += len(obj)
+                return ref
+            return [walk(value) for value in obj]
+        if isinstance(obj, np.ndarray) and obj.ndim == 1 and obj.dtype.kind == 'f':
+            arrays.append(obj.astype('<f4'))
+            ref = {'$f32': [offset, len(obj)]}
+            offset += len(obj)
+            return ref
+        if isinstance(obj, np.ndarray):
+            # 整数等其它数组按原值写入 JSON 头部
+            return obj.tolist()
+        return obj
+
+    header = walk(data)
+    if orjson is not None:
+        header_bytes = orjson.dumps(header, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        header_bytes = json.dumps(header, ensure_ascii=False, default=str).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 4)
+    values = np.concatenate(arrays) if arrays else np.empty(0, dtype='<f4')
+    return struct.pack('<I', len(header_bytes)) + header_bytes + values.tobytes()
+
+
+def wants_f32():
+    return request.args.get('format') == 'f32'
+
+
+def array_response(data, status=200):
+    """
+    数值数组接口的响应：?format=f32 时返回 float32 二进制格式，否则返回 JSON
+    """
+    if wants_f32():
+        return Response(pack_f32(data), status=status, mimetype=F32_MIMETYPE)
+    return jsonify(data), status
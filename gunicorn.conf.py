@@ -0,0 +1,85 @@
+# gunicorn 配置：Web worker 只处理请求，定时流水线（process.runner）由 gunicorn 主进程作为子进程启动，
+# 与 Web 进程运行在同一台机器上，共用同一份 data/、database/ 目录和 sqlite 文件锁；主进程退出时一并停止
+#
+# 用法：gunicorn -c gunicorn.conf.py app:app
+# 流水线已由其它进程 / 机器运行时（如 MariaDB 部署下单独部署的 runner），设置 PIPELINE_RUNNER_EMBEDDED=false 关闭，
+# 可以写在进程环境变量或 setting/.env.* 中
+# runner 异常退出时由主进程内的守护线程重新拉起，连续快速退出时逐步拉长重启间隔
+import os
+import sys
+import subprocess
+import threading
+import time
+
+from dotenv import load_dotenv
+
+bind = '0.0.0.0:1022'
+timeout = 90
+
+# 与 app.py 相同的配置文件（已存在的进程环境变量优先）
+_repo_abs_path = os.path.dirname(os.path.abspath(__file__))
+_env_name = os.getenv("APP_ENV", "development").strip()
+if _env_name == "production" or _env_name == "local":
+    _env_dir = os.path.join(os.path.dirname(_repo_abs_path), 'app')
+else:
+    _env_dir = _repo_abs_path
+load_dotenv(os.path.join(_env_dir, 'setting', f".env.{_env_name}"))
+
+# runner 存活检查间隔；重启间隔从 RUNNER_RESTART_DELAY 开始翻倍，最长 RUNNER_RESTART_MAX_DELAY，
+# 运行超过 RUNNER_STABLE_SECONDS 后再退出则重新从最短间隔开始
+RUNNER_POLL_SECONDS = 5
+RUNNER_RESTART_DELAY = 5
+RUNNER_RESTART_MAX_DELAY = 300
+RUNNER_STABLE_SECONDS = 600
+
+_runner = None
+_runner_lock = threading.Lock()
+_stopping = threading.Event()
+
+
+def _start_runner(server):
+    global _runner
+    with _runner_lock:
+        # on_exit 已开始停止时不再拉起
+        if _stopping.is_set():
+            return
+        _runner = subprocess.Popen([sys.executable, '-m', 'process.runner'], cwd=_repo_abs_path)
+    server.log.info(f"pipeline runner started, pid {_runner.pid}")
+
+
+def _watch_runner(server):
+    delay = RUNNER_RESTART_DELAY
+    started_at = time.monotonic()
+    while not _stopping.wait(RUNNER_POLL_SECONDS):
+        code = _runner.poll()
+        if code is None:
+            continue
+        if time.monotonic() - started_at >= RUNNER_STABLE_SECONDS:
+            delay = RUNNER_RESTART_DELAY
+        server.log.error(f"pipeline runner exited with code {code}, restarting in {delay}s")
+        if _stopping.wait(delay):
+            return
+        _start_runner(server)
+        started_at = time.monotonic()
+        delay = min(delay * 2, RUNNER_RESTART_MAX_DELAY)
+
+
+def on_starting(server):
+    if os.getenv('PIPELINE_RUNNER_EMBEDDED', 'true').strip().lower() != 'true':
+        return
+    _start_runner(server)
+    threading.Thread(target=_watch_runner, args=(server,), name='pipeline-runner-watchdog', daemon=True).start()
+
+
+def on_exit(server):
+    with _runner_lock:
+        _stopping.set()
+        runner = _runner
+    if runner is None or runner.poll() is not None:
+        return
+    runner.terminate()
+    try:
+        runner.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        runner.kill()
+    server.log.info("pipeline runner stopped")
@@ -1,5 +1,3 @@
-import collections
-
 import pandas as pd
 import numpy as np
 from sklearn.svm import OneClassSVM
@@ -7,170 +5,229 @@ from sklearn.neighbors import LocalOutlierFactor
 from sklearn.covariance import EllipticEnvelope
 from sklearn.mixture import GaussianMixture
 import os
-from .save_to_result import update_anomaly_scores, update_degradation_rates, update_anomaly_dates
+import copy
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from .model_cache import load_pickle_cache, save_pickle_cache
+from .save_to_result import update_anomaly_results, update_degradation_rates
+from .dim_reduction import init_worker_threads, detect_setting
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 SAVE_DIR = "./data"
 # os.path.join(PROJECT_ROOT, "data")
 
-def calc_anomaly_score(dr_inv_list: list[pd.DataFrame], station_name, end_date, repo_abs_path) ->pd.DataFrame:
-    all_ano_df = []
-    all_ano_ids = []
-    all_ano_model = []
-    daily_anomaly_status = {}
-    all_string_ids = set()  # 用于收集所有组串ID
-
-    for inv_df in dr_inv_list:
-        ano_df, ano_model = pd.DataFrame(), {}
-        
-        string_ids = inv_df['id'].apply(lambda x: x.split('@')[0]).unique()
-        all_string_ids.update(string_ids)  # 收集所有组串ID
-        dates = inv_df.index.unique()
-        date_to_idx = {date: idx for idx, date in enumerate(dates)}
-        
-        for string_id in string_ids:
-            if string_id not in daily_anomaly_status:
-                daily_anomaly_status[string_id] = [0] * len(dates)
-        
-        for label, group in inv_df.groupby('label'):
-            X = group.drop(['id'], axis=1)
-            group_ano_model = {'ocsvm': None, 'ee': None, 'lof': None}
-
-            try:
-                # Elliptic Envelope
-                ee_model = EllipticEnvelope(contamination=0.05).fit(X)  # 降低 contamination 参数
-                pred_ee = ee_model.predict(X)
-                group_ano_model['ee'] = ee_model
-                ad_df_ee = group[pred_ee == -1]
-            except ValueError as e:
-                print(f"Error fitting EllipticEnvelope for group {label}: {e}")
-                continue
-
-            # One-Class SVM
-            ocsvm_model = OneClassSVM(kernel='rbf', gamma='auto', nu=0.1, max_iter=1000).fit(X)
-            pred_ocsvm = ocsvm_model.predict(X)
-            group_ano_model['ocsvm'] = ocsvm_model
-            ad_df_ocsvm = group[pred_ocsvm == -1]
-
-            # # Elliptic Envelope
-            # ee_model = EllipticEnvelope(contamination=0.1).fit(X)
-            # pred_ee = ee_model.predict(X)
-            # group_ano_model['ee'] = ee_model
-            # ad_df_ee = group[pred_ee == -1]
-
-            # Local Outlier Factor
-            lof_model = LocalOutlierFactor(n_neighbors=20, algorithm='ball_tree', 
-                                         leaf_size=40, n_jobs=-1, contamination=0.1)
-            pred_lof = lof_model.fit_predict(X)
-            group_ano_model['lof'] = lof_model
-            ad_df_lof = group[pred_lof == -1]
-
-            # 修改后的逻辑：只要有任何一个模型检测到异常就记录
-            anomaly_dfs = []
-            if not ad_df_ocsvm.empty:
-                anomaly_dfs.append(ad_df_ocsvm)
-            if not ad_df_ee.empty:
-                anomaly_dfs.append(ad_df_ee)
-            if not ad_df_lof.empty:
-                anomaly_dfs.append(ad_df_lof)
-            
-            if anomaly_dfs:  # 只要有任何异常就合并
-                ano_df = pd.concat([ano_df] + anomaly_dfs, axis=0)
-            
-            ano_model[label] = group_ano_model
-
-            # 更新每日异常状态
-            for _, row in group.iterrows():
-                date = row.name 
-                day_idx = date_to_idx[date] 
-                string_id = row['id'].split('@')[0] 
-                
-                is_anomaly = (row['id'] in ad_df_ocsvm['id'].values or 
-                            row['id'] in ad_df_ee['id'].values or 
-                            row['id'] in ad_df_lof['id'].values)
-                
-                if is_anomaly:
-                    daily_anomaly_status[string_id][day_idx] = 1
-
-        if not ano_df.empty:
-            all_ano_df.append(ano_df)
-            all_ano_ids.extend(ano_df['id'].tolist())
-            all_ano_model.append(ano_model)
-
-    ano_static = collections.Counter([k.split('@')[0] for k in all_ano_ids])
-    
-    # 确保所有组串都有记录，没有异常的赋值为0
-    for string_id in all_string_ids:
-        if string_id not in ano_static:
-            ano_static[string_id] = 0
-    
-    # 转换为DataFrame并排序
-    ano_st_df = pd.DataFrame(list(ano_static.items()), columns=['pid', 'count'])
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+def detect_inverter_anomalies(inv_df: pd.DataFrame, n_jobs=-1):
+    """
+    单个逆变器的异常检测（在子进程中执行），EE/OCSVM/LOF 三个模型的结果以布尔数组合并
+
+    Returns:
+        tuple: (每行组串编号, 每行日期, 每行被判为异常的模型个数)
+    """
+    pids = inv_df['id'].str.split('@').str[0].to_numpy()
+    labels = inv_df['label'].to_numpy()
+    flags = np.zeros(len(inv_df), dtype=np.int64)
+
+    for label in np.unique(labels):
+        mask = labels == label
+        X = inv_df.loc[mask].drop(['id'], axis=1)
+
+        try:
+            # Elliptic Envelope
+            is_ee = EllipticEnvelope(contamination=0.05).fit(X).predict(X) == -1  # 降低 contamination 参数
+        except ValueError as e:
+            print(f"Error fitting EllipticEnvelope for group {label}: {e}")
+            continue
+
+        # One-Class SVM
+        is_ocsvm = OneClassSVM(kernel='rbf', gamma='auto', nu=0.1, max_iter=1000).fit(X).predict(X) == -1
+
+        # Local Outlier Factor
+        lof_model = LocalOutlierFactor(n_neighbors=20, algorithm='ball_tree', 
+                                       leaf_size=40, n_jobs=n_jobs, contamination=0.1)
+        is_lof = lof_model.fit_predict(X) == -1
+
+        # 只要有任何一个模型检测到异常就记录，异常分数累计各模型的检出次数
+        flags[mask] = is_ee.astype(np.int64) + is_ocsvm + is_lof
+
+    return pids, inv_df.index.to_numpy(), flags
+
+
+def calc_anomaly_score(dr_inv_list: list[pd.DataFrame], station_name, end_date, repo_abs_path, workers=None) ->pd.DataFrame:
+    if workers is None:
+        workers = detect_setting('DETECT_SCORE_WORKERS')
+    tasks = [inv_df for inv_df in dr_inv_list if len(inv_df)]
+    if not tasks:
+        return pd.DataFrame(columns=['pid', 'count'])
+
+    workers = max(1, min(workers, len(tasks)))
+    if workers == 1:
+        results = [detect_inverter_anomalies(inv_df) for inv_df in tasks]
+    else:
+        threads = detect_setting('DETECT_UMAP_THREADS')
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker_threads, initargs=(threads,)) as executor:
+            futures = [executor.submit(detect_inverter_anomalies, inv_df, threads) for inv_df in tasks]
+            results = [future.result() for future in futures]
+
+    pids = np.concatenate([r[0] for r in results])
+    row_dates = pd.DatetimeIndex(np.concatenate([r[1] for r in results]))
+    flags = np.concatenate([r[2] for r in results])
+
+    # 一次性散列到 (组串 × 天) 矩阵
+    string_index = pd.Index(pd.unique(pids))
+    date_index = row_dates.unique().sort_values()
+    rows = string_index.get_indexer(pids)
+    cols = date_index.get_indexer(row_dates)
+    daily_status = np.zeros((len(string_index), len(date_index)), dtype=np.int64)
+    daily_status[rows[flags > 0], cols[flags > 0]] = 1
+    counts = np.bincount(rows, weights=flags, minlength=len(string_index)).astype(np.int64)
+
+    # 没有异常的组串计数为0，转换为DataFrame并排序
+    ano_st_df = pd.DataFrame({'pid': string_index, 'count': counts})
     ano_st_df = ano_st_df.sort_values(by='count', ascending=False)
+    daily_anomaly_status = dict(zip(string_index, daily_status.tolist()))
 
-    # 更新异常分数
-    save_dir = os.path.join(repo_abs_path, 'data', station_name, "results")
-    file_path = os.path.join(save_dir, f"{end_date}.json")
-    update_anomaly_scores(file_path, ano_st_df.to_dict('records'))
-    update_anomaly_dates(file_path, daily_anomaly_status)
+    # 异常分数与异常日期一次写入
+    update_anomaly_results(repo_abs_path, station_name, end_date, ano_st_df.to_dict('records'), daily_anomaly_status)
 
     return ano_st_df
     
 
-def calc_deg_score(dr_inv_list, ano_st_df, station_name, end_date, repo_abs_path):
+def select_gmm(X, max_components, patience=None, warm_model=None):
+    """
+    按 BIC 选择 GMM 成分数：从 1 开始递增，连续 patience 次 BIC 不下降即停止
+
+    Args:
+        X: 样本矩阵
+        max_components: 成分数上限
+        patience: 提前停止的容忍次数，为 None 时读取 DETECT_GMM_PATIENCE
+        warm_model: 上次选中的模型，搜索到相同成分数时以其参数热启动拟合该候选，成分数仍按 BIC 重新选择
+    Returns:
+        GaussianMixture: 选中的模型
+    """
+    if patience is None:
+        patience = detect_setting('DETECT_GMM_PATIENCE')
+    n_max = max(1, min(max_components, len(X)))
+    if warm_model is not None and warm_model.means_.shape[1] != X.shape[1]:
+        warm_model = None
+
+    best_bic = np.inf
+    best_gmm = None
+    no_improve = 0
+    for nc in range(1, n_max + 1):
+        if warm_model is not None and warm_model.n_components == nc:
+            gmm = copy.deepcopy(warm_model)
+            gmm.set_params(warm_start=True)
+            gmm.fit(X)
+        else:
+            gmm = GaussianMixture(n_components=nc, random_state=42).fit(X)
+        bic = gmm.bic(X)
+        if bic < best_bic:
+            best_bic = bic
+            best_gmm = gmm
+            no_improve = 0
+        else:
+            no_improve += 1
+            if no_improve >= patience:
+                break
+    return best_gmm
+
+
+def calc_inverter_deg(inv_df, ano_threshold_id_list, max_components=None, patience=None, warm_models=None):
+    """
+    单个逆变器的劣化评分（在子进程中执行），max_components / patience 由 calc_deg_score 在主进程中解析后传入
+
+    Returns:
+        tuple: ({pid: deg}, {label: 选中的 GMM})
+    """
+    if max_components is None:
+        max_components = detect_setting('DETECT_GMM_MAX_COMPONENTS')
+    inv_df = inv_df.copy()
+    inv_df["pid"] = inv_df['id'].str.split('@').str[0]
+    normal_inv_df = inv_df[~inv_df['pid'].isin(ano_threshold_id_list)]
+    warm_models = warm_models or {}
+    gmm_dict = dict()
+    bd_list = []
+
+    for label, group in normal_inv_df.groupby('label'):
+        X = group.drop(['label', 'id', 'pid'], axis=1).values
+        n_strings = group["pid"].nunique()
+        best_gmm = select_gmm(X, min(max_components, n_strings), patience, warm_models.get(label))
+        gmm_dict[label] = best_gmm
+
+        result = pd.Series(best_gmm.score_samples(X), index=group.index)
+        bd_list.append(result.groupby(level=0).min())
+
+    if not gmm_dict:
+        return {}, gmm_dict
+
+    # 每天的边界值：正常组串在当日的最小对数似然
+    boundary = pd.concat(bd_list).groupby(level=0).min()
+    deg_list = []
+
+    for label, group in inv_df.groupby('label'):
+        gmm = gmm_dict.get(label)
+        if gmm is None:
+            continue
+        X = group.drop(['label', 'id', 'pid'], axis=1).values
+        deg_list.append(pd.DataFrame({
+            "pid": group["pid"].values,
+            "bd_val": gmm.score_samples(X),
+            "boundary": boundary.reindex(group.index).values,
+        }))
+
+    inv_deg_df = pd.concat(deg_list, ignore_index=True)
+    scale_range = pd.concat([inv_deg_df["bd_val"], inv_deg_df["boundary"]])
+    d_min, d_max = scale_range.min(), scale_range.max()
+    bd_val_scaled = (inv_deg_df['bd_val'] - d_min) / (d_max - d_min)
+    boundary_scaled = (inv_deg_df['boundary'] - d_min) / (d_max - d_min)
+    inv_deg_df["deg"] = np.where(bd_val_scaled < boundary_scaled, (boundary_scaled - bd_val_scaled) / boundary_scaled, 0)
+
+    return inv_deg_df.groupby('pid')['deg'].mean().to_dict(), gmm_dict
+
+
+def calc_deg_score(dr_inv_list, ano_st_df, station_name, end_date, repo_abs_path,
+                   workers=None, max_components=None, patience=None, warm_start=None):
+    # 未显式传入的参数在运行时读取 DETECT_* 配置
+    if workers is None:
+        workers = detect_setting('DETECT_SCORE_WORKERS')
+    if max_components is None:
+        max_components = detect_setting('DETECT_GMM_MAX_COMPONENTS')
+    if patience is None:
+        patience = detect_setting('DETECT_GMM_PATIENCE')
+    if warm_start is None:
+        warm_start = detect_setting('DETECT_GMM_WARM_START')
     inv_deg_dict = dict()
     threshold = ano_st_df["count"].mean() + 3*ano_st_df["count"].std()
     ano_threshold_id_list = list(ano_st_df[ano_st_df["count"]>=threshold]["pid"].values)
 
-    for inv_df in dr_inv_list:
-        inv_df["pid"] = inv_df['id'].apply(lambda x: x.split('@')[0])
-        normal_inv_df = inv_df[~inv_df['pid'].isin(ano_threshold_id_list)].drop(columns=['pid'])
-        gmm_dict = dict()   
-        inv_bd_df = pd.DataFrame()
-        inv_deg_df = pd.DataFrame()
-
-        for label, group in normal_inv_df.groupby('label'):
-            normal_ids = set(group["id"].apply(lambda x: x.split('@')[0]).values)
-            X = group.drop(['label', 'id'], axis=1).values
-
-            best_bic = np.inf 
-            best_gmm = None
-            for nc in range(len(normal_ids), 0, -1):
-                gmm = GaussianMixture(n_components=nc, random_state=42).fit(X)
-                bic = gmm.bic(X)
-                if bic < best_bic:
-                    best_bic = bic 
-                    best_gmm = gmm
-            gmm_dict[label] = best_gmm
-
-            group["result"] = gmm.score_samples(X)
-            bd_df = group.groupby(group.index)["result"].min().reset_index(name='boundary')
-            inv_bd_df = pd.concat([inv_bd_df, bd_df], ignore_index=True, axis=0)
-        
-        inv_bd_df = inv_bd_df.set_index("index").sort_index()
-
-        for label, group in inv_df.groupby('label'):
-            X = group.drop(['label', 'id', 'pid'], axis=1).values
-            gmm = gmm_dict[label]
-            group["bd_val"] = gmm.score_samples(X)
-            group['boundary'] = group.index.map(lambda idx: inv_bd_df.loc[idx, 'boundary'] if idx in inv_bd_df.index else None)
-            deg_df = group[["id", "x", "y", "label", "bd_val", "boundary"]]
-            inv_deg_df = pd.concat([inv_deg_df, deg_df], ignore_index=True, axis=0)
-            
-        
-        scale_range = pd.concat([inv_deg_df["bd_val"], inv_deg_df["boundary"]])
-        d_min, d_max = scale_range.min(), scale_range.max()
-        inv_deg_df["bd_val_scaled"] = (inv_deg_df['bd_val'] - d_min) / (d_max - d_min)
-        inv_deg_df["boundary_scaled"] = (inv_deg_df['boundary'] - d_min) / (d_max - d_min)
-        inv_deg_df["deg"] = inv_deg_df.apply(lambda row: (row["boundary_scaled"] - row["bd_val_scaled"]) / row["boundary_scaled"]
-                                            if row["bd_val_scaled"] < row["boundary_scaled"] else 0, axis=1)
-        inv_deg_df['pid'] = inv_deg_df['id'].apply(lambda x: x.split('@')[0])
-        inv_deg_dict = inv_deg_dict | inv_deg_df.groupby('pid')['deg'].mean().to_dict()
+    # 每个逆变器选中的 GMM 按逆变器缓存，热启动时作为下一次拟合的初始参数
+    cache_path = os.path.join(repo_abs_path, 'data', station_name, 'models', 'gmm.pkl')
+    gmm_cache = load_pickle_cache(cache_path, {}) if warm_start else {}
+    inv_keys = ["-".join(inv_df['id'].iloc[0].split('@')[0].split('-')[:2]) if len(inv_df) else None for inv_df in dr_inv_list]
+    tasks = [(key, inv_df) for key, inv_df in zip(inv_keys, dr_inv_list) if key is not None]
+
+    workers = max(1, min(workers, len(tasks)))
+    if workers == 1:
+        results = [calc_inverter_deg(inv_df, ano_threshold_id_list, max_components, patience, gmm_cache.get(key)) for key, inv_df in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker_threads, initargs=(detect_setting('DETECT_UMAP_THREADS'),)) as executor:
+            futures = [executor.submit(calc_inverter_deg, inv_df, ano_threshold_id_list, max_components, patience, gmm_cache.get(key))
+                       for key, inv_df in tasks]
+            results = [future.result() for future in futures]
+
+    for (key, _), (deg_dict, gmm_dict) in zip(tasks, results):
+        inv_deg_dict = inv_deg_dict | deg_dict
+        if gmm_dict:
+            gmm_cache[key] = gmm_dict
+
+    if warm_start:
+        save_pickle_cache(cache_path, gmm_cache)
 
     deg_st_df = pd.DataFrame(list(inv_deg_dict.items()), columns=["pid", "deg"])
     # 更新劣化率
-    save_dir = os.path.join(repo_abs_path, 'data', station_name, "results")
-    file_path = os.path.join(save_dir, f"{end_date}.json")
-    update_degradation_rates(file_path, inv_deg_dict)
+    update_degradation_rates(repo_abs_path, station_name, end_date, inv_deg_dict)
 
-    return deg_st_df 
\ No newline at end of file
+    return deg_st_df
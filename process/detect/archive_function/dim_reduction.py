@@ -1,6 +1,12 @@
 import pandas as pd
+import numpy as np
 from umap import UMAP
 import os
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from threadpoolctl import threadpool_limits
+from .model_cache import load_pickle_cache, save_pickle_cache
 from .save_to_result import construct_result_template,update_identifier,update_rdc_positions
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
@@ -23,6 +29,35 @@ UMAP_PARAMS = {
     "n_jobs": -1,
 }
 
+# 检测流程的并行与缓存配置，在运行时读取（见 detect_setting）
+DETECT_DEFAULTS = {
+    # 箱变级降维并行配置：进程数、每个进程的线程数（避免 numba/BLAS 线程超额订阅）
+    'DETECT_UMAP_WORKERS': str(os.cpu_count() or 1),
+    'DETECT_UMAP_THREADS': '1',
+    # 降维模型缓存：开启后复用前一晚拟合的 reducer，仅对新增天数做 transform，每隔 DETECT_REFIT_DAYS 天全量重拟合
+    'DETECT_REDUCER_CACHE': 'false',
+    'DETECT_REFIT_DAYS': '7',
+    # 异常/劣化评分按逆变器并行的进程数
+    'DETECT_SCORE_WORKERS': str(os.cpu_count() or 1),
+    # GMM 模型选择：最大成分数、BIC 连续不下降多少次后提前停止、是否从上次选中的模型热启动
+    'DETECT_GMM_MAX_COMPONENTS': '8',
+    'DETECT_GMM_PATIENCE': '2',
+    'DETECT_GMM_WARM_START': 'false',
+}
+DETECT_FLAGS = ('DETECT_REDUCER_CACHE', 'DETECT_GMM_WARM_START')
+
+
+def detect_setting(name):
+    """
+    读取检测流程配置，开关项返回 bool，其余返回 int
+    """
+    value = os.getenv(name, DETECT_DEFAULTS[name]).strip()
+    return value.lower() == 'true' if name in DETECT_FLAGS else int(value)
+
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
 # 判断光伏组串（PV string）在指定天数内的电流数据是否可以被视为"零电流"状态
 def is_zero_i(i_data: pd.DataFrame, string_id: str, days: int) ->bool:
     i_col = string_id
@@ -52,26 +87,142 @@ def is_double_i(i_data: pd.DataFrame, string_id: str) ->bool:
 
     return False
 
-def perform_dim_reduction(station_data: dict, env_data: pd.DataFrame, station_name, end_date, repo_abs_path,time_window) ->list[pd.DataFrame]:
+def init_worker_threads(threads):
+    """
+    检测子进程初始化：限制 numba/BLAS/OpenMP 线程数
+    """
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMBA_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import numba
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+    except Exception as e:
+        logger.warning(f"numba thread limit not applied: {e}")
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+    except Exception as e:
+        logger.warning(f"BLAS thread limit not applied: {e}")
+
+
+def reduce_box(box_id, box_matrix, row_ids, columns, end_date, threads=1, cache_path=None, refit_days=None):
     """
-    执行降维计算并构造结果模板
+    单个箱变的降维计算（在子进程中执行）
+
+    Args:
+        box_id: 箱变编号
+        box_matrix: 降维输入矩阵，行为 组串@日期，列为小时
+        row_ids: 每一行对应的 "组串@日期" 标识
+        columns: 矩阵的列（小时）
+        end_date: 本次计算的截止日期
+        threads: 当前进程内 UMAP 使用的线程数
+        cache_path: reducer 缓存路径，为 None 时不使用缓存
+        refit_days: 缓存 reducer 的最长使用天数，超过后全量重拟合，为 None 时读取 DETECT_REFIT_DAYS
+    Returns:
+        tuple: (box_id, 降维结果 ndarray)
+    """
+    if refit_days is None:
+        refit_days = detect_setting('DETECT_REFIT_DAYS')
+    end_day = pd.to_datetime(end_date)
+    cache = load_pickle_cache(cache_path)
+
+    if cache is not None:
+        fitted_day = pd.to_datetime(cache['fitted_date'])
+        if list(cache['columns']) == list(columns) and 0 <= (end_day - fitted_day).days < refit_days:
+            positions = cache['positions']
+            new_mask = np.array([rid not in positions for rid in row_ids], dtype=bool)
+            dr_data = np.empty((len(row_ids), UMAP_PARAMS["n_components"]), dtype=np.float64)
+            if (~new_mask).any():
+                dr_data[~new_mask] = np.array([positions[rid] for rid, is_new in zip(row_ids, new_mask) if not is_new])
+            if new_mask.any():
+                dr_data[new_mask] = cache['reducer'].transform(box_matrix[new_mask])
+            # 只保留当前窗口内的坐标，防止缓存无限增长
+            cache['positions'] = {rid: dr_data[i] for i, rid in enumerate(row_ids)}
+            save_pickle_cache(cache_path, cache)
+            logger.info(f"box {box_id}: reused reducer fitted on {cache['fitted_date']}, transformed {int(new_mask.sum())} new rows")
+            return box_id, dr_data
+
+    params = dict(UMAP_PARAMS)
+    params["n_jobs"] = threads
+    dr_model = UMAP(**params)
+    dr_data = dr_model.fit_transform(box_matrix)
+
+    if cache_path:
+        save_pickle_cache(cache_path, {
+            'reducer': dr_model,
+            'fitted_date': end_day.strftime('%Y-%m-%d'),
+            'columns': list(columns),
+            'positions': {rid: dr_data[i] for i, rid in enumerate(row_ids)},
+        })
+    return box_id, dr_data
+
+
+def perform_dim_reduction(station_data: dict, env_data: pd.DataFrame, station_name, end_date, repo_abs_path,time_window,
+                          workers=None, threads=None, reducer_cache=None, refit_days=None) ->list[pd.DataFrame]:
+    """
+    执行降维计算并构造结果模板，workers / threads / reducer_cache / refit_days 为 None 时读取对应的 DETECT_* 配置
     Returns:
         list[pd.DataFrame]: 降维结果列表
     """
+    if reducer_cache is None:
+        reducer_cache = detect_setting('DETECT_REDUCER_CACHE')
     construct_result_template(station_data, end_date, station_name, repo_abs_path)
     error_types = []
 
-    dr_inv_list, rdc_positions = perform_dim_reduction_calc(station_data, env_data, error_types, end_date,time_window)
+    cache_dir = os.path.join(repo_abs_path, 'data', station_name, 'models', 'umap') if reducer_cache else None
+    dr_inv_list, rdc_positions = perform_dim_reduction_calc(station_data, env_data, error_types, end_date,time_window,
+                                                            workers=workers, threads=threads, cache_dir=cache_dir, refit_days=refit_days)
 
-    save_dir = os.path.join(repo_abs_path,'data', station_name, "results")
-    file_path = os.path.join(save_dir, f"{end_date}.json")
 
-    update_identifier(file_path, error_types)
-    update_rdc_positions(file_path, rdc_positions)
+    update_identifier(repo_abs_path, station_name, end_date, error_types)
+    update_rdc_positions(repo_abs_path, station_name, end_date, rdc_positions)
     
     return dr_inv_list
 
-def perform_dim_reduction_calc(station_data: dict, env_data: pd.DataFrame, error_types: list, end_date, time_window) ->list[pd.DataFrame]:
+def build_ratio_tensor(string_columns: dict, env_data: pd.DataFrame, date_index: pd.DatetimeIndex, start_h=START_HOUR, end_h=END_HOUR):
+    """
+    一次性构造全场站的 (组串 × 天 × 小时) 电流/辐照比值张量
+
+    Args:
+        string_columns: {逆变器key: 以时间为索引、列为组串编号的电流 DataFrame}
+        env_data: 以时间为索引、包含 rad 列的辐照数据
+        date_index: 时间窗口内的日期序列
+        start_h, end_h: 小时窗口（闭区间）
+    Returns:
+        tuple: (组串编号列表, ndarray[组串, 天, 小时], 小时列表)
+    """
+    if not string_columns:
+        return [], np.zeros((0, len(date_index), 0)), []
+
+    frames = [df[~df.index.duplicated(keep='first')] for df in string_columns.values()]
+    wide = pd.concat(frames, axis=1)
+    wide = wide.iloc[wide.index.indexer_between_time(start_h, end_h)]
+
+    rad = env_data["rad"]
+    rad = rad[~rad.index.duplicated(keep='first')].reindex(wide.index)
+    # 辐照为 0 或缺失时比值记为 0
+    ratio = wide.div(rad.where(rad != 0), axis=0).replace([np.inf, -np.inf], np.nan)
+
+    ratio.index = pd.MultiIndex.from_arrays([ratio.index.normalize(), ratio.index.hour], names=["date", "hour"])
+    ratio = ratio.groupby(level=["date", "hour"]).mean()
+
+    hours = sorted(ratio.index.get_level_values("hour").unique())
+    full_index = pd.MultiIndex.from_product([date_index, hours], names=["date", "hour"])
+    values = ratio.reindex(full_index).fillna(0).to_numpy(dtype=np.float64)
+
+    # (天*小时, 组串) -> (组串, 天, 小时)
+    tensor = values.reshape(len(date_index), len(hours), values.shape[1]).transpose(2, 0, 1)
+    return list(ratio.columns), tensor, hours
+
+
+def perform_dim_reduction_calc(station_data: dict, env_data: pd.DataFrame, error_types: list, end_date, time_window,
+                               workers=None, threads=None, cache_dir=None, refit_days=None) ->list[pd.DataFrame]:
+    if workers is None:
+        workers = detect_setting('DETECT_UMAP_WORKERS')
+    if threads is None:
+        threads = detect_setting('DETECT_UMAP_THREADS')
+    if refit_days is None:
+        refit_days = detect_setting('DETECT_REFIT_DAYS')
     rdc_positions = {} 
     start_h = START_HOUR
     end_h = END_HOUR
@@ -79,22 +230,18 @@ def perform_dim_reduction_calc(station_data: dict, env_data: pd.DataFrame, error
     # skip_box_list = ["002", "003", "004", "005", "006", "007", "008", "011", "015", "038"]
     # SELECT_BOX = ["012","013"]
 
-    wt_data = env_data.between_time(start_h, end_h)
-    box_groups = {}
+    string_columns = {}
 
     for key, inv_data in station_data.items():
         box_id, inv_id = key.split("-")
         # if box_id not in SELECT_BOX:
         #     continue
-        if box_id not in box_groups:
-            box_groups[box_id] = dict()
-        if inv_id not in box_groups[box_id]:
-            box_groups[box_id][inv_id] = dict()
 
         inv_data = inv_data.copy()
         inv_data["time"] = pd.to_datetime(inv_data["time"])
         inv_data.set_index("time", inplace=True)
         cols = inv_data.columns
+        normal_cols = {}
 
         for col in cols:
             string_id = col.split('输入电流')[0].replace('PV', '').zfill(3)
@@ -116,40 +263,54 @@ def perform_dim_reduction_calc(station_data: dict, env_data: pd.DataFrame, error
             else:
                 error_types.append(error_info)  # 记录正常状态
 
-            arr_data = inv_data[[col]].between_time(start_h, end_h)
-            arr_df = arr_data.join(wt_data)
-            arr_df["i"] = ((arr_df[col]/arr_df["rad"].replace(0, float('nan')))).fillna(0)
+            normal_cols[col] = f"{box_id}-{inv_id}-{string_id}"
 
-            dr_df = pd.DataFrame()
-            for t, g in arr_df["i"].groupby(arr_df["i"].index.date):
-                tmp_df = g.to_frame().transpose()
-                tmp_df.index = pd.DatetimeIndex([t])
-                tmp_df.columns = [h for h in g.index.hour]
-                dr_df = pd.concat([dr_df, tmp_df], axis=0)
+        if normal_cols:
+            string_columns[key] = inv_data[list(normal_cols.keys())].rename(columns=normal_cols)
 
-            box_groups[box_id][inv_id][string_id] = dr_df
+    end_day = pd.to_datetime(end_date).normalize()
+    date_index = pd.date_range(end=end_day, periods=days, freq='D')
+    device_ids, ratio_tensor, hours = build_ratio_tensor(string_columns, env_data, date_index, start_h, end_h)
 
     dr_out_data = dict()
-
-    for box_id, box_data in box_groups.items():
-        if len(box_data) == 0:
-            continue 
-
-        dr_df_list = []
-        dr_id_list = []
-        for inv_id, inv_data in box_data.items():
-            for string_id, dr_df in inv_data.items():
-                dr_df_list.append(dr_df)
-                dr_id_list.append(f"{box_id}-{inv_id}-{string_id}")
-        box_dr_df = pd.concat(dr_df_list, axis=0)
-
-        if box_dr_df.isnull().values.any():
-            print("数据包含 NaN 值，需要进行处理。")
-            box_dr_df = box_dr_df.fillna(0)
-        
-        dr_model = UMAP(**UMAP_PARAMS)
-        dr_data = dr_model.fit_transform(box_dr_df)
-
+    box_tasks = dict()
+    date_strs = date_index.strftime('%Y-%m-%d')
+
+    # 同一箱变的组串在张量中连续取出，reshape 成 (组串数*天数, 小时数) 作为降维输入
+    box_of_device = np.array([device_id.split("-")[0] for device_id in device_ids])
+    if len(hours) == 0:
+        logger.warning("no string data within the hour window, skip dim reduction")
+        box_of_device = box_of_device[:0]
+    for box_id in pd.unique(box_of_device):
+        idx = np.flatnonzero(box_of_device == box_id)
+        dr_id_list = [device_ids[i] for i in idx]
+        box_matrix = ratio_tensor[idx].reshape(-1, len(hours))
+        row_ids = [f"{device_id}@{d}" for device_id in dr_id_list for d in date_strs]
+        box_tasks[box_id] = (box_matrix, row_ids, list(hours), dr_id_list)
+
+    # 各箱变之间相互独立，使用进程池并行降维
+    box_results = dict()
+    workers = max(1, min(workers, len(box_tasks)))
+    start = datetime.now()
+    if workers == 1:
+        # 在当前进程内执行，只在降维期间限制 BLAS/OpenMP 线程数，结束后恢复，不影响流水线的其他阶段
+        with threadpool_limits(limits=threads):
+            for box_id, (box_matrix, row_ids, columns, _) in box_tasks.items():
+                cache_path = os.path.join(cache_dir, f"{box_id}.pkl") if cache_dir else None
+                box_results[box_id] = reduce_box(box_id, box_matrix, row_ids, columns, end_date, threads, cache_path, refit_days)[1]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker_threads, initargs=(threads,)) as executor:
+            futures = []
+            for box_id, (box_matrix, row_ids, columns, _) in box_tasks.items():
+                cache_path = os.path.join(cache_dir, f"{box_id}.pkl") if cache_dir else None
+                futures.append(executor.submit(reduce_box, box_id, box_matrix, row_ids, columns, end_date, threads, cache_path, refit_days))
+            for future in futures:
+                box_id, dr_data = future.result()
+                box_results[box_id] = dr_data
+    logger.info(f"dim reduction of {len(box_tasks)} boxes finished with {workers} workers in {(datetime.now() - start).total_seconds():.2f}s")
+
+    for box_id, dr_data in box_results.items():
+        dr_id_list = box_tasks[box_id][3]
         for i in range(int(len(dr_data)/days)):
             tmp_df = pd.DataFrame(dr_data[i*days:(i+1)*days], columns=["x", "y"])
             device_id = dr_id_list[i]
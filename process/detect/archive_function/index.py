@@ -47,12 +47,19 @@ TIME_WINDOW = 30
 #     return 200
 
 
-def detect_schedule(station_name, end_date, repo_abs_path, time_window=30):
+def detect_schedule(station_name, end_date, repo_abs_path, time_window=30,
+                    umap_workers=None, umap_threads=None, reducer_cache=None, refit_days=None,
+                    score_workers=None):
     """
     执行光伏组串异常检测和劣化分析
     
     Args:
         save_dir: 数据缓存目录，默认为 "data_cache"
+        umap_workers: 箱变级降维的进程数，为 None 时读取 DETECT_UMAP_WORKERS
+        umap_threads: 每个降维进程内的线程数，为 None 时读取 DETECT_UMAP_THREADS
+        reducer_cache: 是否复用前一晚拟合的降维模型（仅对新增天数 transform），为 None 时读取 DETECT_REDUCER_CACHE
+        refit_days: 复用降维模型的最长天数，超过后全量重拟合，为 None 时读取 DETECT_REFIT_DAYS
+        score_workers: 异常/劣化评分按逆变器并行的进程数，为 None 时读取 DETECT_SCORE_WORKERS
         
     Returns:
         bool: 处理成功返回 True，失败返回 False
@@ -75,21 +82,26 @@ def detect_schedule(station_name, end_date, repo_abs_path, time_window=30):
     env_data = get_env_data(station_name=station_name, repo_abs_path=repo_abs_path, start_window_timestamp=start_window_timestamp,end_window_timestamp=end_window_timestamp)
     # 执行降维计算
     print("开始读取辐照数据")
-    dr_inv_list = perform_dim_reduction(station_data, env_data, station_name, end_date, repo_abs_path,time_window)
+    dr_inv_list = perform_dim_reduction(station_data, env_data, station_name, end_date, repo_abs_path,time_window,
+                                        workers=umap_workers, threads=umap_threads, reducer_cache=reducer_cache, refit_days=refit_days)
     print("辐照数据读取成功")
     # 计算异常值
     print("开始计算组串异常劣化情况")
-    ano_st_df = calc_anomaly_score(dr_inv_list,station_name,end_date, repo_abs_path)
+    ano_st_df = calc_anomaly_score(dr_inv_list,station_name,end_date, repo_abs_path, workers=score_workers)
     # 计算劣化率
-    deg_st_df = calc_deg_score(dr_inv_list, ano_st_df, station_name, end_date, repo_abs_path)
+    deg_st_df = calc_deg_score(dr_inv_list, ano_st_df, station_name, end_date, repo_abs_path, workers=score_workers)
     print("组串异常劣化情况计算完成")
 
     return 200
 
 if __name__ == '__main__':
+    from dotenv import load_dotenv
+
     station_name = 'datu'
     end_date = '2024-08-01'
     repo_abs_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    # 与 app.py 相同的配置文件，DETECT_* 配置在运行时读取
+    load_dotenv(os.path.join(repo_abs_path, 'setting', f".env.{os.getenv('APP_ENV', 'development').strip()}"))
     time_window=30
     detect_schedule(station_name=station_name, end_date=end_date, repo_abs_path=repo_abs_path, time_window=time_window)
         
@@ -0,0 +1,34 @@
+import os
+import pickle
+import logging
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+
+def load_pickle_cache(cache_path, default=None):
+    """
+    读取模型缓存（pickle），文件不存在或读取失败时返回 default
+    """
+    if not cache_path or not os.path.exists(cache_path):
+        return default
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.error(f"load model cache failed: {cache_path}, {e}")
+        return default
+
+
+def save_pickle_cache(cache_path, cache):
+    """
+    写入模型缓存：先写临时文件再替换，避免并发读取到半个文件
+    """
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.error(f"save model cache failed: {cache_path}, {e}")
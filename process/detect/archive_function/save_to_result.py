@@ -1,14 +1,8 @@
-import json
-from datetime import datetime
-import os
-import pandas as pd
+from schema.results_store import upsert_string_fields, list_device_ids
 
-PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
-SAVE_DIR = os.path.join(PROJECT_ROOT, "data")
-
-def construct_result_template(station_data: dict, end_date: str, station_name) ->dict:
+def construct_result_template(station_data: dict, end_date: str, station_name, repo_abs_path) ->dict:
     """
-    构造结果数据模板
+    构造结果数据模板，写入场站结果库
     Args:
         station_data: 原始电气量数据字典
         end_date: 结果日期，默认使用 END_DATE
@@ -47,89 +41,60 @@ def construct_result_template(station_data: dict, end_date: str, station_name) -
                     "anomaly_dates": []          # 待填充
                 }
     
-    save_dir = os.path.join(SAVE_DIR, station_name, "results")
-    file_path = os.path.join(save_dir, f"{end_date}.json")
-    
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(result_template, f, indent=4, ensure_ascii=False)
+    upsert_string_fields(repo_abs_path, station_name, end_date, result_template["results"])
        
     return result_template
 
-def update_anomaly_scores(json_path, anomaly_data):
-    """
-    更新JSON文件中的异常分数
-    
-    Args:
-        json_path (str): JSON文件路径
-        anomaly_data (list): 异常分数数据列表，每个元素应包含 'pid' 和 'count' 字段
+def update_degradation_rates(repo_abs_path, station_name, date, degradation_data):
     """
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    for row in anomaly_data:
-        device_id = row['pid']  
-        if device_id in data['results']:
-            data['results'][device_id]['anomaly_score'] = float(row['count'])
-    
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    更新结果库中的劣化率
 
-def update_degradation_rates(json_path, degradation_data):
-    """
-    更新JSON文件中的劣化率
-    
     Args:
-        json_path (str): 目标JSON文件路径
+        date: 结果日期
         degradation_data (dict): 劣化率数据字典，格式为 {pid: rate}
     """
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    for device_id, rate in degradation_data.items():
-        if device_id in data['results']:
-            formatted_rate = f"{float(rate) * 100:.2f}%"
-            data['results'][device_id]['degradation_rate'] = formatted_rate
-    
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    device_ids = set(list_device_ids(repo_abs_path, station_name, date))
+    rows = {device_id: {'degradation_rate': f"{float(rate) * 100:.2f}%"}
+            for device_id, rate in degradation_data.items() if device_id in device_ids}
+    upsert_string_fields(repo_abs_path, station_name, date, rows)
 
-def update_anomaly_dates(json_path, anomaly_dates_data):
+def update_anomaly_results(repo_abs_path, station_name, date, anomaly_data, anomaly_dates_data):
     """
-    更新JSON文件中的异常日期数组
-    
+    一次写入同时更新结果库中的异常分数和异常日期数组
+
     Args:
-        json_path (str): 目标JSON文件路径
+        date: 结果日期
+        anomaly_data (list): 异常分数数据列表，每个元素应包含 'pid' 和 'count' 字段
         anomaly_dates_data (dict): 异常日期数据字典，格式为 {bt_id: dates_list}
     """
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+    device_ids = set(list_device_ids(repo_abs_path, station_name, date))
+    rows = {}
+    for row in anomaly_data:
+        device_id = row['pid']
+        if device_id in device_ids:
+            rows.setdefault(device_id, {})['anomaly_score'] = float(row['count'])
+
     for device_id, dates in anomaly_dates_data.items():
-        if device_id in data['results']:
+        if device_id in device_ids:
             # 如果日期超过30个，只保留最后30个
-            if len(dates) > 30:
-                dates = dates[-30:]
-                print(f"设备 {device_id} 的异常日期超过30个，已截取最后30个日期。")
-            data['results'][device_id]['anomaly_dates'] = dates
-    
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+            rows.setdefault(device_id, {})['anomaly_dates'] = list(dates[-30:])
 
-def update_identifier(json_path, identifier_data):
+    upsert_string_fields(repo_abs_path, station_name, date, rows)
+
+def update_identifier(repo_abs_path, station_name, date, identifier_data):
     """
-    更新JSON文件中的异常标识符
-    
+    更新结果库中的异常标识符
+
     Args:
-        json_path (str): JSON文件路径
+        date: 结果日期
         identifier_data (list): 标识符数据列表，每个元素应包含 box_id, inverter_id, string_id, error_type
     """
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+    device_ids = set(list_device_ids(repo_abs_path, station_name, date))
+    rows = {}
     for row in identifier_data:
         device_id = f"{row['box_id'].zfill(3)}-{row['inverter_id'].zfill(3)}-{row['string_id'].zfill(3)}"
         
-        if device_id in data['results']:
+        if device_id in device_ids:
             # 确定异常标识符
             if not row['error_type']:
                 anomaly_identifier = "normal"
@@ -140,24 +105,22 @@ def update_identifier(json_path, identifier_data):
             else:
                 anomaly_identifier = "normal"
             
-            data['results'][device_id]['anomaly_identifier'] = anomaly_identifier
-    
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+            rows[device_id] = {'anomaly_identifier': anomaly_identifier}
+
+    upsert_string_fields(repo_abs_path, station_name, date, rows)
 
-def update_rdc_positions(json_path, rdc_data):
+def update_rdc_positions(repo_abs_path, station_name, date, rdc_data):
     """
-    更新JSON文件中的降维坐标
-    
+    更新结果库中的降维坐标
+
     Args:
-        json_path (str): 目标JSON文件路径
+        date: 结果日期
         rdc_data (dict): 降维坐标数据字典，格式为 {bt_id: {'x': [...], 'y': [...]}}
     """
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+    device_ids = set(list_device_ids(repo_abs_path, station_name, date))
+    rows = {}
     for device_id, coords in rdc_data.items():
-        if device_id in data['results']:
+        if device_id in device_ids:
             x_coords = coords['x'][-30:] if len(coords['x']) > 30 else coords['x']
             y_coords = coords['y'][-30:] if len(coords['y']) > 30 else coords['y']
             
@@ -166,7 +129,6 @@ def update_rdc_positions(json_path, rdc_data):
             while len(y_coords) < 30:
                 y_coords.append(y_coords[-1] if y_coords else 0.5)
             
-            data['results'][device_id]['rdc_posistion'] = list(zip(x_coords, y_coords))
-    
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+            rows[device_id] = {'rdc_posistion': [list(pair) for pair in zip(x_coords, y_coords)]}
+
+    upsert_string_fields(repo_abs_path, station_name, date, rows)
@@ -1,11 +1,16 @@
 import os
-import sqlite3
+import numpy as np
 import pandas as pd
-from sqlalchemy import or_
+from sqlalchemy import select
+from schema.sqlite import sqlite_connect
+from schema.columnar import fetch_columns
 import logging
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
+
+# 历史数据流式读取的批大小
+HISTORY_BATCH_SIZE = 50000
  
 def get_current_rad_df(repo_abs_path,station_name, history_timestamp_tuple, anomalous_ids, database_manager=None, station_model=None):
     current_df = get_current_df(repo_abs_path,station_name, history_timestamp_tuple, anomalous_ids)
@@ -20,7 +25,7 @@ def get_current_rad_df_orm(station_name, history_timestamp_tuple, anomalous_ids,
 def get_current_df(repo_abs_path, station_name, history_timestamp_tuple, anomalous_ids):
     database_path = os.path.join(repo_abs_path, 'database', f'{station_name}.db')
 
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
 
     # 构建 WHERE 子句
@@ -90,45 +95,45 @@ def get_current_df(repo_abs_path, station_name, history_timestamp_tuple, anomalo
     print(f"电气量数据读取完成，当前数据包含 {len(current_df)} 条记录")
     return current_df
 
+def _to_hourly(df, value_col, key_col=None):
+    """
+    转换为北京时间并按小时取均值；数据本身已经是整点且不重复时跳过聚合
+    """
+    keys = [key_col, 'timestamp'] if key_col else ['timestamp']
+    is_hourly = bool((df['timestamp'] % 3600 == 0).all()) and not df.duplicated(subset=keys).any()
+    if not is_hourly:
+        df = df.assign(timestamp=df['timestamp'] - df['timestamp'] % 3600)
+        df = df.groupby(keys, sort=False, as_index=False)[value_col].mean()
+    df['time'] = pd.to_datetime(df['timestamp'], unit='s') + pd.Timedelta(hours=8)
+    columns = [key_col, 'time', value_col] if key_col else ['time', value_col]
+    return df[columns].sort_values(columns[:-1], ignore_index=True)
+
 def get_current_df_orm(station_name, history_timestamp_tuple, anomalous_ids, database_manager=None, station_model=None):
     _, _, string_info = station_model
 
     try:
         with database_manager.get_session(station_name) as session:
-            # 构建时间范围条件
-            time_filters = []
-            if history_timestamp_tuple:
-                for start_ts, end_ts in history_timestamp_tuple:
-                    time_filters.append(
-                        (string_info.timestamp >= start_ts) & (string_info.timestamp <= end_ts)
-                    )
-            # 构建 device_id 条件
-            query = session.query(
-                string_info.timestamp,
-                string_info.device_id,
-                string_info.intensity
-            )
-            if time_filters:
-                query = query.filter(or_(*time_filters))
-            if anomalous_ids:
-                query = query.filter(string_info.device_id.in_(anomalous_ids))
-
-            rows = query.all()
-            processed_rows = []
-            for row in rows:
-                row = list(row)
-                if row[2] is None:
-                    row[2] = 0.0
-                processed_rows.append(tuple(row))
-
-            current_df = pd.DataFrame(processed_rows, columns=['timestamp', 'device_id', 'intensity'])
+            # 每个时间窗口（两年前、一年前、当年）单独执行一次主键范围查询，不再使用 OR 拼接
+            windows = history_timestamp_tuple or [(None, None)]
+            arrays = []
+            for start_ts, end_ts in windows:
+                stmt = select(string_info.timestamp, string_info.device_id, string_info.intensity)
+                if start_ts is not None:
+                    stmt = stmt.where(string_info.timestamp.between(start_ts, end_ts))
+                if anomalous_ids:
+                    stmt = stmt.where(string_info.device_id.in_(anomalous_ids))
+                arrays.append(fetch_columns(session, stmt, {'timestamp': np.int64, 'intensity': np.float64}, HISTORY_BATCH_SIZE))
+
+            current_df = pd.DataFrame({
+                'timestamp': np.concatenate([a['timestamp'] for a in arrays]),
+                'device_id': np.concatenate([a['device_id'] for a in arrays]),
+                'intensity': np.nan_to_num(np.concatenate([a['intensity'] for a in arrays]), nan=0.0),
+            })
             if current_df.empty:
                 logger.info("Current(I) data reading completed, contains 0 records")
                 return current_df
 
-            current_df['time'] = pd.to_datetime(current_df['timestamp'], unit='s') + pd.Timedelta(hours=8)
-            current_df.set_index('time', inplace=True)
-            current_df = current_df.groupby('device_id').resample('h').agg({'intensity': 'mean'}).reset_index()
+            current_df = _to_hourly(current_df, 'intensity', key_col='device_id')
             logger.info(f"Current(I) data reading completed, contains {len(current_df)} records")
             return current_df
     except Exception as e:
@@ -138,7 +143,7 @@ def get_current_df_orm(station_name, history_timestamp_tuple, anomalous_ids, dat
 def get_rad_df(repo_abs_path, station_name, history_timestamp_tuple=None):
     database_path = os.path.join(repo_abs_path, 'database', f'{station_name}.db')
 
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
 
     # 构建 WHERE 子句
@@ -197,38 +202,25 @@ def get_rad_df_orm(station_name, history_timestamp_tuple=None, database_manager=
 
     try:
         with database_manager.get_session(station_name) as session:
-            # 构建时间范围条件
-            time_filters = []
-            if history_timestamp_tuple:
-                for start_ts, end_ts in history_timestamp_tuple:
-                    time_filters.append(
-                        (station_info.timestamp >= start_ts) & (station_info.timestamp <= end_ts)
-                    )
-            query = session.query(
-                station_info.timestamp,
-                station_info.irradiance
-            )
-            if time_filters:
-                query = query.filter(or_(*time_filters))
-
-            rows = query.all()
-            processed_rows = []
-            for row in rows:
-                row = list(row)
-                if row[1] is None:
-                    row[1] = 0.0
-                processed_rows.append(tuple(row))
-
-            rad_df = pd.DataFrame(processed_rows, columns=['timestamp', 'irradiance'])
+            windows = history_timestamp_tuple or [(None, None)]
+            arrays = []
+            for start_ts, end_ts in windows:
+                stmt = select(station_info.timestamp, station_info.irradiance)
+                if start_ts is not None:
+                    stmt = stmt.where(station_info.timestamp.between(start_ts, end_ts))
+                arrays.append(fetch_columns(session, stmt, {'timestamp': np.int64, 'irradiance': np.float64}, HISTORY_BATCH_SIZE))
+
+            rad_df = pd.DataFrame({
+                'timestamp': np.concatenate([a['timestamp'] for a in arrays]),
+                'irradiance': np.nan_to_num(np.concatenate([a['irradiance'] for a in arrays]), nan=0.0),
+            })
             if rad_df.empty:
                 logger.info("Radiation data reading completed, current data contains 0 records")
                 return rad_df
 
-            rad_df['time'] = pd.to_datetime(rad_df['timestamp'], unit='s') + pd.Timedelta(hours=8)
-            rad_df.set_index('time', inplace=True)
-            rad_df = rad_df.resample('h').agg({'irradiance': 'mean'}).reset_index()
+            rad_df = _to_hourly(rad_df, 'irradiance')
             logger.info(f"Radiation data reading completed, current data contains {len(rad_df)} records")
             return rad_df
     except Exception as e:
         logger.error(f"Error in get_rad_df_orm: {e}")
-        return pd.DataFrame(columns=['timestamp', 'irradiance', 'time'])
\ No newline at end of file
+        return pd.DataFrame(columns=['timestamp', 'irradiance', 'time'])
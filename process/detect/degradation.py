@@ -46,6 +46,80 @@ def compute_degradation_score(string_id, end_date, time_window, current_df, rad_
 
 
 
+def compute_degradation_scores(string_ids, end_date, time_window, current_df, rad_df):
+    """
+    批量计算多个组串的劣化分数
+
+    每个年份窗口（当年、一年前、两年前）只做一次电流与辐照的对齐，
+    按组串分组完成首尾过滤，并以 cov/var 闭式解同时求出所有组串的斜率
+
+    Args:
+        string_ids: 组串编号列表，形如 ["001-002-003", ...]
+        end_date: 截止日期，字符串或 datetime
+        time_window: 时间窗口天数
+        current_df: 小时级电流数据，包含 time, device_id, intensity
+        rad_df: 小时级辐照数据，包含 time, irradiance
+    Returns:
+        dict: {组串编号: 劣化分数}
+    """
+    if isinstance(end_date, str):
+        end_date = datetime.strptime(end_date, '%Y-%m-%d')
+
+    string_index = pd.Index(list(string_ids))
+    if len(string_index) == 0 or current_df.empty or rad_df.empty:
+        return {string_id: 0 for string_id in string_index}
+
+    current_df = current_df.loc[current_df['device_id'].isin(string_index), ['time', 'device_id', 'intensity']]
+    rad_df = rad_df[['time', 'irradiance']]
+    present = string_index.isin(current_df['device_id'].unique())
+    slopes = np.zeros((len(string_index), 3))
+
+    for previous_year in range(3):
+        end_date_i = end_date - timedelta(days=previous_year*365 + 1)
+        end_time = end_date_i.replace(hour=23, minute=59, second=59)
+        start_date_i = end_date - timedelta(days=previous_year*365 + time_window)
+        start_time = start_date_i.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        year_current_df = current_df[(current_df['time'] >= start_time) & (current_df['time'] <= end_time)]
+        year_rad_df = rad_df[(rad_df['time'] >= start_time) & (rad_df['time'] <= end_time)]
+        current_rad_df = year_current_df.merge(year_rad_df, on='time', how='inner')
+        current_rad_df = current_rad_df[(current_rad_df['time'].dt.hour >= start_hour) & (current_rad_df['time'].dt.hour <= end_hour)]
+
+        current_rad_df = batch_head_tail_filter(current_rad_df)
+        slopes[:, previous_year] = batch_linear_fit(current_rad_df).reindex(string_index).fillna(0).to_numpy()
+
+    return {
+        string_id: calc_degradation_score(list(slopes[k])) if present[k] else 0
+        for k, string_id in enumerate(string_index)
+    }
+
+def batch_head_tail_filter(df, cols=('irradiance', 'intensity')):
+    # head_tail_filter 的分组版本：每个组串分别按自身的最大值过滤
+    if df.empty:
+        return df
+    grouped = df.groupby('device_id')
+    mask = np.ones(len(df), dtype=bool)
+    for col in cols:
+        col_max = grouped[col].transform('max')
+        mask &= ((df[col] > 0) & (df[col] <= 0.98*col_max)).to_numpy()
+    return df[mask]
+
+def batch_linear_fit(df):
+    # 按组串求 y = ax + b 的斜率 a = cov(x, y) / var(x)，样本不足或方差为 0 时为 0
+    if df.empty:
+        return pd.Series(dtype=float)
+    keys = df['device_id'].to_numpy()
+    fit_df = pd.DataFrame({
+        'device_id': keys,
+        'x': transform_rad(df['irradiance'].to_numpy(dtype=float)),
+        'y': transform_intensity(df['intensity'].to_numpy(dtype=float)),
+    })
+    grouped = fit_df.groupby('device_id')
+    x_c = fit_df['x'] - grouped['x'].transform('mean')
+    y_c = fit_df['y'] - grouped['y'].transform('mean')
+    sums = pd.DataFrame({'device_id': keys, 'sxy': x_c*y_c, 'sxx': x_c*x_c}).groupby('device_id').sum()
+    return (sums['sxy'] / sums['sxx'].where(sums['sxx'] > 0)).fillna(0)
+
 def transform_rad(data):
     # # data is one column of dataframe, such as df[column1]
     data = np.log1p(data)  # log1p handles zero values
@@ -1,8 +1,7 @@
 from datetime import datetime, timedelta
 import time
-import json
-import json
 import pytz  # 引入pytz库来处理时区
+from schema.results_store import load_string_fields, upsert_string_fields, list_device_ids
 
 def get_time_range(process_date, previous_day=0):
     # 解析输入的日期字符串为 datetime 对象
@@ -28,10 +27,8 @@ def get_history_timestamp(process_date, time_window=30):
     two_years_ago_start, two_years_ago_end = get_time_range(two_years_ago, previous_day=time_window)
     return (two_years_ago_start, two_years_ago_end), (one_year_ago_start, one_year_ago_end), (start_timestamp, end_timestamp)
 
-def get_anomalous_string_ids(result_path):
-    with open(result_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    results = data.get('results', {})
+def get_anomalous_string_ids(repo_abs_path, station_name, process_date):
+    results = load_string_fields(repo_abs_path, station_name, process_date, fields=['diagnosis_results'])
     anomalous_ids = [
         sid for sid, info in results.items()
         if info.get('diagnosis_results') and len(info.get('diagnosis_results')) > 0
@@ -39,29 +36,11 @@ def get_anomalous_string_ids(result_path):
     return anomalous_ids
 
 
-def update_degradation_scores(string_id, degradation_score,result_path):
-    with open(result_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    results = data.get('results', {})
-    results[string_id]['degradation_score'] = degradation_score
-    with open(result_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-def update_degradation_scores_dict(degradation_dict, result_path):
-    with open(result_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    results = data.get('results', {})
-    for key, value in degradation_dict.items():
-        if key in results:
-            results[key]['degradation_score'] = value
-
-    data['results'] = results
-    # 将更新后的数据写回到文件  
-    with open(result_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False)
-
-
-
-
-
+def update_degradation_scores(string_id, degradation_score, repo_abs_path, station_name, process_date):
+    upsert_string_fields(repo_abs_path, station_name, process_date, {string_id: {'degradation_score': degradation_score}})
 
+def update_degradation_scores_dict(degradation_dict, repo_abs_path, station_name, process_date):
+    # 只更新已有组串的劣化率
+    existing_ids = set(list_device_ids(repo_abs_path, station_name, process_date))
+    upsert_string_fields(repo_abs_path, station_name, process_date,
+                         {key: {'degradation_score': value} for key, value in degradation_dict.items() if key in existing_ids})
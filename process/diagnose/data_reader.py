@@ -3,6 +3,10 @@ import time
 from datetime import datetime, timedelta
 import logging
 
+import numpy as np
+from sqlalchemy import select
+from schema.columnar import fetch_columns
+
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
 
@@ -73,39 +77,36 @@ def read_data_orm(station_name, update_time, database_manager=None, station_mode
 
     try:
         with database_manager.get_session(station_name) as session:
-            rows = (
-                session.query(
+            stmt = (
+                select(
                     string_info.timestamp,
                     string_info.string_id,
                     string_info.inverter_id,
                     string_info.box_id,
                     string_info.intensity
                 )
-                .filter(string_info.timestamp >= start_date)
-                .filter(string_info.timestamp <= end_date)
-                .all()
+                .where(string_info.timestamp >= start_date)
+                .where(string_info.timestamp <= end_date)
             )
-
-            # 处理空值
-            processed_rows = []
-            for row in rows:
-                # row: (timestamp, string_id, inverter_id, box_id, intensity)
-                row = list(row)
-                if row[4] is None:
-                    row[4] = 0.0
-                processed_rows.append(tuple(row))
-
-            if len(processed_rows) == 0:
-                return [], False
-
-            timestamps = [datetime.fromtimestamp(r[0]) for r in processed_rows]
-            min_timestamp = min(timestamps)
-            max_timestamp = max(timestamps)
-
-            if (max_timestamp - min_timestamp) >= timedelta(days=29):
-                return processed_rows, True
-            else:
-                return processed_rows, False
+            columns = fetch_columns(session, stmt, {'timestamp': np.int64, 'intensity': np.float64})
+
+        timestamps = columns['timestamp']
+        if len(timestamps) == 0:
+            return [], False
+
+        # 处理空值，并按 (timestamp, string_id, inverter_id, box_id, intensity) 组装行
+        intensity = np.nan_to_num(columns['intensity'], nan=0.0)
+        processed_rows = list(zip(
+            timestamps.tolist(),
+            columns['string_id'].tolist(),
+            columns['inverter_id'].tolist(),
+            columns['box_id'].tolist(),
+            intensity.tolist()
+        ))
+
+        # 数据覆盖是否满 29 天，直接在整型时间戳上比较
+        covered = int(timestamps.max()) - int(timestamps.min()) >= timedelta(days=29).total_seconds()
+        return processed_rows, covered
 
     except Exception as e:
         logger.error(f"Error reading data from database: {e}")
@@ -6,6 +6,7 @@ from process.diagnose.data_transformer import trans_data_byStation, detect_anoma
 from process.diagnose.model_predictor import model_byStation
 from process.diagnose.result_saver import save_results, save_anomaly_identifiers, save_history_intensity
 import logging
+from process.metrics import span
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
@@ -75,33 +76,41 @@ def diagnosis_schedule_orm(process_date, station_name, repo_abs_path, database_m
     
     # 1. 数据读取
     logger.info(f"\t{station_name}_step1 start: read data")
-    data, is_30_days = read_data_orm(station_name, update_time, database_manager, station_model)
+    with span('query', station=station_name, stage='diagnose') as s:
+        data, is_30_days = read_data_orm(station_name, update_time, database_manager, station_model)
+        s.set(rows=len(data))
     if not is_30_days:
         logger.warning(f"\t{station_name}_step1 warning: insufficient historical data")
         return
     if data:
         logger.info(f"\t{station_name}_step1 completed: read {len(data)} records")
 
-        save_history_intensity(data, station_name, update_time, repo_abs_path)
+        with span('results_write', station=station_name, stage='diagnose', step='history_intensity'):
+            save_history_intensity(data, station_name, update_time, repo_abs_path)
         # 2. 异常检测
         logger.info(f"\t{station_name}_step2 start: detect anomalies")
-        anomaly_identifiers = detect_anomalies_byStation(data)
+        with span('anomaly_detect', station=station_name, stage='diagnose'):
+            anomaly_identifiers = detect_anomalies_byStation(data)
 
         # 3. 保存异常标识结果
         logger.info(f"\t{station_name}_step3 start: save anomaly identifiers")
-        save_anomaly_identifiers(anomaly_identifiers, station_name, update_time, repo_abs_path)
+        with span('results_write', station=station_name, stage='diagnose', step='anomaly_identifiers'):
+            save_anomaly_identifiers(anomaly_identifiers, station_name, update_time, repo_abs_path)
 
         # 4. 数据转换
         logger.info(f"\t{station_name}_step4 start: transform data")
-        trans_data = trans_data_byStation(data, anomaly_identifiers)
+        with span('transform', station=station_name, stage='diagnose'):
+            trans_data = trans_data_byStation(data, anomaly_identifiers)
 
-        # 5. 模型预测
+        # 5. 模型预测（含模型加载）
         logger.info(f"\t{station_name}_step5 start: model prediction")
-        model_result = model_byStation(trans_data,repo_abs_path)
+        with span('inference', station=station_name, stage='diagnose'):
+            model_result = model_byStation(trans_data,repo_abs_path)
 
         # 6. 保存结果
         logger.info(f"\t{station_name}_step6 start: save results")
-        save_results(model_result, station_name, update_time, repo_abs_path)
+        with span('results_write', station=station_name, stage='diagnose', step='results'):
+            save_results(model_result, station_name, update_time, repo_abs_path)
 
         logger.info(f"{station_name}_diagnosis completed at {process_date}")
     else:
@@ -1,9 +1,8 @@
-import os
-import json
 import pandas as pd
 from datetime import datetime, timedelta
 from collections import defaultdict
 import logging
+from schema.results_store import upsert_string_fields, list_device_ids
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
@@ -19,41 +18,21 @@ def save_results(model_result, station_name, update_time, repo_abs_path):
         repo_abs_path: 项目根路径
     """
     date_str = update_time.strftime('%Y-%m-%d') 
-    results_folder = os.path.join(repo_abs_path, 'data', station_name, 'results')
-    
-    # 确保目录存在
-    os.makedirs(results_folder, exist_ok=True)
-    
-    json_file_path = os.path.join(results_folder, f'{date_str}.json')
 
-    if os.path.exists(json_file_path):
-        with open(json_file_path, 'r', encoding='utf-8') as json_file:
-            try:
-                data = json.load(json_file)
-                # for key in data['results']:
-                #     data['results'][key]['diagnosis_results'] = ['0']
-                for key, model_info in model_result.items():
-                    existing_obj = data['results'].get(key)
-                    if existing_obj:
-                        existing_obj['diagnosis_results'] = model_info['diagnosis_results']
-                    else:
-                        data['results'][key] = model_info
-                with open(json_file_path, 'w', encoding='utf-8') as json_file:
-                    json.dump(data, json_file, ensure_ascii=False)
-            except json.JSONDecodeError:
-                logger.error('Error decoding JSON from the file.')
-    else:
-        # 创建新的 JSON 文件
-        new_data = {
-            'date': date_str,
-            'results': model_result  
-        }
-        with open(json_file_path, 'w', encoding='utf-8') as json_file:
-            json.dump(new_data, json_file, ensure_ascii=False)
+    # 已有的组串只更新 diagnosis_results，新组串写入完整结果
+    existing_ids = set(list_device_ids(repo_abs_path, station_name, date_str))
+    rows = {}
+    for key, model_info in model_result.items():
+        if key in existing_ids:
+            rows[key] = {'diagnosis_results': model_info['diagnosis_results']}
+        else:
+            rows[key] = model_info
+    upsert_string_fields(repo_abs_path, station_name, date_str, rows)
+    logger.info(f"Diagnosis results of {len(rows)} strings have been saved to the results store: {station_name} {date_str}")
 
 def save_anomaly_identifiers(anomaly_identifiers, station_name, update_time, repo_abs_path):
     """
-    保存异常标识结果到JSON文件，与diagnosis_results保存在同一个文件中
+    保存异常标识结果，与diagnosis_results保存在同一个结果库中
     
     Args:
         anomaly_identifiers: 异常标识字典
@@ -62,62 +41,11 @@ def save_anomaly_identifiers(anomaly_identifiers, station_name, update_time, rep
         repo_abs_path: 项目根路径
     """
     date_str = update_time.strftime('%Y-%m-%d')
-    results_folder = os.path.join(repo_abs_path, 'data', station_name, 'results')
-    
-    # 确保目录存在
-    os.makedirs(results_folder, exist_ok=True)
-    
-    json_file_path = os.path.join(results_folder, f'{date_str}.json')
-    logger.info(f"save anomaly identifiers to: {json_file_path}")
-
-    # 重新组织anomaly_identifiers的格式，使其与diagnosis_results的结构一致
-    formatted_anomaly_data = {}
-    for unique_key, anomaly_type in anomaly_identifiers.items():
-        formatted_anomaly_data[unique_key] = {
-            'anomaly_identifier': anomaly_type
-        }
-    
-    if os.path.exists(json_file_path):
-        # 文件存在，读取并更新
-        with open(json_file_path, 'r', encoding='utf-8') as json_file:
-            try:
-                data = json.load(json_file)
-                
-                # 确保results字段存在
-                if 'results' not in data:
-                    logger.info("results not found, creating new results dictionary")
-                    data['results'] = {}
-                
-                # 为每个组串添加anomaly_identifier字段
-                for key, anomaly_info in formatted_anomaly_data.items():
-                    if key in data['results']:
-                        # print(f"正在更新组串 {key} 的anomaly_identifier: {anomaly_info['anomaly_identifier']}")
-                        # 如果组串已存在，添加anomaly_identifier字段
-                        data['results'][key]['anomaly_identifier'] = anomaly_info['anomaly_identifier']
-                    else:
-                        # 如果组串不存在，创建新条目
-                        logger.info(f"Creating new entry for string {key}")
-                        data['results'][key] = anomaly_info
-                
-                # 写回文件
-                with open(json_file_path, 'w', encoding='utf-8') as json_file:
-                    json.dump(data, json_file, ensure_ascii=False)
 
-                logger.info(f"Anomaly identifiers have been updated to the existing file: {json_file_path}")
-
-            except json.JSONDecodeError:
-                logger.error('Error decoding JSON from the file.')
-    else:
-        # 文件不存在，创建新文件
-        new_data = {
-            'date': date_str,
-            'results': formatted_anomaly_data
-        }
-        
-        with open(json_file_path, 'w', encoding='utf-8') as json_file:
-            json.dump(new_data, json_file, ensure_ascii=False)
-
-        logger.info(f"Anomaly identifiers have been saved to the new file: {json_file_path}")
+    # 只写入 anomaly_identifier 字段，组串不存在时新建
+    upsert_string_fields(repo_abs_path, station_name, date_str,
+                         {unique_key: {'anomaly_identifier': anomaly_type} for unique_key, anomaly_type in anomaly_identifiers.items()})
+    logger.info(f"Anomaly identifiers have been saved to the results store: {station_name} {date_str}")
 
     # 统计信息
     total_strings = len(anomaly_identifiers)
@@ -142,12 +70,6 @@ def save_history_intensity(data, station_name, update_time, repo_abs_path):
         repo_abs_path: 项目根路径
     """
     date_str = update_time.strftime('%Y-%m-%d')
-    results_folder = os.path.join(repo_abs_path, 'data', station_name, 'results')
-    
-    # 确保目录存在
-    os.makedirs(results_folder, exist_ok=True)
-    
-    json_file_path = os.path.join(results_folder, f'{date_str}.json')
     
     # 计算七天的时间范围
     end_time = update_time.replace(hour=23, minute=59, second=59)
@@ -213,45 +135,9 @@ def save_history_intensity(data, station_name, update_time, repo_abs_path):
             'history_intensity': intensity_list
         }
     
-    # 保存到JSON文件
-    if os.path.exists(json_file_path):
-        # 文件存在，读取并更新
-        with open(json_file_path, 'r', encoding='utf-8') as json_file:
-            try:
-                data = json.load(json_file)
-                
-                # 确保results字段存在
-                if 'results' not in data:
-                    data['results'] = {}
-                
-                # 为每个组串添加history_intensity字段
-                for key, intensity_info in history_intensity_data.items():
-                    if key in data['results']:
-                        # 如果组串已存在，添加history_intensity字段
-                        data['results'][key]['history_intensity'] = intensity_info['history_intensity']
-                    else:
-                        # 如果组串不存在，创建新条目
-                        data['results'][key] = intensity_info
-                
-                # 写回文件
-                with open(json_file_path, 'w', encoding='utf-8') as json_file:
-                    json.dump(data, json_file, ensure_ascii=False)
-
-                logger.info(f"Historical current data has been updated to the existing file: {json_file_path}")
-
-            except json.JSONDecodeError:
-                logger.error('Error decoding JSON from the file.')
-    else:
-        # 文件不存在，创建新文件
-        new_data = {
-            'date': date_str,
-            'results': history_intensity_data
-        }
-        
-        with open(json_file_path, 'w', encoding='utf-8') as json_file:
-            json.dump(new_data, json_file, ensure_ascii=False)
-
-        logger.info(f"Historical current data has been saved to the new file: {json_file_path}")
+    # 只写入 history_intensity 字段
+    upsert_string_fields(repo_abs_path, station_name, date_str, history_intensity_data)
+    logger.info(f"Historical current data has been saved to the results store: {station_name} {date_str}")
 
     # 统计信息
     total_strings = len(history_intensity_data)
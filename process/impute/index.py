@@ -1,16 +1,119 @@
 import pandas as pd
+import numpy as np
 import os
-from datetime import datetime, timedelta
-import sqlite3
+from datetime import timedelta
 import time
 from process.impute.utils import get_time_range, impute_and_fill_bulk
-from pypots.imputation import SAITS, iTransformer, FreTS
 # from model import impute # 测试用
 # from utils import get_date_data # 测试用
 
 import pytz
+import threading
+from collections import OrderedDict
+from sqlalchemy import select
+from schema.rollup import ensure_rollup_tables, missing_day_ranges, QUALITY_FIELDS, TZ_OFFSET_SECONDS, DAY_SECONDS
+from schema.columnar import fetch_dataframe
+from schema.ledger import latest_finished_at
+
+# /api/station/detail 结果缓存：按 (场站, 起止时间, 变量) 缓存，流水线写入质量统计的阶段完成后失效，
+# 另设有效期兜底（接口保存修复结果等流水线之外的写入）
+STATION_INFO_CACHE_ENTRIES = 64
+STATION_INFO_CACHE_TTL = 600
+QUALITY_STAGES = ('preprocess', 'impute')
+_station_info_cache = OrderedDict()
+_station_info_cache_lock = threading.Lock()
+
+
+def _build_quality_tree(df, station, variable):
+    """
+    按 组串 / 逆变器 / 箱变 三级聚合错误率和缺失率，组装为场站树
+
+    组串的比率为 计数合计 / (天数 * 24) 的百分比；逆变器、箱变、场站的比率为其下所有组串比率的平均值
+    """
+    error_col = 'error_count_intensity' if int(variable) == 0 else 'error_count_voltage'
+    missing_col = 'missing_count_intensity' if int(variable) == 0 else 'missing_count_voltage'
+    station_node = {'name': station, 'key': station, 'err_rate': 0, 'missing_rate': 0, 'children': []}
+
+    # 组串层级：每个 device_id 一次聚合，只对去重后的 device_id 拆分编号
+    strings = df.groupby('device_id').agg(
+        error_count=(error_col, 'sum'),
+        missing_count=(missing_col, 'sum'),
+        days=('timestamp', 'nunique'),
+    )
+    parts = strings.index.to_series().str.split('-')
+    strings = strings[(parts.str.len() == 3).to_numpy()]
+    if strings.empty:
+        return [station_node]
+    parts = parts[strings.index]
+    strings['box_id'] = parts.str[0].to_numpy()
+    strings['inverter_id'] = parts.str[1].to_numpy()
+    strings['string_id'] = parts.str[2].to_numpy()
+    total_hours = strings['days'].to_numpy() * 24
+    strings['err_rate'] = np.round(strings['error_count'].to_numpy() / total_hours * 100).astype(int)
+    strings['missing_rate'] = np.round(strings['missing_count'].to_numpy() / total_hours * 100).astype(int)
+    strings = strings.sort_values(['box_id', 'inverter_id', 'string_id'])
+
+    # 逆变器、箱变、场站层级：对组串比率求平均
+    rate_cols = ['err_rate', 'missing_rate']
+    inverter_rates = strings.groupby(['box_id', 'inverter_id'])[rate_cols].mean().round().astype(int)
+    box_rates = strings.groupby('box_id')[rate_cols].mean().round().astype(int)
+    inverter_rates = dict(zip(inverter_rates.index, inverter_rates.to_numpy().tolist()))
+    box_rates = dict(zip(box_rates.index, box_rates.to_numpy().tolist()))
+    station_rates = strings[rate_cols].mean().round().astype(int).tolist()
+    station_node['err_rate'], station_node['missing_rate'] = station_rates
+
+    # 按排序后的组串顺序组装树，逆变器和箱变节点通过字典查找
+    box_nodes = {}
+    inverter_nodes = {}
+    for box_id, inverter_id, string_id, err_rate, missing_rate in zip(
+            strings['box_id'].tolist(), strings['inverter_id'].tolist(), strings['string_id'].tolist(),
+            strings['err_rate'].tolist(), strings['missing_rate'].tolist()):
+        box_node = box_nodes.get(box_id)
+        if box_node is None:
+            box_err_rate, box_missing_rate = box_rates[box_id]
+            box_node = {'name': f'{box_id}号箱变', 'key': f'{station},{box_id}', 'err_rate': box_err_rate, 'missing_rate': box_missing_rate, 'children': []}
+            box_nodes[box_id] = box_node
+            station_node['children'].append(box_node)
+        inverter_node = inverter_nodes.get((box_id, inverter_id))
+        if inverter_node is None:
+            inverter_err_rate, inverter_missing_rate = inverter_rates[(box_id, inverter_id)]
+            inverter_node = {'name': f'{inverter_id}号逆变器', 'key': f'{station},{box_id},{inverter_id}', 'err_rate': inverter_err_rate, 'missing_rate': inverter_missing_rate, 'children': []}
+            inverter_nodes[(box_id, inverter_id)] = inverter_node
+            box_node['children'].append(inverter_node)
+        inverter_node['children'].append({
+            'name': f'{string_id}号组串',
+            'key': f'{station},{box_id},{inverter_id},{string_id}',
+            'err_rate': err_rate,
+            'missing_rate': missing_rate
+        })
+
+    return [station_node]
+
 
 def get_station_info_orm(station, variable, start_time, end_time, repo_abs_path, database_manager=None, impute_model=None):
+    """
+    场站数据质量概览（/api/station/detail），结果按 (场站, 起止时间, 变量) 缓存；返回的数据为只读
+    """
+    key = (station, start_time, end_time, variable)
+    version = latest_finished_at(database_manager, station, QUALITY_STAGES)
+    now = time.monotonic()
+    with _station_info_cache_lock:
+        entry = _station_info_cache.get(key)
+        if entry is not None and entry[0] == version and now - entry[1] < STATION_INFO_CACHE_TTL:
+            _station_info_cache.move_to_end(key)
+            return entry[2]
+
+    result = _get_station_info(station, variable, start_time, end_time, repo_abs_path, database_manager, impute_model)
+    # 查询失败时不缓存
+    if result is not None:
+        with _station_info_cache_lock:
+            _station_info_cache[key] = (version, now, result)
+            _station_info_cache.move_to_end(key)
+            while len(_station_info_cache) > STATION_INFO_CACHE_ENTRIES:
+                _station_info_cache.popitem(last=False)
+    return result
+
+def _get_station_info(station, variable, start_time, end_time, repo_abs_path, database_manager=None, impute_model=None):
     # 定义上海时区
     shanghai_tz = pytz.timezone('Asia/Shanghai')
     
@@ -26,132 +129,81 @@ def get_station_info_orm(station, variable, start_time, end_time, repo_abs_path,
     db_name = f'{station}_impute'
     
     try:            
-        with database_manager.get_session(db_name) as session:
-            # 查询数据
-            query = (
-                session.query(impute_model)
-                .filter(impute_model.timestamp >= start_timestamp)
-                .filter(impute_model.timestamp < end_timestamp)
-                .all()
+        # 已有质量统计的日期读取组串日汇总表，其余日期回退到 impute 库的 StringOverview
+        string_daily, _ = ensure_rollup_tables(database_manager, station)
+        quality_dtypes = {'timestamp': np.int64, **{col: np.float64 for col in QUALITY_FIELDS}}
+        with database_manager.get_session(station) as session:
+            stmt = (
+                select(
+                    string_daily.day.label('timestamp'),
+                    string_daily.device_id,
+                    *[getattr(string_daily, col) for col in QUALITY_FIELDS]
+                )
+                .where(string_daily.day >= start_timestamp)
+                .where(string_daily.day < end_timestamp)
+                .where(string_daily.error_count_intensity.isnot(None))
             )
-            if not query:
-                return {'station_info': [], 'overview_res': []}
-            
-            # 转换结果为 DataFrame
-            df = pd.DataFrame([{
-                'timestamp': item.timestamp,
-                'device_id': item.device_id,
-                'error_count_intensity': item.error_count_intensity,
-                'missing_count_intensity': item.missing_count_intensity,
-                'error_count_voltage': item.error_count_voltage,
-                'missing_count_voltage': item.missing_count_voltage
-            } for item in query])
+            df = fetch_dataframe(session, stmt, quality_dtypes)
+        covered_days = set(df['timestamp'].tolist())
+        missing_ranges = missing_day_ranges(covered_days, start_timestamp, end_timestamp - 1)
+        if missing_ranges:
+            with database_manager.get_session(db_name) as session:
+                stmt = (
+                    select(
+                        impute_model.timestamp,
+                        impute_model.device_id,
+                        *[getattr(impute_model, col) for col in QUALITY_FIELDS]
+                    )
+                    .where(impute_model.timestamp >= max(start_timestamp, missing_ranges[0][0]))
+                    .where(impute_model.timestamp < min(end_timestamp, missing_ranges[-1][1]))
+                )
+                fallback = fetch_dataframe(session, stmt, quality_dtypes)
+            if covered_days and not fallback.empty:
+                fallback_days = fallback['timestamp'] - (fallback['timestamp'] + TZ_OFFSET_SECONDS) % DAY_SECONDS
+                fallback = fallback[~fallback_days.isin(covered_days)]
+            df = pd.concat([df, fallback], ignore_index=True) if covered_days else fallback
+        if df.empty:
+            return {'station_info': [], 'overview_res': []}
 
-            # 计算overview_res
-            df['date'] = pd.to_datetime(df['timestamp'], unit='s')
-            
-            # 根据variable选择对应的列名
-            error_col = 'error_count_intensity' if variable == '0' else 'error_count_voltage'
-            missing_col = 'missing_count_intensity' if variable == '0' else 'missing_count_voltage'
-            
-            # 聚合计算
-            overview_df = df.groupby('date').agg({
-                error_col: 'sum',
-                missing_col: 'sum'
-            }).reset_index()
-            
-            # 重命名列并转换日期格式
-            overview_df.columns = ['date', 'error_value', 'missing_value']
-            overview_df['date'] = overview_df['date'].dt.strftime('%Y-%m-%d %H:%M:%S')
-            overview_res = overview_df.to_dict('records')
-
-
-            # 计算station_info
-            station_info = [{'name': station, 'key': station, 'err_rate': 0, 'missing_rate': 0, 'children': []}]
-            box_dict = {}
-
-            # 按设备号拆分并聚合
-            df['box_id'], df['inverter_id'], df['string_id'] = zip(*df['device_id'].apply(lambda x: x.split('-')))
-            for (box_id, inverter_id, string_id), group in df.groupby(['box_id', 'inverter_id', 'string_id']):
-                # 根据变量选择错误和缺失计数
-                if int(variable) == 0:  # 电流
-                    error_count = group['error_count_intensity'].sum()
-                    missing_count = group['missing_count_intensity'].sum()
-                else:  # 电压
-                    error_count = group['error_count_voltage'].sum()
-                    missing_count = group['missing_count_voltage'].sum()
-
-                # 计算组串的错误率和缺失率
-                days = len(group['date'].unique())
-                total_hours = days * 24
-                err_rate = round((error_count / total_hours) * 100) if total_hours > 0 else 0
-                missing_rate = round((missing_count / total_hours) * 100) if total_hours > 0 else 0
-
-                # 更新箱变信息
-                if box_id not in box_dict:
-                    box_dict[box_id] = {'name': f'{box_id}号箱变', 'key': f'{station},{box_id}', 'err_rate': 0, 'missing_rate': 0, 'children': []}
-
-                # 检查逆变器是否已存在
-                inverter_info = next((inv for inv in box_dict[box_id]['children'] if inv['key'] == f'{station},{box_id},{inverter_id}'), None)
-                if not inverter_info:
-                    inverter_info = {'name': f'{inverter_id}号逆变器', 'key': f'{station},{box_id},{inverter_id}', 'err_rate': 0, 'missing_rate': 0, 'children': []}
-                    box_dict[box_id]['children'].append(inverter_info)
-
-                # 添加组串信息
-                inverter_info['children'].append({
-                    'name': f'{string_id}号组串',
-                    'key': f'{station},{box_id},{inverter_id},{string_id}',
-                    'err_rate': err_rate,
-                    'missing_rate': missing_rate
-                })
-
-            # 计算逆变器和箱变的错误率和缺失率
-            total_err_count = 0
-            total_missing_count = 0
-            total_count = 0
-
-            for box_id, box_info in box_dict.items():
-                box_err_count = 0
-                box_missing_count = 0
-                box_total_count = 0
-
-                for inverter_info in box_info['children']:
-                    inverter_err_count = 0
-                    inverter_missing_count = 0
-                    inverter_total_count = 0
-
-                    for string_info in inverter_info['children']:
-                        inverter_err_count += string_info['err_rate']
-                        inverter_missing_count += string_info['missing_rate']
-                        inverter_total_count += 1
+        # 计算overview_res
+        df['date'] = pd.to_datetime(df['timestamp'], unit='s')
+        
+        # 根据variable选择对应的列名
+        error_col = 'error_count_intensity' if variable == '0' else 'error_count_voltage'
+        missing_col = 'missing_count_intensity' if variable == '0' else 'missing_count_voltage'
+        
+        # 聚合计算
+        overview_df = df.groupby('date').agg({
+            error_col: 'sum',
+            missing_col: 'sum'
+        }).reset_index()
+        
+        # 重命名列并转换日期格式
+        overview_df.columns = ['date', 'error_value', 'missing_value']
+        overview_df['date'] = overview_df['date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        overview_res = overview_df.to_dict('records')
 
-                    if inverter_total_count > 0:
-                        inverter_info['err_rate'] = round(inverter_err_count / inverter_total_count)
-                        inverter_info['missing_rate'] = round(inverter_missing_count / inverter_total_count)
 
-                    box_err_count += inverter_err_count
-                    box_missing_count += inverter_missing_count
-                    box_total_count += inverter_total_count
+        # 计算station_info
+        station_info = _build_quality_tree(df, station, variable)
 
-                if box_total_count > 0:
-                    box_info['err_rate'] = round(box_err_count / box_total_count)
-                    box_info['missing_rate'] = round(box_missing_count / box_total_count)
+        return {'station_info': station_info, 'overview_res': overview_res}
+        
+    except Exception as e:
+        print(f"Error getting station info for '{station}' using ORM: {e}")
 
-                station_info[0]['children'].append(box_info)
+def _format_local_time(timestamps, unit='s'):
+    """
+    秒级时间戳数组 -> 北京时间字符串数组，unit='s' 时为 'YYYY-MM-DD HH:MM:SS'，unit='D' 时为 'YYYY-MM-DD'
+    """
+    local = (np.asarray(timestamps, dtype=np.int64) + TZ_OFFSET_SECONDS).astype('datetime64[s]')
+    return np.char.replace(np.datetime_as_string(local, unit=unit), 'T', ' ')
 
-                total_err_count += box_err_count
-                total_missing_count += box_missing_count
-                total_count += box_total_count
 
-            # 更新场站的错误率和缺失率
-            if total_count > 0:
-                station_info[0]['err_rate'] = round(total_err_count / total_count)
-                station_info[0]['missing_rate'] = round(total_missing_count / total_count)
+def _device_list(device_id):
+    # device_id 为列表时一次查询多个设备，否则查询单个设备
+    return list(device_id) if isinstance(device_id, (list, tuple)) else [device_id]
 
-            return {'station_info': station_info, 'overview_res': overview_res}
-            
-    except Exception as e:
-        print(f"Error getting station info for '{station}' using ORM: {e}")
 
 def get_station_chart_orm(station_name, device_id, start_time, variable, repo_abs_path, database_manager=None, station_model=None):
     """
@@ -159,7 +211,7 @@ def get_station_chart_orm(station_name, device_id, start_time, variable, repo_ab
     
     参数：
     - station_name: 场站名称
-    - device_id: 设备ID
+    - device_id: 设备ID，或设备ID列表（如一个逆变器下的所有组串）
     - start_time: 开始时间
     - variable: 变量类型，'0'表示电流，其他表示电压
     - repo_abs_path: 项目根目录绝对路径
@@ -167,7 +219,8 @@ def get_station_chart_orm(station_name, device_id, start_time, variable, repo_ab
     - station_model: 场站表模型元组，包含 station_info, inverter_info, string_info
     
     返回：
-    - 包含每个时间点数据的列表，每项包含date和value
+    - 单个设备时为包含每个时间点数据的列表，每项包含date和value
+    - 多个设备时为列式结构 {'date': [...], 'values': {设备ID: [...]}}，某设备缺少的时间点为 null
     """
     
     # 定义上海时区
@@ -181,6 +234,10 @@ def get_station_chart_orm(station_name, device_id, start_time, variable, repo_ab
     start_timestamp = int(start_datetime.timestamp())
     end_timestamp = int(end_datetime.timestamp())
     
+    multi = isinstance(device_id, (list, tuple))
+    device_ids = _device_list(device_id)
+    # 根据variable选择数据列
+    value_col = 'intensity' if variable == '0' else 'voltage'
     
     try:
         # 获取字符串信息模型
@@ -190,50 +247,37 @@ def get_station_chart_orm(station_name, device_id, start_time, variable, repo_ab
         db_name = station_name
         
         with database_manager.get_session(db_name) as session:
-            # 查询字符串信息
-            query = (
-                session.query(string_info_model.timestamp, string_info_model.intensity, string_info_model.voltage)
-                .filter(string_info_model.timestamp >= start_timestamp)
-                .filter(string_info_model.timestamp < end_timestamp)
-                .filter(string_info_model.device_id == device_id)
+            # 列式读取组串一天的数据，只投影需要的列
+            stmt = (
+                select(string_info_model.timestamp, string_info_model.device_id, getattr(string_info_model, value_col))
+                .where(string_info_model.timestamp >= start_timestamp)
+                .where(string_info_model.timestamp < end_timestamp)
+                .where(string_info_model.device_id.in_(device_ids))
                 .order_by(string_info_model.timestamp)
-                .all()
             )
-            
-            if not query:
-                return []
-            
-            # 转换结果为 DataFrame
-            df = pd.DataFrame([{
-                'timestamp': item.timestamp,
-                'intensity': item.intensity,
-                'voltage': item.voltage
-            } for item in query])
-            
-            if df.empty:
-                return []
-            
-            # 转换时间戳为datetime
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s').dt.tz_localize('UTC').dt.tz_convert('Asia/Shanghai').dt.tz_localize(None)
-            
-            # 根据variable选择数据列
-            if variable == '0':  # 电流数据
-                value_col = 'intensity'
-            else:  # 电压数据
-                value_col = 'voltage'
-            
-            # 将数据转换为数值类型
-            df[value_col] = pd.to_numeric(df[value_col], errors='coerce').fillna(0)
-            
-            # 生成结果
-            res = []
-            for _, row in df.iterrows():
-                res.append({
-                    'date': str(row['timestamp']),
-                    'value': float(row[value_col])
-                })
-            
-            return res
+            df = fetch_dataframe(session, stmt, {'timestamp': np.int64, value_col: np.float64})
+        
+        if df.empty:
+            return {'date': [], 'values': {}} if multi else []
+        
+        # 空值按 0 处理
+        df[value_col] = df[value_col].fillna(0)
+        
+        if not multi:
+            dates = _format_local_time(df['timestamp'].to_numpy())
+            return [{'date': date, 'value': value} for date, value in zip(dates.tolist(), df[value_col].tolist())]
+        
+        # 多个设备：以时间点为行、设备为列展开
+        table = (
+            df.drop_duplicates(['timestamp', 'device_id'], keep='last')
+            .pivot(index='timestamp', columns='device_id', values=value_col)
+            .reindex(columns=device_ids)
+        )
+        table = table.astype(object).where(table.notna(), None)
+        return {
+            'date': _format_local_time(table.index.to_numpy()).tolist(),
+            'values': {device: table[device].tolist() for device in device_ids}
+        }
             
     except Exception as e:
         print(f"Error getting chart data for '{station_name}' using ORM: {e}")
@@ -244,7 +288,7 @@ def get_station_origin_data_orm_optimized(station_name, device_id, start_time, e
     
     参数：
     - station_name: 场站名称
-    - device_id: 设备ID
+    - device_id: 设备ID，或设备ID列表（如一个逆变器下的所有组串）
     - start_time: 开始时间
     - end_time: 结束时间
     - variable: 变量类型，'0'表示电流，其他表示电压
@@ -254,7 +298,9 @@ def get_station_origin_data_orm_optimized(station_name, device_id, start_time, e
     - impute_model: 填补数据模型
     
     返回：
-    - 包含每日统计信息的列表，每项包含date, missing_count, error_count
+    - 单个设备时为包含每日统计信息的列表，每项包含date, missing_count, error_count
+    - 多个设备时为列式结构 {'date': [...], 'missing_count': {设备ID: [...]}, 'error_count': {设备ID: [...]}}
+    缺失的日期补 0
     """
     # 定义上海时区
     shanghai_tz = pytz.timezone('Asia/Shanghai')
@@ -266,64 +312,53 @@ def get_station_origin_data_orm_optimized(station_name, device_id, start_time, e
     start_timestamp = int(start_datetime.timestamp())
     end_timestamp = int(end_datetime.timestamp())
     
+    multi = isinstance(device_id, (list, tuple))
+    device_ids = _device_list(device_id)
+    # 根据variable选择电流或电压的统计数据
+    suffix = 'intensity' if variable == '0' else 'voltage'
+    count_cols = ['missing_count', 'error_count']
+    
     # 使用impute数据库
     db_name = f"{station_name}_impute"
     
     try:
         with database_manager.get_session(db_name) as session:
-            # 直接查询impute_model表
-            query = (
-                session.query(impute_model)
-                .filter(impute_model.timestamp >= start_timestamp)
-                .filter(impute_model.timestamp < end_timestamp)
-                .filter(impute_model.device_id == device_id)
-                .all()
+            # 列式读取impute_model表
+            stmt = (
+                select(
+                    impute_model.timestamp,
+                    impute_model.device_id,
+                    getattr(impute_model, f'missing_count_{suffix}').label('missing_count'),
+                    getattr(impute_model, f'error_count_{suffix}').label('error_count'),
+                )
+                .where(impute_model.timestamp >= start_timestamp)
+                .where(impute_model.timestamp < end_timestamp)
+                .where(impute_model.device_id.in_(device_ids))
             )
-            
-            if not query:
-                return []
-            
-            # 转换结果为所需格式
-            res = []
-            for item in query:
-                # 将时间戳转换为日期字符串
-                date_obj = datetime.fromtimestamp(item.timestamp, shanghai_tz).replace(tzinfo=None)
-                date_str = str(date_obj.date())
-                
-                # 根据variable选择电流或电压的统计数据
-                if variable == '0':  # 电流
-                    missing_count = item.missing_count_intensity
-                    error_count = item.error_count_intensity
-                else:  # 电压
-                    missing_count = item.missing_count_voltage
-                    error_count = item.error_count_voltage
-                
-                res.append({
-                    'date': date_str,
-                    'missing_count': int(missing_count),
-                    'error_count': int(error_count)
-                })
-            
-            # 检查是否有日期缺失，如果有则补充空记录
-            days = int((end_datetime - start_datetime).total_seconds() // (3600 * 24))
-            existing_dates = {item['date'] for item in res}
-            
-            for i in range(days):
-                day_start = start_datetime + timedelta(days=i)
-                day_start_no_tz = day_start.replace(tzinfo=None)
-                date_str = str(day_start_no_tz.date())
-                
-                if date_str not in existing_dates:
-                    res.append({
-                        'date': date_str,
-                        'missing_count': 0,
-                        'error_count': 0
-                    })
-            
-            # 按日期排序
-            res.sort(key=lambda x: x['date'])
-            
-            return res
+            df = fetch_dataframe(session, stmt, {'timestamp': np.int64, 'missing_count': np.float64, 'error_count': np.float64})
+        
+        if df.empty:
+            return {'date': [], 'missing_count': {}, 'error_count': {}} if multi else []
+        
+        # 按日期聚合，并补齐查询范围内缺失的日期
+        df['date'] = _format_local_time(df['timestamp'].to_numpy(), unit='D')
+        days = max(int((end_timestamp - start_timestamp) // DAY_SECONDS), 0)
+        calendar = _format_local_time(start_timestamp + np.arange(days, dtype=np.int64) * DAY_SECONDS, unit='D')
+        dates = pd.Index(np.union1d(calendar, df['date'].unique()), name='date')
+        
+        if not multi:
+            daily = df.groupby('date')[count_cols].sum().reindex(dates, fill_value=0).astype(int)
+            return [
+                {'date': date, 'missing_count': missing_count, 'error_count': error_count}
+                for date, missing_count, error_count in zip(dates.tolist(), daily['missing_count'].tolist(), daily['error_count'].tolist())
+            ]
+        
+        daily = df.groupby(['date', 'device_id'])[count_cols].sum().unstack('device_id', fill_value=0).reindex(dates, fill_value=0)
+        res = {'date': dates.tolist()}
+        for col in count_cols:
+            table = daily[col].reindex(columns=device_ids, fill_value=0).astype(int)
+            res[col] = {device: table[device].tolist() for device in device_ids}
+        return res
             
     except Exception as e:
         print(f"Error getting data from impute model for '{station_name}': {e}")
@@ -338,12 +373,15 @@ def impute_schedule_bulk(process_date, station_name, repo_abs_path, database_man
 
     _,_, string_info_model = station_model
 
-    impute_and_fill_bulk(station_name, database_manager, string_info_model, start_timestamp, end_timestamp, model_dict, impute_model, position)
+    impute_and_fill_bulk(station_name, database_manager, string_info_model, start_timestamp, end_timestamp, model_dict, impute_model, position, station_model)
 
 def load_impute_models(repo_abs_path):
     """
     加载填补模型
     """
+    # pypots（torch）只在运行填补任务时才导入，Web 进程启动时不加载
+    from pypots.imputation import SAITS, iTransformer, FreTS
+
     model_dir_path = os.path.join(repo_abs_path, 'process', 'impute', 'model_multivariate')
     
     # 初始化模型字典
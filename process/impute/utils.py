@@ -1,19 +1,30 @@
 import pandas as pd
 import numpy as np
-from pypots.imputation import SAITS, iTransformer, FreTS
 from datetime import datetime, timedelta
 import time
 import pytz  # 引入pytz库来处理时区
 import os
 from tqdm import tqdm
 import logging
+from sqlalchemy import select
+from schema.rollup import refresh_daily_rollups, update_string_quality
+from schema.columnar import fetch_dataframe
+from process.metrics import span
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
 
+STRING_VALUE_DTYPES = {
+    'timestamp': np.int64,
+    'intensity': np.float64,
+    'voltage': np.float64,
+    'fixed_intensity': np.float64,
+    'fixed_voltage': np.float64,
+}
+
 DATU_NORMAL_VOLTAGE_IDS = ['044','046','048','050','051','054','055','056','058','060','061','062','063','064','065','066','067','068','069','070','071','072','073','074','075']
 
-def impute_and_fill_bulk(station_name, database_manager, string_info_model, start_timestamp=None, end_timestamp=None, model_dict=None, impute_model=None, position=0):
+def impute_and_fill_bulk(station_name, database_manager, string_info_model, start_timestamp=None, end_timestamp=None, model_dict=None, impute_model=None, position=0, station_model=None):
     # 先删除同一天所有 device_id 的统计数据（只执行一次）
     with database_manager.get_session(f'{station_name}_impute') as impute_session:
         impute_session.query(impute_model).filter(impute_model.timestamp == start_timestamp).delete(synchronize_session=False)
@@ -21,30 +32,26 @@ def impute_and_fill_bulk(station_name, database_manager, string_info_model, star
     
     # 所有箱变-逆变组合处理完毕后，批量删除旧数据，批量插入新数据
     with database_manager.get_session(station_name) as session:
-        # Query data within the specified time range
-        query = (
-            session.query(string_info_model)
-            .filter(string_info_model.timestamp >= start_timestamp)
-            .filter(string_info_model.timestamp <= end_timestamp)
+        # 列式读取：只投影需要的列，数值列直接为 float64（NULL -> nan），不构造 ORM 对象
+        stmt = (
+            select(
+                string_info_model.timestamp,
+                string_info_model.device_id,
+                string_info_model.string_id,
+                string_info_model.inverter_id,
+                string_info_model.box_id,
+                string_info_model.intensity,
+                string_info_model.voltage,
+                string_info_model.fixed_intensity,
+                string_info_model.fixed_voltage,
+            )
+            .where(string_info_model.timestamp >= start_timestamp)
+            .where(string_info_model.timestamp <= end_timestamp)
             .order_by(string_info_model.timestamp, string_info_model.device_id)
-            .all()
         )
-
-        # Convert ORM results to DataFrame
-        if query:
-            df = pd.DataFrame([{
-                'timestamp': item.timestamp,
-                'device_id': item.device_id,
-                'string_id': item.string_id,
-                'inverter_id': item.inverter_id,
-                'box_id': item.box_id,
-                'intensity': item.intensity,
-                'voltage': item.voltage,
-                'fixed_intensity': item.fixed_intensity,
-                'fixed_voltage': item.fixed_voltage
-            } for item in query])
-        else:
-            df = pd.DataFrame()
+        with span('query', station=station_name, stage='impute') as s:
+            df = fetch_dataframe(session, stmt, STRING_VALUE_DTYPES)
+            s.set(rows=len(df))
 
         # Check if the query result is empty
         if df.empty:
@@ -55,6 +62,7 @@ def impute_and_fill_bulk(station_name, database_manager, string_info_model, star
         df['box_inverter_key'] = df['box_id'] + '-' + df['inverter_id']
         # 初始化一个空的 DataFrame 来存储修改后的数据
         all_updated_dfs = pd.DataFrame()
+        all_quality_records = []
 
         for box_inverter_key, group_df in tqdm(df.groupby('box_inverter_key'), desc="Processing box-inverter groups", position=position):
             box_id, inverter_id = box_inverter_key.split('-')
@@ -141,6 +149,8 @@ def impute_and_fill_bulk(station_name, database_manager, string_info_model, star
                     'missing_count_voltage': missing_count_voltage
                 })
             
+            all_quality_records.extend(records_to_insert)
+
             # 2. 删除/写入 impute 数据
             with database_manager.get_session(f'{station_name}_impute') as impute_session:
                 if records_to_insert:
@@ -191,13 +201,20 @@ def impute_and_fill_bulk(station_name, database_manager, string_info_model, star
             print("已删除数据，准备插入新数据")
 
             # 批量插入（事务2）
-            all_updated_dfs = all_updated_dfs.replace({np.nan: None})
-            records = all_updated_dfs.to_dict('records')
-            # Batch insert updated records
-            session.bulk_insert_mappings(string_info_model, records)
-            session.commit()
+            with span('orm_write', station=station_name, stage='impute') as s:
+                all_updated_dfs = all_updated_dfs.replace({np.nan: None})
+                records = all_updated_dfs.to_dict('records')
+                # Batch insert updated records
+                session.bulk_insert_mappings(string_info_model, records)
+                session.commit()
+                s.set(rows=len(records))
             print(f"已插入 {len(records)} 条新数据 到 {station_name} 数据库")
 
+    # 更新当天的组串日汇总（填补后的数据与质量统计）
+    if station_model is not None:
+        refresh_daily_rollups(database_manager, station_name, station_model, [start_timestamp], tables=('string',))
+    update_string_quality(database_manager, station_name, start_timestamp, all_quality_records)
+
 def process_day_data(df, target_strings, timestamps, box_id, inverter_id, model_dict, updated_dfs):
     """
     处理一天的数据，使用多变量填补方法
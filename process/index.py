@@ -7,14 +7,24 @@ from process.predict.index import predict_schedule
 from process.diagnose.index import diagnosis_schedule, diagnosis_schedule_orm
 from process.overview.index import post_schedule, overview_process
 from process.overview.utils import get_token
+from schema.partition import rotate_string_partitions
+from schema.ledger import get_stage_record, record_stage, make_fingerprint, string_data_signature
+from process.metrics import span, configure_metrics
+from process.pipeline import STATION_STAGES, StationDagExecutor, parse_stage_backends, create_process_pool, init_stage_worker, pipeline_setting
 import logging
 import os
-from concurrent.futures import ThreadPoolExecutor
 import time
+from functools import partial
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
 
+# 读取当天原始组串数据的阶段，输入指纹中包含数据签名
+DATA_STAGES = ('impute', 'predict', 'diagnose')
+
+# 阶段工作进程内的数据库管理器、表模型和预加载的模型，由 _setup_stage_worker 初始化
+_worker_state = {}
+
 def process_create(process_date, station_name, repo_abs_path,start_timestamp,end_timestamp):
     database_path = os.path.join(repo_abs_path, 'database', '{}.db'.format(station_name))
     data_dir_path = os.path.join(repo_abs_path, 'data')
@@ -43,99 +53,197 @@ def process_diagnose(process_date, station_name, repo_abs_path, database_manager
 def process_postprocess(start_timestamp, end_timestamp, repo_abs_path, database_manager, station_model, station_name, process_date, kairosdb_url, impute_model=None, token=None):
     post_schedule(start_timestamp, end_timestamp, repo_abs_path, database_manager, station_model, station_name, process_date, kairosdb_url, impute_model, token)
 
+def run_station_stage(stage, station_name, context):
+    """
+    执行某个场站的单个阶段
+
+    Args:
+        stage: 阶段名称，见 process.pipeline.STATION_STAGES
+        station_name: 场站名称
+        context: 本次运行的公共参数（日期、时间戳、数据库管理器、模型等）
+    """
+    process_date = context['process_date']
+    repo_abs_path = context['repo_abs_path']
+    database_manager = context['database_manager']
+    station_models = context['station_models']
+
+    if stage == 'preprocess':
+        preprocess_log(context['start_timestamp'], context['end_timestamp'], station_name,
+                       context['kairosdb_url'], repo_abs_path, database_manager, station_models[station_name])
+    elif stage == 'impute':
+        process_impute_global(process_date, station_name, repo_abs_path, database_manager, station_models[station_name],
+                              context['model_dict'], context['impute_models'][station_name], position=context['positions'][station_name])
+    elif stage == 'predict':
+        process_predict(process_date, station_name, repo_abs_path, database_manager, station_models)
+    elif stage == 'merge':
+        process_merge(process_date, station_name, repo_abs_path)
+    elif stage == 'diagnose':
+        process_diagnose(process_date, station_name, repo_abs_path, database_manager, station_models[station_name])
+    elif stage == 'detect':
+        process_detect(process_date, station_name, repo_abs_path, context['time_window'], database_manager, station_models[station_name])
+    elif stage == 'postprocess':
+        process_postprocess(context['start_timestamp'], context['end_timestamp'], repo_abs_path, database_manager, station_models[station_name],
+                            station_name, process_date, context['kairosdb_url'], impute_model=context['impute_models'][station_name], token=context['token'])
+    else:
+        raise ValueError(f"未知的阶段: {stage}")
+
+def _setup_stage_worker(repo_abs_path, station_list, preload_stages):
+    """
+    阶段工作进程初始化：每个进程创建自己的数据库管理器和表模型，并预加载模型
+    """
+    from schema.session import DatabaseManager
+    from schema.registry import StationModelRegistry, get_station_models, get_impute_model
+
+    configure_metrics(repo_abs_path)
+    _worker_state['database_manager'] = DatabaseManager(repo_abs_path)
+    _worker_state['station_models'] = StationModelRegistry(get_station_models, station_list)
+    _worker_state['impute_models'] = StationModelRegistry(get_impute_model, station_list)
+    if 'impute' in preload_stages:
+        with span('model_load', stage='impute'):
+            _worker_state['model_dict'] = load_impute_models(repo_abs_path)
+    logger.info(f"stage worker {os.getpid()} ready, preloaded: {list(preload_stages)}")
+
+def _run_stage_in_worker(stage, station_name, context):
+    """
+    在阶段工作进程中执行单个阶段，返回耗时（秒）
+    """
+    start_time = time.time()
+    execute_stage(stage, station_name, {**context, **_worker_state})
+    return time.time() - start_time
+
+def stage_fingerprint(stage, station_name, context):
+    """
+    阶段输入指纹：上一阶段的指纹与完成时间 + 读取原始组串数据的阶段附加当天数据签名
+    """
+    process_date = context['process_date']
+    database_manager = context['database_manager']
+    parts = [stage, process_date, station_name]
+    if stage in STATION_STAGES and STATION_STAGES.index(stage) > 0:
+        previous = get_stage_record(database_manager, process_date, station_name, STATION_STAGES[STATION_STAGES.index(stage) - 1])
+        parts.append([previous['fingerprint'], previous['finished_at']] if previous and previous['status'] == 'success' else None)
+    if stage == 'preprocess':
+        parts.append(context['kairosdb_url'])
+    if stage in DATA_STAGES:
+        _, _, string_info = context['station_models'][station_name]
+        parts.append(string_data_signature(database_manager, station_name, string_info, context['start_timestamp'], context['end_timestamp']))
+    return make_fingerprint(*parts)
+
+def execute_stage(stage, station_name, context):
+    """
+    执行单个阶段并写入运行记录；续跑模式下，已成功且输入指纹未变化的阶段直接跳过
+    """
+    process_date = context['process_date']
+    database_manager = context['database_manager']
+    if context.get('resume'):
+        record = get_stage_record(database_manager, process_date, station_name, stage)
+        if record and record['status'] == 'success' and record['fingerprint'] == stage_fingerprint(stage, station_name, context):
+            logger.info(f"{station_name} {stage} of {process_date} already completed with unchanged inputs, skipped")
+            return
+
+    started_at = int(time.time())
+    record_stage(database_manager, process_date, station_name, stage, 'running', started_at=started_at)
+    try:
+        with span('stage', station=station_name, stage=stage, process_date=process_date):
+            run_station_stage(stage, station_name, context)
+    except Exception as e:
+        record_stage(database_manager, process_date, station_name, stage, 'failed', started_at=started_at, duration=time.time() - started_at, error=e)
+        raise
+    # 指纹在阶段完成后计算：填补等阶段会改写当天数据，续跑时与完成时的状态比较
+    record_stage(database_manager, process_date, station_name, stage, 'success', fingerprint=stage_fingerprint(stage, station_name, context),
+                 started_at=started_at, duration=time.time() - started_at)
+
+def run_process(process_date, start_timestamp, end_timestamp, kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models,
+                station_list, token=None, stages=None, resume=False):
+    """
+    执行指定日期、场站和阶段的流水线
+
+    Args:
+        process_date: 处理日期，形如 "2025-05-20"
+        start_timestamp, end_timestamp: 当天起止时间戳（秒）
+        stages: 需要执行的阶段，默认全部，按 STATION_STAGES 的顺序执行
+        resume: 续跑模式，跳过已成功且输入未变化的阶段
+    Returns:
+        dict: 各场站的执行结果，见 StationDagExecutor.run
+    """
+    stages = [stage for stage in STATION_STAGES if stages is None or stage in stages]
+    configure_metrics(repo_abs_path)
+    stage_backends = parse_stage_backends()
+    # impute 在工作进程中执行时，由工作进程各自预加载填补模型
+    need_models = 'impute' in stages and stage_backends.get('impute') != 'process'
+    model_dict = {}
+    if need_models:
+        with span('model_load', stage='impute'):
+            model_dict = load_impute_models(repo_abs_path)
+
+    context = {
+        'process_date': process_date,
+        'start_timestamp': start_timestamp,
+        'end_timestamp': end_timestamp,
+        'kairosdb_url': kairosdb_url,
+        'repo_abs_path': repo_abs_path,
+        'time_window': time_window,
+        'database_manager': database_manager,
+        'station_models': station_models,
+        'impute_models': impute_models,
+        'model_dict': model_dict,
+        'token': token,
+        'resume': resume,
+        'positions': {station_name: idx for idx, station_name in enumerate(station_list)},
+    }
+
+    # 每个场站独立执行 preprocess → impute → predict → merge → diagnose → postprocess，
+    # 某个场站完成上一阶段后立即进入下一阶段，不等待其他场站
+    # 劣化率计算方式修改，暂时不执行 detect 阶段
+    logger.info(f"start station pipelines of {process_date}, stages: {stages}, resume: {resume}")
+    start_time = time.time()
+    process_stages = [stage for stage, backend in stage_backends.items() if backend == 'process']
+    # 子进程只接收可序列化的参数，数据库管理器和模型在子进程中重新创建
+    worker_context = {key: value for key, value in context.items()
+                      if key not in ('database_manager', 'station_models', 'impute_models', 'model_dict')}
+    executor = StationDagExecutor(
+        lambda stage, station_name: execute_stage(stage, station_name, context),
+        stages=stages,
+        stage_backends=stage_backends,
+        process_task=partial(_run_stage_in_worker, context=worker_context),
+        process_pool_factory=partial(create_process_pool, initializer=init_stage_worker,
+                                     initargs=(pipeline_setting('PIPELINE_WORKER_THREADS'), 'process.index:_setup_stage_worker', (repo_abs_path, list(station_list), process_stages)))
+    )
+    if process_stages:
+        logger.info(f"stages running in worker processes: {process_stages}")
+    with span('pipeline', process_date=process_date, stations=len(station_list)):
+        results = executor.run(station_list)
+    end_time = time.time()
+    failed = {name: result['failed_stage'] for name, result in results.items() if result['status'] != 'success'}
+    logger.info(f"station pipelines completed in {end_time - start_time:.2f} seconds, failed: {failed or 'none'}")
+
+    # 所有场站结束后执行 overview_process，进行数据汇总；只重跑前面阶段（未包含 postprocess）时不汇总
+    if 'postprocess' in stages:
+        with span('overview', stage='overview', process_date=process_date):
+            overview_process(repo_abs_path, process_date, station_list)
+    return results
+
 def run_process_schedule(kairosdb_url, repo_abs_path,time_window, database_manager, station_models, impute_models, station_list=None, api_user=None, api_password=None):
     yesterday_date, yesterday_start_timestamp, yesterday_end_timestamp, _ = get_basis_info(repo_abs_path=repo_abs_path)
-    model_dict = load_impute_models(repo_abs_path)
 
     token = get_token(api_user, api_password) 
 
-    with ThreadPoolExecutor() as executor:
-        # 1. 并行执行 preprocess_log，并计算执行时间
-        logger.info("start preprocess")
-        start_time = time.time()
-        preprocess_futures = [
-            executor.submit(preprocess_log, yesterday_start_timestamp, yesterday_end_timestamp, station_name,
-                            kairosdb_url, repo_abs_path, database_manager, station_models[station_name]) for station_name in station_list]
-        
-        for future in preprocess_futures:
-            future.result()
-        end_time = time.time()
-        logger.info(f"preprocess completed in {end_time - start_time:.2f} seconds")
-
-        # 2. 并行执行 process_impute_global，并计算执行时间
-        logger.info("start impute")
-        start_time = time.time()
-
-        impute_futures = [executor.submit(process_impute_global, yesterday_date, station_name, repo_abs_path, database_manager, station_models[station_name], 
-                            model_dict, impute_models[station_name], position=idx) for idx, station_name in enumerate(station_list)]
-
-        for future in impute_futures:
-            future.result()
-
-        end_time = time.time()
-        logger.info(f"impute completed in {(end_time - start_time)/len(station_list):.2f} seconds")
-
-        # 3. 并行执行 process_predict，并计算执行时间（该步骤会创建json或更新json）
-        logger.info("start predict")
-        start_time = time.time()
-
-        predict_futures = [executor.submit(process_predict, yesterday_date, station_name, repo_abs_path, database_manager, station_models) for
-                          station_name in station_list]
-        
-        for future in predict_futures:
-            future.result()
-
-        end_time = time.time()
-        logger.info(f"predict completed in {(end_time - start_time)/len(station_list):.2f} seconds")
-
-        # 4. 并行执行 process_merge （该步骤不计算时间）
-        logger.info("start merge")
-        merge_futures = [executor.submit(process_merge, yesterday_date, station_name, repo_abs_path) for
-                          station_name in station_list]
-
-        # 等待所有 process_merge 任务完成
-        for future in merge_futures:
-            future.result()
-        logger.info("merge completed")
-
-        # 5. 并行执行 process_diagnose，并计算执行时间
-        logger.info("start diagnose")
-        start_time = time.time()
-
-        diagnose_futures = [executor.submit(process_diagnose, yesterday_date, station_name, repo_abs_path, database_manager, station_models[station_name]) for
-                         station_name in station_list]
-        
-        for future in diagnose_futures:
-            future.result()
-        end_time = time.time()
-        logger.info(f"diagnose completed in {(end_time - start_time)/len(station_list):.2f} seconds")
-
-        # 6. 并行执行 process_detect，并计算执行时间
-        # 劣化率计算方式修改，暂时取消detect定时器
-        # logger.info("start detect")
-        # start_time = time.time()
-        # detect_futures = [executor.submit(process_detect, yesterday_date, station_name, repo_abs_path, time_window, database_manager, station_models[station_name]) for
-        #             station_name in station_list]
-        
-        # for future in detect_futures:
-        #     future.result()
-        # end_time = time.time()
-        # logger.info(f"detect completed in {(end_time - start_time)/len(station_list):.2f} seconds")
-
-        # 7. 并行执行 process_postprocess，并计算执行时间
-        logger.info("start postprocess")
-        start_time = time.time()
-        postprocess_futures = [executor.submit(process_postprocess, yesterday_start_timestamp, yesterday_end_timestamp, repo_abs_path, database_manager, station_models[station_name],
-                                  station_name, yesterday_date, kairosdb_url, impute_model=impute_models[station_name], token=token) for
-                               station_name in station_list]
-        for future in postprocess_futures:
-            future.result()
-        end_time = time.time()
-        logger.info(f"postprocess completed in {(end_time - start_time)/len(station_list):.2f} seconds")
-
-    # 8. 执行 overview_process，进行数据汇总
-    overview_process(repo_abs_path, yesterday_date, station_list)
-        
+    # StringInfo 分区轮转（仅 MariaDB 生效）
+    for station_name in station_list:
+        rotate_string_partitions(database_manager, station_name)
+
+    return run_process(yesterday_date, yesterday_start_timestamp, yesterday_end_timestamp, kairosdb_url, repo_abs_path, time_window,
+                       database_manager, station_models, impute_models, station_list, token=token)
+
+def run_process_manual(process_date, kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, station_list,
+                       api_user=None, api_password=None, stages=None, resume=True):
+    """
+    手动执行某一天的流水线（可指定场站和阶段），默认续跑：只执行失败、未执行或输入已变化的阶段
+    """
+    start_timestamp, end_timestamp = get_basis_info_manual(process_date)
+    token = get_token(api_user, api_password) if stages is None or 'postprocess' in stages else None
+    return run_process(process_date, start_timestamp, end_timestamp, kairosdb_url, repo_abs_path, time_window,
+                       database_manager, station_models, impute_models, station_list, token=token, stages=stages, resume=resume)
+
 
 if __name__ == '__main__':
     station_name = "datu"
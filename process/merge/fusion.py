@@ -2,6 +2,7 @@ import os
 import json
 import numpy as np
 import pandas as pd
+from schema.jsonfile import write_json
 
 def plot_data_fusion(geo_plot_file, bp_plot_file):
     # 读取地块级的地理数据和图纸数据（txt格式）
@@ -203,14 +204,12 @@ def data_fusion(repo_abs_path, station_name):
 
     # 保存到 results.json
     save_results_path = os.path.join(repo_abs_path, 'merge',station_name,'config', 'results.json')
-    with open(save_results_path, 'w') as f:
-        json.dump(fusion_list, f, indent=4)
+    write_json(save_results_path, fusion_list, indent=4)
 
     # 对于数组的每个元素，仅保留mergd_id，dpocr和gpcode，然后再保存到matches.json
     matches_list = [{'merge_id': plot_fusion['merge_id'], 'dpocr': format_number_string(plot_fusion['dpocr']), 'gpcode': next(iter(plot_fusion['matched_results']))} for plot_fusion in fusion_list]
     save_matches_path = os.path.join(repo_abs_path, 'merge',station_name,'config', 'matches.json')
-    with open(save_matches_path, 'w') as f:
-        json.dump(matches_list, f, indent=4)
+    write_json(save_matches_path, matches_list, indent=4)
 
 
 
@@ -242,12 +241,10 @@ if __name__ == '__main__':
 
     # 保存到 results.json
     save_results_path = os.path.join(results_dir, 'results.json')
-    with open(save_results_path, 'w') as f:
-        json.dump(fusion_list, f, indent=4)
+    write_json(save_results_path, fusion_list, indent=4)
 
     # 对于数组的每个元素，仅保留mergd_id，dpocr和gpcode，然后再保存到matches.json
     # matches_list = [{'merge_id': plot_fusion['merge_id'], 'dpocr': format_number_string(plot_fusion['dpocr']), 'gpcode': next(iter(plot_fusion['matched_results']))} for plot_fusion in fusion_list]
     matches_list = [{'merge_id': plot_fusion['merge_id'], 'dpocr': plot_fusion['dpocr'], 'gpcode': next(iter(plot_fusion['matched_results']))} for plot_fusion in fusion_list]
     save_matches_path = os.path.join(results_dir, 'matches.json')
-    with open(save_matches_path, 'w') as f:
-        json.dump(matches_list, f, indent=4)
\ No newline at end of file
+    write_json(save_matches_path, matches_list, indent=4)
\ No newline at end of file
@@ -8,6 +8,7 @@ import os
 # import cv2
 import numpy as np
 import logging
+from schema.results_store import upsert_string_fields, list_device_ids
 # from process.merge.seg import segment_image
 # from process.merge.predict import predict_image
 # from process.merge.concat import merge_image
@@ -49,12 +50,9 @@ def create_log(process_date, station_name, database_path, data_dir_path,start_ti
     # 加载当天的数据
     initial_data = get_initial_data(process_date, string_info_rows)
 
-    # 创建data目录下{station_name}/results/{process_date}.json文件并写入数据
-    json_dir_path = os.path.join(data_dir_path, station_name, "results")
-    os.makedirs(json_dir_path, exist_ok=True)
-    json_path = os.path.join(json_dir_path, f'{process_date}.json')
-    with open(json_path, 'w') as json_file:
-        json.dump(initial_data, json_file, indent=4)
+    # 写入 data/{station_name}/results 下的结果库
+    repo_abs_path = os.path.dirname(os.path.abspath(data_dir_path))
+    upsert_string_fields(repo_abs_path, station_name, process_date, initial_data["results"])
 
 """
     1. 假设 process_date 的格式，形如"2024-12-18"
@@ -82,14 +80,13 @@ def transform_datu_string(gpcode, station_name):
     return gpcode  # 普通场站为 "1,2,3" 形式，直接返回
 
 def merge_log(process_date, station_name, data_dir_path, merge_dir_path):
-    origin_json_path = os.path.join(data_dir_path, station_name, "results", f'{process_date}.json')
+    repo_abs_path = os.path.dirname(os.path.abspath(data_dir_path))
     merge_json_path = os.path.join(merge_dir_path, station_name, "config", "matches.json")
     nan_location_id_count = 0
 
     try:
-        # 读取origin_json_path文件
-        with open(origin_json_path, 'r', encoding='utf-8') as origin_file:
-            origin_data = json.load(origin_file)
+        # 当天结果中的组串
+        device_ids = list_device_ids(repo_abs_path, station_name, process_date)
 
         # 读取merge_json_path文件并转换为字典
         with open(merge_json_path, 'r', encoding='utf-8') as merge_file:
@@ -97,20 +94,19 @@ def merge_log(process_date, station_name, data_dir_path, merge_dir_path):
 
         dpocr_gpcode_dict = {item['dpocr']: transform_datu_string(item['gpcode'], station_name) for item in merge_data}
 
-        # 对origin_data["results"]中的每个item进行处理
-        for key, value in origin_data["results"].items():
+        # 对当天结果中的每个组串处理，只写入 location_id 字段
+        location_rows = {}
+        for key in device_ids:
             # converted_key = convert_string_number(key)
             # 修改后的matches文件，其dpocr已经为"001-001-001"的形式
             if key in dpocr_gpcode_dict:
-                origin_data["results"][key]["location_id"] = dpocr_gpcode_dict[key]
+                location_rows[key] = {"location_id": dpocr_gpcode_dict[key]}
             else:
-                # 如果key不在字典中，则将value["location_id "]设置为"0,0,0"
-                origin_data["results"][key]["location_id"] = "0,0,0"
+                # 如果key不在字典中，则将location_id设置为"0,0,0"
+                location_rows[key] = {"location_id": "0,0,0"}
                 nan_location_id_count += 1
 
-        # 保存修改后的数据
-        with open(origin_json_path, 'w', encoding='utf-8') as modified_file:
-            json.dump(origin_data, modified_file, ensure_ascii=False)
+        upsert_string_fields(repo_abs_path, station_name, process_date, location_rows)
 
     except FileNotFoundError as e:
         print(f"File not found: {e}")
@@ -0,0 +1,186 @@
+# 流水线计时与资源埋点：按 场站 / 阶段 / 子步骤 记录 span（墙钟时间、CPU 时间、峰值内存、行数），
+# 以 JSON Lines 追加写入 logs/pipeline_metrics_<日期>.jsonl，供 /api/admin/pipeline-metrics 查询
+#
+# 用法：
+#   with span('query', station=station_name, stage='preprocess') as s:
+#       df = ...
+#       s.set(rows=len(df))
+# 嵌套的 span 自动继承外层的 station / stage，并记录 parent
+#
+# cpu_s 为整个进程（所有线程，加上已结束并被回收的子进程）在 span 期间消耗的 CPU 时间，
+# 不是当前线程的 CPU 时间：torch/BLAS/OpenMP 的计算线程和 DataLoader 子进程都计算在内；
+# 线程池中多个 span 并发时，各自的 cpu_s 会包含其它并发 span 的消耗
+import os
+import json
+import time
+import threading
+import logging
+from datetime import datetime
+
+import pytz
+
+try:
+    import resource
+except ImportError:  # Windows 开发环境
+    resource = None
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+SHANGHAI_TZ = pytz.timezone('Asia/Shanghai')
+METRICS_FILE_PREFIX = 'pipeline_metrics_'
+
+_metrics_dir = None
+_write_lock = threading.Lock()
+_local = threading.local()
+
+
+def configure_metrics(repo_abs_path):
+    """
+    设置埋点文件目录（<项目根目录>/logs），未设置时 span 只计时不写文件
+    """
+    global _metrics_dir
+    _metrics_dir = os.path.join(repo_abs_path, 'logs')
+    os.makedirs(_metrics_dir, exist_ok=True)
+
+
+def metrics_file_path(logs_dir, date_str):
+    return os.path.join(logs_dir, f"{METRICS_FILE_PREFIX}{date_str.replace('-', '')}.jsonl")
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # Linux 下 ru_maxrss 单位为 KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _process_cpu_time():
+    """
+    进程 CPU 时间（秒）：本进程所有线程的用户态 + 内核态时间，加上已回收子进程的时间；
+    不支持 resource 的平台回退到 time.process_time()（不含子进程）
+    """
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+class Span:
+    def __init__(self, name, station=None, stage=None, **attrs):
+        parent = _stack()[-1] if _stack() else None
+        self.name = name
+        self.station = station if station is not None else (parent.station if parent else None)
+        self.stage = stage if stage is not None else (parent.stage if parent else None)
+        self.parent = parent.name if parent else None
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """记录附加信息，如 rows=行数"""
+        self.attrs.update(attrs)
+
+    def add_rows(self, rows):
+        self.attrs['rows'] = self.attrs.get('rows', 0) + int(rows)
+
+    def __enter__(self):
+        _stack().append(self)
+        self._start = datetime.now(SHANGHAI_TZ)
+        self._wall = time.perf_counter()
+        self._cpu = _process_cpu_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = _process_cpu_time() - self._cpu
+        _stack().pop()
+        record = {
+            'ts': self._start.isoformat(),
+            'span': self.name,
+            'parent': self.parent,
+            'station': self.station,
+            'stage': self.stage,
+            'wall_s': round(wall, 3),
+            'cpu_s': round(cpu, 3),
+            'peak_rss_mb': _peak_rss_mb(),
+            'pid': os.getpid(),
+            'status': 'error' if exc_type else 'ok',
+        }
+        if exc_type:
+            record['error'] = str(exc)[:200]
+        record.update(self.attrs)
+        _write(record)
+        return False
+
+
+def span(name, station=None, stage=None, **attrs):
+    return Span(name, station, stage, **attrs)
+
+
+def _write(record):
+    if _metrics_dir is None:
+        return
+    try:
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        path = metrics_file_path(_metrics_dir, record['ts'][:10])
+        # 每条记录一次追加写入，多进程同时写入时行不会交错
+        with _write_lock:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line.encode('utf-8'))
+            finally:
+                os.close(fd)
+    except Exception as e:
+        logger.warning(f"write pipeline metrics failed: {e}")
+
+
+def read_metrics(repo_abs_path, date_str=None, station=None, stage=None, span_name=None):
+    """
+    读取某天（运行日期，北京时间）的埋点记录
+
+    Returns:
+        list[dict]: span 记录，按写入顺序
+    """
+    date_str = date_str or datetime.now(SHANGHAI_TZ).strftime('%Y-%m-%d')
+    path = metrics_file_path(os.path.join(repo_abs_path, 'logs'), date_str)
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if station and record.get('station') != station:
+                continue
+            if stage and record.get('stage') != stage:
+                continue
+            if span_name and record.get('span') != span_name:
+                continue
+            records.append(record)
+    return records
+
+
+def summarize_metrics(records):
+    """
+    按 (场站, 阶段, span) 汇总：次数、墙钟时间、CPU 时间合计，峰值内存取最大值
+    """
+    summary = {}
+    for record in records:
+        key = (record.get('station'), record.get('stage'), record.get('span'))
+        item = summary.setdefault(key, {'station': key[0], 'stage': key[1], 'span': key[2],
+                                        'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None, 'rows': 0})
+        item['count'] += 1
+        item['wall_s'] = round(item['wall_s'] + record.get('wall_s', 0), 3)
+        item['cpu_s'] = round(item['cpu_s'] + record.get('cpu_s', 0), 3)
+        if record.get('peak_rss_mb') is not None:
+            item['peak_rss_mb'] = max(item['peak_rss_mb'] or 0, record['peak_rss_mb'])
+        item['rows'] += int(record.get('rows', 0) or 0)
+    return sorted(summary.values(), key=lambda item: item['wall_s'], reverse=True)
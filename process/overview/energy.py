@@ -1,5 +1,6 @@
 from sqlalchemy.exc import SQLAlchemyError
 from process.overview.utils import get_time_range
+from schema.rollup import ensure_rollup_tables, day_start_timestamp, rollup_covered_days, missing_day_ranges
 import json
 import requests
 import logging
@@ -125,6 +126,22 @@ def query_plan_energy(process_date, kairosdb_url, station_name):
 
     return plan_energy
 
+def _max_by_device(results):
+    """
+    汇总表与原始数据的查询结果按设备合并，各电量字段取最大值
+
+    Returns:
+        dict: {device_id: (max_generated_energy, max_sum_energy, max_month_energy)}
+    """
+    merged = {}
+    for row in results:
+        values = (row.max_generated_energy, row.max_sum_energy, row.max_month_energy)
+        previous = merged.get(row.device_id)
+        if previous is not None:
+            values = tuple(max((v for v in pair if v is not None), default=None) for pair in zip(previous, values))
+        merged[row.device_id] = values
+    return merged
+
 def query_generation(start_timestamp, end_timestamp, database_manager, station_model, station_name):
     # 获取对应模型类
     _, inverter_info_model, _ = station_model
@@ -139,24 +156,44 @@ def query_generation(start_timestamp, end_timestamp, database_manager, station_m
 
         from sqlalchemy import func
 
-        # 查询每个 device_id 在时间范围内的最大 generated_energy、sum_energy、month_energy
-        results = (
-            session.query(
-                inverter_info_model.device_id,
-                func.max(inverter_info_model.generated_energy).label("max_generated_energy"),
-                func.max(inverter_info_model.sum_energy).label("max_sum_energy"),
-                func.max(inverter_info_model.month_energy).label("max_month_energy"),
+        # 已汇总的日期读取逆变器日汇总表（每个设备每天一行），未汇总的日期回退到原始小时数据，按设备取最大值
+        _, inverter_daily = ensure_rollup_tables(database_manager, station_name)
+        start_day, end_day = day_start_timestamp(start_timestamp), day_start_timestamp(end_timestamp)
+        covered_days = rollup_covered_days(session, inverter_daily, start_day, end_day)
+        results = []
+        if covered_days:
+            results.extend(
+                session.query(
+                    inverter_daily.device_id,
+                    func.max(inverter_daily.generated_energy_max).label("max_generated_energy"),
+                    func.max(inverter_daily.sum_energy_max).label("max_sum_energy"),
+                    func.max(inverter_daily.month_energy_max).label("max_month_energy"),
+                )
+                .filter(inverter_daily.day >= start_day)
+                .filter(inverter_daily.day <= end_day)
+                .group_by(inverter_daily.device_id)
+                .all()
             )
-            .filter(inverter_info_model.timestamp >= start_timestamp)
-            .filter(inverter_info_model.timestamp <= end_timestamp)
-            .group_by(inverter_info_model.device_id)
-            .all()
-        )
+        for range_start, range_end in missing_day_ranges(covered_days, start_day, end_day):
+            # 查询每个 device_id 在时间范围内的最大 generated_energy、sum_energy、month_energy
+            results.extend(
+                session.query(
+                    inverter_info_model.device_id,
+                    func.max(inverter_info_model.generated_energy).label("max_generated_energy"),
+                    func.max(inverter_info_model.sum_energy).label("max_sum_energy"),
+                    func.max(inverter_info_model.month_energy).label("max_month_energy"),
+                )
+                .filter(inverter_info_model.timestamp >= max(start_timestamp, range_start))
+                .filter(inverter_info_model.timestamp <= min(end_timestamp, range_end - 1))
+                .group_by(inverter_info_model.device_id)
+                .all()
+            )
+        maxima = _max_by_device(results).values()
 
         # 分别求和
-        total_generated_energy = sum(r.max_generated_energy or 0 for r in results)
-        total_sum_energy = sum(r.max_sum_energy or 0 for r in results)
-        total_month_energy = sum(r.max_month_energy or 0 for r in results)
+        total_generated_energy = sum(values[0] or 0 for values in maxima)
+        total_sum_energy = sum(values[1] or 0 for values in maxima)
+        total_month_energy = sum(values[2] or 0 for values in maxima)
 
         return total_generated_energy, total_sum_energy, total_month_energy
 
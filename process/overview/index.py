@@ -1,5 +1,5 @@
 import os
-import json
+import copy
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 from process.overview.energy import query_generation, query_plan_energy
@@ -8,6 +8,9 @@ from process.overview.statistics import statistics_json_file
 from process.overview.platform import export_report
 from process.overview.template import OVERVIEW_TEMPLATE
 from process.overview.map import generate_map_data
+from process.metrics import span
+from schema.results_store import save_statistics, load_statistics
+from schema.jsonfile import update_json
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
@@ -20,42 +23,26 @@ ANOMALY_MAPPINGS = {
 
 def write_statistics2json(repo_abs_path, station_name, process_date, result_dict):
     """
-    将统计结果写入 JSON 文件
+    将统计结果写入结果库（原 JSON 顶层的 statistics）
     """
-    json_file_path = os.path.join(repo_abs_path, 'data', station_name, 'results', f'{process_date}.json')
-
-    # 1 读取现有的json文件，增加存在性和损坏校验
-    json_data = {}
-    if os.path.exists(json_file_path):
-        try:
-            with open(json_file_path, 'r', encoding='utf-8') as file:
-                json_data = json.load(file)
-        except Exception as e:
-            logger.warning(f"{json_file_path} 文件损坏或无法读取，将重建文件: {e}")
-            json_data = {}
-    else:
-        logger.info(f"{json_file_path} 文件不存在，将创建新文件。")
-        json_data = {}
-
-    json_data['statistics'] = result_dict
-
-    # 2 写入更新后的json文件
-    with open(json_file_path, 'w', encoding='utf-8') as file:
-        json.dump(json_data, file, ensure_ascii=False)
+    save_statistics(repo_abs_path, station_name, process_date, result_dict)
 
 def post_schedule(start_timestamp, end_timestamp, repo_abs_path, database_manager, station_model, station_name, process_date, kairosdb_url, impute_model=None, token=None):
     logger.info(f"{station_name}_overview started at {process_date}")
 
     logger.info(f"\t{station_name}_step0 start: generate map data")
-    generate_map_data(repo_abs_path, station_name, process_date)  # 生成当前日期的地图数据
+    with span('map_data', station=station_name, stage='postprocess'):
+        generate_map_data(repo_abs_path, station_name, process_date)  # 生成当前日期的地图数据
 
     logger.info(f"\t{station_name}_step1 start: get generation data")
     # 获取日发电量、总发电量、月发电量（默认单位为 kWh）
-    generated_energy, sum_energy, month_energy = query_generation(start_timestamp, end_timestamp, database_manager, station_model, station_name)
+    with span('query', station=station_name, stage='postprocess', step='generation'):
+        generated_energy, sum_energy, month_energy = query_generation(start_timestamp, end_timestamp, database_manager, station_model, station_name)
 
     logger.info(f"\t{station_name}_step2 start: get generation of plan")
     # 获取月计划发电量（默认单位为 kWh）
-    plan_energy = query_plan_energy(process_date, kairosdb_url, station_name)
+    with span('query', station=station_name, stage='postprocess', step='plan_energy'):
+        plan_energy = query_plan_energy(process_date, kairosdb_url, station_name)
 
     logger.info(f"\t{station_name}_step3 start: get impute info")
     # 获取数据异常率
@@ -75,15 +62,17 @@ def post_schedule(start_timestamp, end_timestamp, repo_abs_path, database_manage
     ## 将统计数据合并到结果字典中
     result_dict.update(statistics_dict)
 
-    logger.info(f"\t{station_name}_step5 start: write to json file")
-    # 将结果写入 JSON 文件
-    write_statistics2json(repo_abs_path, station_name, process_date, result_dict)
+    logger.info(f"\t{station_name}_step5 start: write statistics")
+    # 将结果写入结果库
+    with span('results_write', station=station_name, stage='postprocess'):
+        write_statistics2json(repo_abs_path, station_name, process_date, result_dict)
 
     logger.info(f"{station_name}_overview completed at {process_date}")
 
     if token is not None:
         try:
-            export_report(repo_abs_path, station_name, process_date, token)
+            with span('export_report', station=station_name, stage='postprocess'):
+                export_report(repo_abs_path, station_name, process_date, token)
         except Exception as e:
             logger.error(f"Failed to export report for {station_name} at {process_date}: {e}")
         
@@ -106,14 +95,11 @@ def overview_process(repo_abs_path, process_date, station_list):
 
     station_dict = dict()
     for station_name in station_list:
-        daily_json_path = os.path.join(repo_abs_path, 'data', station_name, 'results', f'{process_date}.json')
-        # 读取 JSON 文件，异常时所有数据设为0
+        # 读取场站当日统计，不存在或异常时所有数据设为0
         try:
-            with open(daily_json_path, 'r', encoding='utf-8') as file:
-                daily_data = json.load(file)
-            station_statistics = daily_data.get('statistics', {})
+            station_statistics = load_statistics(repo_abs_path, station_name, process_date) or {}
         except Exception as e:
-            logger.warning(f"{daily_json_path} 文件不存在或损坏，所有统计数据设为0: {e}")
+            logger.warning(f"{station_name} {process_date} 统计数据读取失败，所有统计数据设为0: {e}")
             station_statistics = {}
 
         # 需要统计的场站级数据
@@ -141,39 +127,33 @@ def overview_process(repo_abs_path, process_date, station_list):
 
     # 数据统计完毕，开始更新 overview.json 文件
     overview_json_path = os.path.join(repo_abs_path, 'config', 'overview.json')
-    # 读取现有的overview.json文件，异常时用模板
-    try:
-        with open(overview_json_path, 'r', encoding='utf-8') as file:
-            overview_data = json.load(file)
-    except Exception as e:
-        logger.warning(f"{overview_json_path} 文件不存在或损坏，使用模板数据: {e}")
-        overview_data = OVERVIEW_TEMPLATE.copy()
-
-    # 更新数据
-    overview_data['dailyGeneration'] = int(statistics_dict['dailyGeneration'])
-    overview_data['monthlyGeneration'] = int(statistics_dict['monthlyGeneration'])
-    overview_data['cumulativeGeneration'] = int(statistics_dict['cumulativeGeneration'])
-    overview_data['cumulativeLossGeneration'] = int(statistics_dict['cumulativeLossGeneration'])
-    overview_data['cumulativeFaultInverterDetection'] = statistics_dict['cumulativeFaultInverterDetection']
-    overview_data['cumulativeFaultDetection'] = statistics_dict['cumulativeFaultDetection']
-    overview_data['toOMInverterFault'] = statistics_dict['toOMInverterFault']
-    overview_data['toOMFault'] = statistics_dict['toOMFault']
-    overview_data['estimatedLoss'] = int(statistics_dict['estimatedLoss'])
-    overview_data['stringAnomalyData'] = statistics_dict['stringAnomalyData']
-
-    station_data = overview_data.get('stationData', [])
-    for station in station_data:
-        station_name = station.get('label')
-        station['planPowerGeneration'] = station_dict.get(station_name, {}).get('planPowerGeneration', 0)
-        station['powerGeneration'] = station_dict.get(station_name, {}).get('powerGeneration', 0)
-        station['auxiliaryPowerRate'] = station_dict.get(station_name, {}).get('auxiliaryPowerRate', 0)
-        station['dataAnomalyRate'] = station_dict.get(station_name, {}).get('dataAnomalyRate', 0)
-        station['lowEfficiencyAnomalyRate'] = station_dict.get(station_name, {}).get('lowEfficiencyAnomalyRate', 0)
-        station['inefficientStringNumber'] = station_dict.get(station_name, {}).get('inefficientStringNumber', 0)
-
-    overview_data['stationData'] = station_data
-
-    # 写入更新后的overview.json文件
-    with open(overview_json_path, 'w', encoding='utf-8') as file:
-        json.dump(overview_data, file, ensure_ascii=False)
+
+    def update_overview(overview_data):
+        # 更新数据
+        overview_data['dailyGeneration'] = int(statistics_dict['dailyGeneration'])
+        overview_data['monthlyGeneration'] = int(statistics_dict['monthlyGeneration'])
+        overview_data['cumulativeGeneration'] = int(statistics_dict['cumulativeGeneration'])
+        overview_data['cumulativeLossGeneration'] = int(statistics_dict['cumulativeLossGeneration'])
+        overview_data['cumulativeFaultInverterDetection'] = statistics_dict['cumulativeFaultInverterDetection']
+        overview_data['cumulativeFaultDetection'] = statistics_dict['cumulativeFaultDetection']
+        overview_data['toOMInverterFault'] = statistics_dict['toOMInverterFault']
+        overview_data['toOMFault'] = statistics_dict['toOMFault']
+        overview_data['estimatedLoss'] = int(statistics_dict['estimatedLoss'])
+        overview_data['stringAnomalyData'] = statistics_dict['stringAnomalyData']
+
+        station_data = overview_data.get('stationData', [])
+        for station in station_data:
+            station_name = station.get('label')
+            station['planPowerGeneration'] = station_dict.get(station_name, {}).get('planPowerGeneration', 0)
+            station['powerGeneration'] = station_dict.get(station_name, {}).get('powerGeneration', 0)
+            station['auxiliaryPowerRate'] = station_dict.get(station_name, {}).get('auxiliaryPowerRate', 0)
+            station['dataAnomalyRate'] = station_dict.get(station_name, {}).get('dataAnomalyRate', 0)
+            station['lowEfficiencyAnomalyRate'] = station_dict.get(station_name, {}).get('lowEfficiencyAnomalyRate', 0)
+            station['inefficientStringNumber'] = station_dict.get(station_name, {}).get('inefficientStringNumber', 0)
+
+        overview_data['stationData'] = station_data
+        return overview_data
+
+    # 读-改-写 overview.json（原子写入），文件不存在或损坏时用模板
+    update_json(overview_json_path, update_overview, default=lambda: copy.deepcopy(OVERVIEW_TEMPLATE))
         
@@ -1,6 +1,8 @@
 import json
 import os
 import logging
+from schema.results_store import load_results
+from schema.jsonfile import write_json
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
@@ -14,6 +16,27 @@ COLOR_MAPPINGS = {
     }
 }
 
+# 地图要素中随日期变化的属性；其余属性和几何形状来自 merge/{场站名}/config/geo.json，不随日期变化
+MAP_DAY_PROPERTIES = ('anomaly_color', 'anomaly_font_color', 'degradation_color', 'degradation_font_color')
+
+
+def map_properties_path(repo_abs_path, station_name, process_date):
+    """
+    当天地图属性文件：data/{场站名}/maps/{日期}.props.json，只保存每个要素随日期变化的属性
+    """
+    return os.path.join(repo_abs_path, 'data', station_name, 'maps', f'{process_date}.props.json')
+
+
+def extract_map_properties(panel_geo_data):
+    """
+    从 GeoJSON 中取出随日期变化的属性：{要素名: {属性: 值}}
+    """
+    properties = {}
+    for feature in panel_geo_data.get('features', []):
+        feature_properties = feature.get('properties', {})
+        properties[feature_properties.get('name')] = {key: feature_properties[key] for key in MAP_DAY_PROPERTIES if key in feature_properties}
+    return properties
+
 def matches2mapping(matches_json_path):
     with open(matches_json_path, 'r', encoding='utf-8') as matches_file:
         matches_json = json.load(matches_file)
@@ -109,7 +132,6 @@ def set_mapping_color(panel_geo_data, location2string_mapping, daily_results, co
 
         # 添加 color 属性
         anomaly_color,anomaly_font_color = confidence2color_anomaly(anomaly_score,color_mappings['anomaly'],anomaly_type)
-        print(f"Feature: {feature_name}, Anomaly Score: {anomaly_score}, Anomaly Type: {anomaly_type}, Degradation Rate: {degradation_rate}")
         feature['properties']['anomaly_color'] = anomaly_color
         feature['properties']['anomaly_font_color'] = anomaly_font_color
         degradation_color,degradation_font_color = confidence2color_degradation(degradation_rate,color_mappings['degradation'])
@@ -128,37 +150,28 @@ def update_geojson_latest(panel_geo_data,location2string_mapping,daily_results,
 
 def generate_map_data(repo_abs_path, station_name, process_date):
     origin_geojson_path = os.path.join(repo_abs_path, 'merge', station_name, 'config', 'geo.json')
-    daily_log_path = os.path.join(repo_abs_path, 'data', station_name, 'results', f'{process_date}.json')
     matches_json_path = os.path.join(repo_abs_path, 'merge', station_name, 'config', 'matches.json')
-    map_geojson_dir = os.path.join(repo_abs_path, 'data', station_name, 'maps')
-    os.makedirs(map_geojson_dir, exist_ok=True)
-    map_geojson_path = os.path.join(map_geojson_dir, f'{process_date}.json')
+    map_properties_json_path = map_properties_path(repo_abs_path, station_name, process_date)
 
     with open(origin_geojson_path, 'r', encoding='utf-8') as file:
         panel_geo_data = json.load(file)
 
-    # 只有当 daily_log_path对应的文件存在且能够正常读取时才生成地图数据
-    if os.path.exists(daily_log_path):
+    # 只有当天结果存在且能够正常读取时才生成地图数据
+    daily_data = load_results(repo_abs_path, station_name, process_date, fields=['diagnosis_results', 'degradation_score'])
+    if daily_data is not None:
         try:
-            with open(daily_log_path, 'r', encoding='utf-8') as file:
-                daily_data = json.load(file)
             daily_results = daily_data.get('results', {})
 
             location2string_mapping = matches2mapping(matches_json_path)
 
             panel_geo_data = update_geojson_latest(panel_geo_data, location2string_mapping, daily_results, COLOR_MAPPINGS)
-
-            # 保存处理后的 GeoJSON 数据
-            with open(map_geojson_path, 'w', encoding='utf-8') as file:
-                json.dump(panel_geo_data, file, ensure_ascii=False)
         except Exception as e:
             # 文件损坏或无法读取，全部置灰
-            logger.error(f"{daily_log_path} 文件损坏或无法读取，地图全部置灰: {e}")
+            logger.error(f"{station_name} {process_date} 结果读取失败，地图全部置灰: {e}")
             panel_geo_data = set_grey_color(panel_geo_data)
-            with open(map_geojson_path, 'w', encoding='utf-8') as file:
-                json.dump(panel_geo_data, file, ensure_ascii=False)
     else:
-        logger.warning(f"{daily_log_path} 文件不存在，地图全部置灰")
+        logger.warning(f"{station_name} {process_date} 结果不存在，地图全部置灰")
         panel_geo_data = set_grey_color(panel_geo_data)
-        with open(map_geojson_path, 'w', encoding='utf-8') as file:
-            json.dump(panel_geo_data, file, ensure_ascii=False)
+
+    # 几何形状与 geo.json 相同，只保存当天的颜色属性，接口读取时再与几何形状合并
+    write_json(map_properties_json_path, {'date': process_date, 'properties': extract_map_properties(panel_geo_data)})
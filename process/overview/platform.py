@@ -2,6 +2,7 @@ import json
 import requests
 import os
 from datetime import datetime, timedelta
+from schema.jsonfile import write_json
 
 STATION2SOLAR_NAME = {
     'datu': '大唐长大涂光伏电站',
@@ -124,8 +125,7 @@ def save_faults2json(faults_dict, station_name, process_date, repo_abs_path):
         os.makedirs(dir_path)
 
     json_file_path = os.path.join(dir_path, f"{process_date}.json")
-    with open(json_file_path, "w", encoding="utf-8") as json_file:
-        json.dump(faults_dict, json_file, ensure_ascii=False)
+    write_json(json_file_path, faults_dict)
 
 def export_report(repo_abs_path, station_name, process_date, token):
     solar_name = STATION2SOLAR_NAME.get(station_name, station_name)
@@ -1,7 +1,6 @@
-import json
-import os
 from datetime import datetime, timedelta
 import logging
+from schema.results_store import load_string_fields, load_statistics
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
@@ -9,25 +8,19 @@ logger = logging.getLogger(__name__)
 def get_cumulative_data(repo_abs_path, station_name, process_date):
     # process_date 格式为 'YYYY-MM-DD'，我需要前一天的日期
     prev_date = (datetime.strptime(process_date, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-    prev_json_file_path = os.path.join(repo_abs_path, 'data', station_name, 'results', f'{prev_date}.json')
 
     cumulative_data = {
         'cumulative_fault_string': 0, # 累计故障组串数
         'cumulative_fault_inverter': 0 # 累计故障逆变器数
     }
 
-    if not os.path.exists(prev_json_file_path):
-        return cumulative_data
-
     try:
-        with open(prev_json_file_path, 'r', encoding='utf-8') as file:
-            prev_json_data = json.load(file)
-        statistics = prev_json_data.get('statistics', {})
+        statistics = load_statistics(repo_abs_path, station_name, prev_date) or {}
         cumulative_data['cumulative_fault_string'] += statistics.get('cumulative_fault_string', 0)
         cumulative_data['cumulative_fault_inverter'] += statistics.get('cumulative_fault_inverter', 0)
     except Exception as e:
-        # 文件损坏或读取异常时, 记录日志并返回初始值
-        logger.error(f"Error reading previous JSON file {prev_json_file_path}: {e}. Returning initial cumulative data.")
+        # 读取异常时, 记录日志并返回初始值
+        logger.error(f"Error reading previous statistics of {station_name} {prev_date}: {e}. Returning initial cumulative data.")
         return cumulative_data
 
     return cumulative_data
@@ -37,10 +30,9 @@ def statistics_json_file(repo_abs_path, station_name, process_date):
     # 首先获取前一天的累计数据
     cumulative_data = get_cumulative_data(repo_abs_path, station_name, process_date) # 获取场站的累积故障数(组串级和逆变器级)
 
-    json_file_path = os.path.join(repo_abs_path, 'data', station_name, 'results', f'{process_date}.json')
-
-    with open(json_file_path, 'r', encoding='utf-8') as file:
-        json_data = json.load(file)
+    # 只读取统计需要的字段
+    data_results = load_string_fields(repo_abs_path, station_name, process_date,
+                                      fields=['diagnosis_results', 'history_loss', 'future_loss', 'accumulated_loss'])
 
     total_strings = 0 # 场站当日的组串总数
     fault_string_count = 0 # 场站当日的故障组串数
@@ -55,7 +47,6 @@ def statistics_json_file(repo_abs_path, station_name, process_date):
     loss_energy = 0 # 场站当日的预估损失量
     future_week_loss = 0 # 场站未来一周的总预估损失量
     
-    data_results = json_data.get('results', {})
     # 遍历 data_results 中的每个键值对
     for string_id, value in data_results.items():
         # 1. 统计组串故障
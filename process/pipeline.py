@@ -0,0 +1,233 @@
+# 按场站依赖执行的流水线调度器：
+# 每个场站的 preprocess → impute → predict → merge → diagnose → postprocess 是一条独立的链，
+# 上一阶段完成后立即提交该场站的下一阶段，不再等待所有场站完成同一阶段；
+# I/O 型阶段（KairosDB 查询、数据库写入、文件合并）和 CPU 型阶段（模型推理）使用各自的线程池；
+# 每个阶段可单独配置执行后端：thread（线程池）、process（进程池，绕开 GIL）、inline（在流水线专用的单个线程中依次执行，
+# 不占用 I/O / CPU 池的线程，也不在上一阶段的完成回调里执行）
+import os
+import time
+import importlib
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+STATION_STAGES = ('preprocess', 'impute', 'predict', 'merge', 'diagnose', 'postprocess')
+# 各阶段所属的资源池
+STAGE_POOLS = {
+    'preprocess': 'io',
+    'impute': 'cpu',
+    'predict': 'cpu',
+    'merge': 'io',
+    'diagnose': 'cpu',
+    'postprocess': 'io',
+}
+
+STAGE_BACKENDS = ('thread', 'process', 'inline')
+
+# 流水线配置在使用时读取（见 pipeline_setting），模块可能在 load_dotenv 之前被导入
+PIPELINE_DEFAULTS = {
+    'PIPELINE_IO_WORKERS': '4',
+    'PIPELINE_CPU_WORKERS': '2',
+    # 阶段执行后端，形如 "impute:process,diagnose:process"，未列出的阶段使用 thread
+    'PIPELINE_STAGE_BACKENDS': '',
+    'PIPELINE_PROCESS_WORKERS': '2',
+    # 每个工作进程内 torch/BLAS/OpenMP 的线程数，避免多进程时线程数超过 CPU 核数
+    'PIPELINE_WORKER_THREADS': '1',
+}
+
+
+def pipeline_setting(name):
+    """
+    读取流水线配置，PIPELINE_STAGE_BACKENDS 返回字符串，其余返回 int
+    """
+    value = os.getenv(name, PIPELINE_DEFAULTS[name]).strip()
+    return value if name == 'PIPELINE_STAGE_BACKENDS' else int(value)
+
+
+def parse_stage_backends(value=None):
+    """
+    解析阶段执行后端配置，value 为 None 时读取 PIPELINE_STAGE_BACKENDS
+
+    Returns:
+        dict: {阶段: 'thread' | 'process' | 'inline'}
+    """
+    if value is None:
+        value = pipeline_setting('PIPELINE_STAGE_BACKENDS')
+    backends = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        stage, _, backend = item.partition(':')
+        backend = backend.strip().lower() or 'thread'
+        if backend not in STAGE_BACKENDS:
+            logger.warning(f"unknown backend '{backend}' for stage '{stage.strip()}', use thread")
+            backend = 'thread'
+        backends[stage.strip()] = backend
+    return backends
+
+
+def limit_worker_threads(threads):
+    """
+    工作进程初始化：限制 torch/BLAS/OpenMP 线程数，需在导入 torch 等库之前调用
+    """
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS", "NUMBA_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+    except Exception as e:
+        logger.warning(f"BLAS thread limit not applied: {e}")
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(threads)
+    except Exception as e:
+        logger.warning(f"torch thread limit not applied: {e}")
+
+
+def init_stage_worker(threads, setup=None, setup_args=()):
+    """
+    阶段工作进程的 initializer：先限制线程数，再导入并执行 setup（如预加载模型）
+
+    Args:
+        threads: 每个进程的 torch/BLAS 线程数
+        setup: "模块:函数" 形式的字符串，在限制线程数之后才导入，避免 torch 等库提前初始化线程池
+        setup_args: setup 的参数
+    """
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    limit_worker_threads(threads)
+    if setup:
+        module_name, _, func_name = setup.partition(':')
+        getattr(importlib.import_module(module_name), func_name)(*setup_args)
+
+
+def create_process_pool(initializer=None, initargs=(), workers=None):
+    """
+    创建阶段工作进程池；使用 spawn 启动，子进程不继承父进程的数据库连接和线程
+    workers 为 None 时读取 PIPELINE_PROCESS_WORKERS
+    """
+    if workers is None:
+        workers = pipeline_setting('PIPELINE_PROCESS_WORKERS')
+    return ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context('spawn'),
+                               initializer=initializer, initargs=initargs)
+
+
+class StationDagExecutor:
+    """
+    场站级 DAG 执行器
+
+    Args:
+        run_stage: 执行单个阶段的函数 run_stage(stage, station_name)
+        stages: 每个场站依次执行的阶段
+        stage_pools: {阶段: 'io' | 'cpu'}
+        io_workers: I/O 池线程数，默认 PIPELINE_IO_WORKERS
+        cpu_workers: CPU 池线程数，默认 PIPELINE_CPU_WORKERS
+        stage_backends: {阶段: 'thread' | 'process' | 'inline'}，未列出的阶段使用 thread
+        process_task: process 后端在子进程中执行的函数 process_task(stage, station_name)，需可序列化，返回耗时（秒）
+        process_pool_factory: 创建进程池的函数，第一次提交 process 阶段时调用
+    """
+
+    def __init__(self, run_stage, stages=STATION_STAGES, stage_pools=None, io_workers=None, cpu_workers=None,
+                 stage_backends=None, process_task=None, process_pool_factory=None):
+        self.run_stage = run_stage
+        self.stages = list(stages)
+        self.stage_pools = stage_pools or STAGE_POOLS
+        self.io_workers = max(1, pipeline_setting('PIPELINE_IO_WORKERS') if io_workers is None else io_workers)
+        self.cpu_workers = max(1, pipeline_setting('PIPELINE_CPU_WORKERS') if cpu_workers is None else cpu_workers)
+        self.stage_backends = stage_backends or {}
+        self.process_task = process_task
+        self.process_pool_factory = process_pool_factory or create_process_pool
+        if self.process_task is None and 'process' in self.stage_backends.values():
+            raise ValueError("process backend requires process_task")
+
+    def run(self, station_list):
+        """
+        执行所有场站的阶段链，某个场站的阶段失败时只终止该场站的后续阶段
+
+        Returns:
+            dict: {station_name: {'status': 'success' | 'failed', 'failed_stage': str | None,
+                                  'error': str | None, 'durations': {stage: 秒}}}
+        """
+        results = {station_name: {'status': 'running', 'failed_stage': None, 'error': None, 'durations': {}}
+                   for station_name in station_list}
+        if not station_list or not self.stages:
+            return results
+
+        lock = threading.Lock()
+        remaining = [len(station_list)]
+        finished = threading.Event()
+
+        pools = {
+            'io': ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix='pipeline-io'),
+            'cpu': ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix='pipeline-cpu'),
+            # inline 阶段统一交给这一个线程串行执行，线程在第一次提交时才创建
+            'inline': ThreadPoolExecutor(max_workers=1, thread_name_prefix='pipeline-inline'),
+        }
+        pool_lock = threading.Lock()
+
+        def get_process_pool():
+            with pool_lock:
+                if 'process' not in pools:
+                    pools['process'] = self.process_pool_factory()
+                return pools['process']
+
+        def finish_station(station_name, status):
+            results[station_name]['status'] = status
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    finished.set()
+
+        def run_timed(stage, station_name):
+            start_time = time.time()
+            self.run_stage(stage, station_name)
+            return time.time() - start_time
+
+        def submit(station_name, index):
+            stage = self.stages[index]
+            backend = self.stage_backends.get(stage, 'thread')
+            if backend == 'inline':
+                future = pools['inline'].submit(run_timed, stage, station_name)
+            elif backend == 'process':
+                future = get_process_pool().submit(self.process_task, stage, station_name)
+            else:
+                future = pools[self.stage_pools.get(stage, 'io')].submit(run_timed, stage, station_name)
+            future.add_done_callback(lambda f: on_done(station_name, index, f))
+
+        def on_done(station_name, index, future):
+            stage = self.stages[index]
+            try:
+                duration = future.result()
+            except Exception as e:
+                logger.error(f"{station_name} {stage} failed, remaining stages skipped: {e}")
+                results[station_name]['failed_stage'] = stage
+                results[station_name]['error'] = str(e)
+                finish_station(station_name, 'failed')
+                return
+
+            results[station_name]['durations'][stage] = round(duration, 2)
+            logger.info(f"{station_name} {stage} completed in {duration:.2f} seconds")
+            if index + 1 == len(self.stages):
+                finish_station(station_name, 'success')
+                return
+            try:
+                submit(station_name, index + 1)
+            except Exception as e:
+                logger.error(f"{station_name} submit {self.stages[index + 1]} failed: {e}")
+                results[station_name]['failed_stage'] = self.stages[index + 1]
+                results[station_name]['error'] = str(e)
+                finish_station(station_name, 'failed')
+
+        try:
+            for station_name in station_list:
+                submit(station_name, 0)
+            finished.wait()
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+        return results
@@ -1,12 +1,15 @@
-import json
 import os
 from datetime import datetime
 import time
 import pandas as pd
+import numpy as np
 import re
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image as XLImage
 from openpyxl.styles import Alignment
+from sqlalchemy import select, or_
+from schema.columnar import fetch_columns
+from schema.results_cache import get_results
 
 # 添加日志函数
 def silent_log(*args, **kwargs):
@@ -102,26 +105,33 @@ def get_inverter_alarms(station_name, process_date, repo_abs_path, database_mana
         alarm_results = []
         alarm_count = 0
         with database_manager.get_session(station_name) as session:
-            query = session.query(InverterInfo).filter(
-                InverterInfo.timestamp >= start_timestamp,
-                InverterInfo.timestamp <= end_timestamp
+            # 每条有告警的小时记录、每种告警列一次；只投影箱变、逆变器编号和表中存在的告警列，且只取有告警的行
+            fields = [field for field in alarm_fields if field in INVERTER_ALARM_MAPPING and hasattr(InverterInfo, field)]
+            if not fields:
+                return alarm_results
+            stmt = (
+                select(InverterInfo.box_id, InverterInfo.inverter_id, *[getattr(InverterInfo, field) for field in fields])
+                .where(InverterInfo.timestamp >= start_timestamp)
+                .where(InverterInfo.timestamp <= end_timestamp)
+                .where(or_(*[getattr(InverterInfo, field) == 1 for field in fields]))
             )
-            results = query.all()
-            for row in results:
-                for field in alarm_fields:
-                    if hasattr(row, field) and getattr(row, field) == 1:
-                        if field in INVERTER_ALARM_MAPPING:
-                            alarm_count += 1
-                            alarm_name = INVERTER_ALARM_MAPPING[field]
-                            alarm_results.append({
-                                "order": alarm_count,
-                                "alarmType": "逆变器告警",
-                                "deviceCode": f"{getattr(row, 'box_id', '')}号箱变-{getattr(row, 'inverter_id', '')}号逆变器",
-                                "alarmName": alarm_name,
-                                "suggestion": SUGGESTION_MAPPING.get(alarm_name, ""),
-                                "tools": TOOLS_MAPPING.get(alarm_name, ""),
-                                "peopleCount": 2
-                            })
+            columns = fetch_columns(session, stmt, {field: np.float64 for field in fields})
+            if len(columns['box_id']) == 0:
+                return alarm_results
+            fired = np.column_stack([columns[field] == 1 for field in fields])
+            # np.nonzero 按行优先返回，与逐行逐字段遍历的顺序一致
+            for row_index, field_index in zip(*np.nonzero(fired)):
+                alarm_count += 1
+                alarm_name = INVERTER_ALARM_MAPPING[fields[field_index]]
+                alarm_results.append({
+                    "order": alarm_count,
+                    "alarmType": "逆变器告警",
+                    "deviceCode": f"{columns['box_id'][row_index]}号箱变-{columns['inverter_id'][row_index]}号逆变器",
+                    "alarmName": alarm_name,
+                    "suggestion": SUGGESTION_MAPPING.get(alarm_name, ""),
+                    "tools": TOOLS_MAPPING.get(alarm_name, ""),
+                    "peopleCount": 2
+                })
         return alarm_results
     except Exception as e:
         return []
@@ -149,15 +159,9 @@ def get_string_alarms(station_name, process_date, repo_abs_path, processed_devic
         alarm_results = []
         alarm_count = 0
         
-        # 尝试打开JSON文件
-        json_file_path = os.path.join(repo_abs_path, 'data', station_name, 'results', f'{process_date}.json')
-        if not os.path.exists(json_file_path):
-            return []
-        
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            json_data = json.load(file)
-            
-        if 'results' not in json_data:
+        # 读取当天组串诊断结果
+        json_data = get_results(repo_abs_path, station_name, process_date)
+        if json_data is None:
             return []
         
         # 处理组串告警结果
@@ -275,22 +279,13 @@ def get_center_string_alarms(station_name, process_date, repo_abs_path):
         
         # 遍历该运维中心下的所有场站
         for center_station_name in center_stations:
-            # 组串告警JSON文件路径
-            json_file_path = os.path.join(repo_abs_path, 'data', center_station_name, 'results', f'{date_str}.json')
-            
-            # 检查文件是否存在
-            if not os.path.exists(json_file_path):
-                silent_log(f"场站 {center_station_name} 的 {date_str}.json 文件不存在")
-                continue
-                
             try:
-                # 读取JSON数据
-                with open(json_file_path, 'r', encoding='utf-8') as file:
-                    json_data = json.load(file)
+                # 读取组串诊断结果
+                json_data = get_results(repo_abs_path, center_station_name, date_str)
                 
-                # 确保有results字段
-                if 'results' not in json_data:
-                    silent_log(f"场站 {center_station_name} 的 JSON 数据中没有 results 字段")
+                # 检查结果是否存在
+                if json_data is None:
+                    silent_log(f"场站 {center_station_name} 的 {date_str} 结果不存在")
                     continue
                 
                 string_count = 0
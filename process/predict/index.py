@@ -11,6 +11,9 @@ import logging
 from sqlalchemy import func
 from sklearn.linear_model import LinearRegression
 from process.predict.utils import date2timestamp, normalize, denormalize
+from schema.rollup import ensure_rollup_tables, rollup_covered_days
+from schema.results_store import load_string_fields, upsert_string_fields
+from process.metrics import span
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
@@ -115,20 +118,32 @@ def calculate_string_loss(process_date, station_name, inverter_predicted_power,
     _, _, string_info = station_model
 
     try:
+        string_daily, _ = ensure_rollup_tables(database_manager, station_name)
         with database_manager.get_session(station_name) as session:
-            # 查询
-            results = (
-                session.query(
-                    string_info.device_id,
-                    func.sum((string_info.intensity * string_info.voltage) / 6).label('total_sum') # 测试用
-                    # func.sum((string_info.fixed_intensity * string_info.fixed_voltage) / 6).label('total_sum') # 部署用
-                )
-                .filter(string_info.timestamp >= start_timestamp)
-                .filter(string_info.timestamp < end_timestamp)
-                .filter(string_info.intensity != None)
-                .filter(string_info.voltage != None)
-                .group_by(string_info.device_id)
-            ).all()
+            # 当日已汇总时读取组串日汇总表中的发电量（sum(intensity * voltage / 6)），否则回退到原始小时数据
+            if start_timestamp in rollup_covered_days(session, string_daily, start_timestamp, start_timestamp):
+                results = (
+                    session.query(
+                        string_daily.device_id,
+                        string_daily.energy.label('total_sum')
+                    )
+                    .filter(string_daily.day == start_timestamp)
+                    .filter(string_daily.valid_hours > 0)
+                ).all()
+            else:
+                # 查询
+                results = (
+                    session.query(
+                        string_info.device_id,
+                        func.sum((string_info.intensity * string_info.voltage) / 6).label('total_sum') # 测试用
+                        # func.sum((string_info.fixed_intensity * string_info.fixed_voltage) / 6).label('total_sum') # 部署用
+                    )
+                    .filter(string_info.timestamp >= start_timestamp)
+                    .filter(string_info.timestamp < end_timestamp)
+                    .filter(string_info.intensity != None)
+                    .filter(string_info.voltage != None)
+                    .group_by(string_info.device_id)
+                ).all()
 
             # 将查询结果转换为字典
             result_dict = {}
@@ -195,134 +210,77 @@ def history2future_loss(history_loss):
 
 def write_history_loss(process_date, station_name, repo_abs_path, string_loss): 
     """
-    该函数用于将每个组串的当日损失量(loss_power)和劣化率(degradation_score)写入对应日期的日志文件，实现历史损失的累计和更新。
-    - 如果存在昨天的日志，则在昨天的历史损失基础上追加今天的损失，并只保留最近30天。
-    - 如果不存在昨天的日志，则以今天的损失为起点。
-    - 如果今天的日志文件已存在，则只更新每个组串的损失量。
-    - 如果今天的日志文件不存在，则创建新文件。
+    该函数用于将每个组串的当日损失量(loss_power)和劣化率(degradation_score)写入结果库中对应日期的记录，实现历史损失的累计和更新。
+    - 如果存在昨天的结果，则在昨天的历史损失基础上追加今天的损失，并只保留最近30天。
+    - 如果不存在昨天的结果，则以今天的损失为起点。
+    - 只写入 history_loss、future_loss、degradation_score、accumulated_loss 四个字段，其余阶段的字段保持不变。
     """
     yesterday_date = (datetime.datetime.strptime(process_date, "%Y-%m-%d") - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
 
-    log_path = os.path.join(repo_abs_path, 'data', station_name, "results", f"{process_date}.json")
-    yesterday_path = os.path.join(repo_abs_path, 'data', station_name, "results", f"{yesterday_date}.json")
+    # 只读取需要的字段
+    yesterday_results = load_string_fields(repo_abs_path, station_name, yesterday_date,
+                                           fields=['history_loss', 'degradation_score', 'accumulated_loss'])
 
     history_dict = dict() # 包含每个组串的历史损失量(列表, 最多30个元素,最后一个元素应为当日损失量)
 
-    if os.path.exists(yesterday_path):
-        with open(yesterday_path, 'r') as f:
-            try:
-                yesterday_data = json.load(f)
-                # 合并昨天的历史损失，并追加今天的损失
-                for device_id, loss_dict in yesterday_data.get("results", {}).items():
-                    history_loss_list = loss_dict.get("history_loss", [])
-                    # 追加今天的损失
-                    current_loss = string_loss.get(device_id, {}).get('loss_power', 0)
-                    history_loss_list.append(current_loss)
-                    # 保留最近30天
-                    if len(history_loss_list) > 30:
-                        history_loss_list = history_loss_list[-30:]
-                    history_dict[device_id] = history_loss_list
-            except json.JSONDecodeError as e:
-                logger.warning(f"昨日历史损失文件损坏，忽略昨日数据: {e}")
-                history_dict = {device_id: [string_loss.get(device_id, {}).get('loss_power', 0)] for device_id in string_loss.keys()}
+    if yesterday_results:
+        # 合并昨天的历史损失，并追加今天的损失
+        for device_id, loss_dict in yesterday_results.items():
+            history_loss_list = loss_dict.get("history_loss", [])
+            # 追加今天的损失
+            current_loss = string_loss.get(device_id, {}).get('loss_power', 0)
+            history_loss_list.append(current_loss)
+            # 保留最近30天
+            if len(history_loss_list) > 30:
+                history_loss_list = history_loss_list[-30:]
+            history_dict[device_id] = history_loss_list
     else:
-        # 没有昨天的日志，则以今天的损失为起点
+        # 没有昨天的结果，则以今天的损失为起点
         history_dict = {device_id: [string_loss.get(device_id, {}).get('loss_power', 0)] for device_id in string_loss.keys()}
 
     # 预测未来的损失
     future_dict = history2future_loss(history_dict) # 包含每个组串的未来损失量(列表, 7个元素)
 
-    # 获取前一天的劣化率数据和累计损失数据
-    yesterday_degradation_dict = {} # 包含每个组串的昨天的劣化率
-    yesterday_accumulated_loss_dict = {} # 包含每个组串的昨天的累计损失量
-    if os.path.exists(yesterday_path):
-        with open(yesterday_path, 'r') as f:
-            try:
-                yesterday_data = json.load(f)
-                for device_id, loss_dict in yesterday_data.get("results", {}).items():
-                    yesterday_degradation_dict[device_id] = loss_dict.get("degradation_score", 0)
-                    yesterday_accumulated_loss_dict[device_id] = loss_dict.get("accumulated_loss", 0)
-            except json.JSONDecodeError as e:
-                logger.warning(f"昨日历史损失文件损坏，无法获取昨日数据: {e}")
+    rows = {}
+    for device_id, loss_list in history_dict.items():
+        current_degradation = string_loss.get(device_id, {}).get('degradation_score', 0)  # 获取当前组串的劣化率
+
+        # 检查前一天的劣化率，确保劣化率单调不减
+        previous_degradation = yesterday_results.get(device_id, {}).get("degradation_score", 0)
+        if current_degradation < previous_degradation:
+            current_degradation = previous_degradation
+
+        # 计算累计损失量
+        today_loss = loss_list[-1] if loss_list else 0  # 今天的损失量（Wh）
+        previous_accumulated_loss = yesterday_results.get(device_id, {}).get("accumulated_loss", 0)  # 前一天的累计损失量（kWh）
 
-    # 判断今天的日志文件是否存在
-    if not os.path.exists(log_path):
-        # 不存在则创建新日志
-        log_dict = {
-            "date": process_date,
-            "results": {}
+        # 将今天的损失量从 Wh 转换为 kWh，然后加到累计损失量中
+        today_loss_kwh = today_loss / 1000  # 转换为 kWh
+        accumulated_loss = previous_accumulated_loss + today_loss_kwh  # 累计损失量以 kWh 为单位存储
+
+        rows[device_id] = {
+            "history_loss": loss_list,
+            "future_loss": future_dict.get(device_id, []),
+            "degradation_score": current_degradation,
+            "accumulated_loss": accumulated_loss
         }
-        for device_id, loss_list in history_dict.items():
-            current_degradation = string_loss.get(device_id, {}).get('degradation_score', 0)  # 获取当前组串的劣化率
-            
-            # 检查前一天的劣化率，确保劣化率单调不减
-            previous_degradation = yesterday_degradation_dict.get(device_id, 0)
-            if current_degradation < previous_degradation:
-                current_degradation = previous_degradation
-            
-            # 计算累计损失量
-            today_loss = loss_list[-1] if loss_list else 0  # 今天的损失量（Wh）
-            previous_accumulated_loss = yesterday_accumulated_loss_dict.get(device_id, 0)  # 前一天的累计损失量（kWh）
-            
-            # 将今天的损失量从 Wh 转换为 kWh，然后加到累计损失量中
-            today_loss_kwh = today_loss / 1000  # 转换为 kWh
-            accumulated_loss = previous_accumulated_loss + today_loss_kwh  # 累计损失量以 kWh 为单位存储
-            
-            log_dict["results"][device_id] = {
-                "history_loss": loss_list, 
-                "future_loss": future_dict.get(device_id, []),
-                "degradation_score": current_degradation,
-                "accumulated_loss": accumulated_loss
-            }
-        with open(log_path, 'w', encoding='utf-8') as f:
-            json.dump(log_dict, f, ensure_ascii=False)
-    else:
-        # 已存在则只更新历史损失量、未来损失量、劣化率和累计损失量
-        with open(log_path, 'r', encoding='utf-8') as f:
-            log_dict = json.load(f)
-        results = log_dict.get("results", {})
-        for device_id, loss_list in history_dict.items():
-            current_degradation = string_loss.get(device_id, {}).get('degradation_score', 0)
-            
-            # 检查前一天的劣化率，确保劣化率单调不减
-            previous_degradation = yesterday_degradation_dict.get(device_id, 0)
-            if current_degradation < previous_degradation:
-                current_degradation = previous_degradation
-            
-            # 计算累计损失量
-            today_loss = loss_list[-1] if loss_list else 0  # 今天的损失量（Wh）
-            previous_accumulated_loss = yesterday_accumulated_loss_dict.get(device_id, 0)  # 前一天的累计损失量（kWh）
-            
-            # 将今天的损失量从 Wh 转换为 kWh，然后加到累计损失量中
-            today_loss_kwh = today_loss / 1000  # 转换为 kWh
-            accumulated_loss = previous_accumulated_loss + today_loss_kwh  # 累计损失量以 kWh 为单位存储
-            
-            if device_id in results:
-                results[device_id]["history_loss"] = loss_list
-                results[device_id]["future_loss"] = future_dict.get(device_id, [])
-                results[device_id]["degradation_score"] = current_degradation
-                results[device_id]["accumulated_loss"] = accumulated_loss
-            else:
-                results[device_id] = {
-                    "history_loss": loss_list, 
-                    "future_loss": future_dict.get(device_id, []),
-                    "degradation_score": current_degradation,
-                    "accumulated_loss": accumulated_loss
-                }
-        log_dict["results"] = results
-        with open(log_path, 'w', encoding='utf-8') as f:
-            json.dump(log_dict, f, ensure_ascii=False)
+    upsert_string_fields(repo_abs_path, station_name, process_date, rows)
 
 def predict_schedule(process_date, repo_abs_path, database_manager, station_models, station_name):
     logger.info(f"{station_name}_predict started at {process_date}")
     logger.info(f"\t{station_name}_step1 start: Load model and global parameters")
-    model, device, global_params = load_model_and_params(repo_abs_path, station_name)
+    with span('model_load', station=station_name, stage='predict'):
+        model, device, global_params = load_model_and_params(repo_abs_path, station_name)
     logger.info(f"\t{station_name}_step2 start: Generate optimal inverter string power prediction")
-    inverter_predicted_power = generate_inverters_loss(process_date, station_name, global_params, model, device, database_manager, station_models[station_name])
+    with span('inference', station=station_name, stage='predict') as s:
+        inverter_predicted_power = generate_inverters_loss(process_date, station_name, global_params, model, device, database_manager, station_models[station_name])
+        s.set(rows=len(inverter_predicted_power) if inverter_predicted_power is not None else 0)
     logger.info(f"\t{station_name}_step3 start: Calculate string-level loss")
-    string_loss = calculate_string_loss(process_date, station_name, inverter_predicted_power, database_manager, station_models[station_name])
+    with span('string_loss', station=station_name, stage='predict'):
+        string_loss = calculate_string_loss(process_date, station_name, inverter_predicted_power, database_manager, station_models[station_name])
     logger.info(f"\t{station_name}_step4 : Write string-level loss to log file")
     # Write string-level loss for the corresponding date and station to the log file
-    write_history_loss(process_date, station_name, repo_abs_path, string_loss)
+    with span('results_write', station=station_name, stage='predict'):
+        write_history_loss(process_date, station_name, repo_abs_path, string_loss)
 
     logger.info(f"{station_name}_predict completed at {process_date}")
\ No newline at end of file
@@ -10,6 +10,8 @@ import pytz  # 引入pytz库来处理时区
 import numpy as np
 from sqlalchemy.exc import SQLAlchemyError
 import logging
+from schema.rollup import refresh_daily_rollups
+from process.metrics import span
 
 # 日志配置（只需在模块顶部配置一次即可）
 logger = logging.getLogger(__name__)
@@ -524,6 +526,17 @@ def df2orm(dataframe_dict, station_name, processing_stamps, database_manager, st
 
     logger.info(f"成功插入 {sum(len(df) for df in dataframe_dict.values())} 条记录")
 
+    # 只对本次写入涉及的日期更新日汇总表
+    rollup_tables = [name for table_name, name in (('StringInfo', 'string'), ('InverterInfo', 'inverter'))
+                     if not dataframe_dict.get(table_name, pd.DataFrame()).empty]
+    if rollup_tables:
+        changed_stamps = set(processing_stamps or [])
+        for table_name in ('StringInfo', 'InverterInfo'):
+            df = dataframe_dict.get(table_name)
+            if df is not None and not df.empty:
+                changed_stamps.update(df['timestamp'].unique().tolist())
+        refresh_daily_rollups(database_manager, station_name, station_model, changed_stamps, tables=rollup_tables)
+
 def fill_voltage(df: pd.DataFrame) -> pd.DataFrame:
     """
     对datuStringInfo的DataFrame进行电压填补，仅填补voltage字段，其它字段保持原有值。
@@ -587,23 +600,29 @@ def preprocess_log(start_timestamp, end_timestamp, station_name,kairosdb_url, re
     logger.info(f"\t{station_name}_preprocess_step1: Query remote database")
 
     # Step 1: Query remote database
-    default_response, config_mapping, shared_mapping = query_remote_database(station_name,
-                                                                             start_timestamp * 1000,
-                                                                             end_timestamp * 1000,
-                                                                             kairosdb_url, config_dir_path)
+    with span('query', station=station_name, stage='preprocess'):
+        default_response, config_mapping, shared_mapping = query_remote_database(station_name,
+                                                                                 start_timestamp * 1000,
+                                                                                 end_timestamp * 1000,
+                                                                                 kairosdb_url, config_dir_path)
     logger.info(f"\t{station_name}_preprocess_step2: Process response")
     # Step 2: Process response
-    dict_response,is_valid_response = process_response(default_response, config_mapping, shared_mapping)
+    with span('decode', station=station_name, stage='preprocess'):
+        dict_response,is_valid_response = process_response(default_response, config_mapping, shared_mapping)
     if not is_valid_response:
         logger.warning("No valid data in {} station from {} to {}. preprocess_log function has stopped".format(station_name, start_timestamp, end_timestamp))
         return
 
     logger.info(f"\t{station_name}_preprocess_step3: Transform response to dataframe")
     # Step 3: Transform response to dataframe
-    dataframe_dict, processing_stamps = transform_response2df(dict_response)
+    with span('transform', station=station_name, stage='preprocess') as s:
+        dataframe_dict, processing_stamps = transform_response2df(dict_response)
+        s.set(rows=sum(len(df) for df in dataframe_dict.values()))
     logger.info(f"\t{station_name}_preprocess_step4: Save dataframe to sqlite")
     # Step 4: Save dataframe to sqlite
-    df2orm(dataframe_dict, station_name, processing_stamps, database_manager, station_model)
+    with span('orm_write', station=station_name, stage='preprocess') as s:
+        s.set(rows=sum(len(df) for df in dataframe_dict.values()))
+        df2orm(dataframe_dict, station_name, processing_stamps, database_manager, station_model)
 
     logger.info(f"{station_name}_preprocess completed")
 
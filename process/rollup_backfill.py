@@ -0,0 +1,86 @@
+# 日汇总表回填入口：汇总表上线前写入的历史数据没有日汇总，读取时这些日期会回退到原始小时数据，
+# 回填后即可走汇总表
+#
+# 用法（在项目根目录下）：
+#   python -m process.rollup_backfill --start 2025-01-01 --end 2025-05-20 [--stations datu,daxue] [--tables string,inverter]
+#
+# 按天逐日重新汇总（每天一个事务），已存在的汇总行会被覆盖，组串的数据质量统计保留；可以重复执行
+import os
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+import pytz
+
+from schema.rollup import refresh_daily_rollups
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLES = ('string', 'inverter')
+
+
+def backfill_daily_rollups(database_manager, station_name, station_model, start_date, end_date, tables=ROLLUP_TABLES):
+    """
+    逐日回填 [start_date, end_date] 的日汇总数据
+
+    Args:
+        start_date: 开始日期，形如 "2025-01-01"
+        end_date: 结束日期（含），形如 "2025-05-20"
+        tables: 需要回填的表，'string' 和/或 'inverter'
+    Returns:
+        int: 处理的天数
+    """
+    shanghai_tz = pytz.timezone('Asia/Shanghai')
+    day = datetime.strptime(start_date, '%Y-%m-%d')
+    last = datetime.strptime(end_date, '%Y-%m-%d')
+    count = 0
+    while day <= last:
+        timestamp = int(shanghai_tz.localize(day).timestamp())
+        refresh_daily_rollups(database_manager, station_name, station_model, [timestamp], tables=tables)
+        count += 1
+        day += timedelta(days=1)
+    logger.info(f"{station_name}: backfilled daily rollups from {start_date} to {end_date} ({count} day(s))")
+    return count
+
+
+def main():
+    from dotenv import load_dotenv
+    from schema.session import DatabaseManager
+    from schema.registry import get_station_models
+
+    # 与 app.py 相同的项目根目录与配置文件
+    env_name = os.getenv("APP_ENV", "development").strip()
+    if env_name == "production" or env_name == "local":
+        repo_abs_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'app')
+    else:
+        repo_abs_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    load_dotenv(os.path.join(repo_abs_path, 'setting', f".env.{env_name}"))
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="日汇总表回填")
+    parser.add_argument('--start', required=True, help="开始日期，形如 2025-01-01")
+    parser.add_argument('--end', required=True, help="结束日期（含），形如 2025-05-20")
+    parser.add_argument('--stations', default=None, help="场站子集，逗号分隔，默认 STATION_LIST")
+    parser.add_argument('--tables', default=','.join(ROLLUP_TABLES), help="回填的表，逗号分隔：string,inverter")
+    args = parser.parse_args()
+
+    station_list = os.getenv('STATION_LIST', 'datu').strip().split(',')
+    run_stations = args.stations.split(',') if args.stations else station_list
+    unknown = [name for name in run_stations if name not in station_list]
+    if unknown:
+        parser.error(f"场站不在 STATION_LIST 中: {unknown}")
+    tables = tuple(args.tables.split(','))
+    if any(table not in ROLLUP_TABLES for table in tables):
+        parser.error(f"--tables 只能是 {','.join(ROLLUP_TABLES)}")
+
+    database_manager = DatabaseManager(repo_abs_path)
+    try:
+        for station_name in run_stations:
+            backfill_daily_rollups(database_manager, station_name, get_station_models(station_name), args.start, args.end, tables)
+    finally:
+        database_manager.close_all()
+
+
+if __name__ == '__main__':
+    main()
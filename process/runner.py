@@ -0,0 +1,264 @@
+# 定时流水线独立运行入口：Web 进程（gunicorn worker）只处理请求，不再各自启动定时器
+#
+# 用法（在项目根目录下）：
+#   python -m process.runner           # 常驻进程，每天 SCHEDULE_TIME 执行一次 run_process_schedule
+#   python -m process.runner --once    # 立即执行一次后退出
+#   python -m process.runner --resume --date 2025-05-20 [--stations datu,daxue] [--stages impute,predict]
+#                                      # 续跑某一天：跳过已成功且输入未变化的阶段
+#
+# 常驻进程同时每 PIPELINE_REQUEST_POLL_SECONDS 秒领取一次 POST /api/admin/pipeline/run 写入的排队请求（PipelineRequest 表）并执行，
+# Web worker 不在请求线程中运行流水线
+#
+# 无论从哪里触发，流水线都需要先获得全局锁：MariaDB 下使用 GET_LOCK（跨主机有效），
+# sqlite 下使用文件锁 data/.pipeline.lock，保证同一时刻只有一个实例在运行
+import os
+import argparse
+import logging
+from datetime import datetime
+
+import pytz
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境
+    fcntl = None
+    import msvcrt
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+PIPELINE_LOCK_NAME = 'dt_backend_pipeline'
+
+
+class PipelineLock:
+    """
+    流水线全局锁，非阻塞获取：已被其他实例持有时 acquire() 直接返回 False
+
+    Args:
+        database_manager: 数据库管理器，MariaDB 模式下用于 GET_LOCK
+        repo_abs_path: 项目根目录，sqlite 模式下锁文件位于 data/.pipeline.lock
+        name: 锁名称
+    """
+
+    def __init__(self, database_manager, repo_abs_path, name=PIPELINE_LOCK_NAME):
+        self.database_manager = database_manager
+        self.lock_path = os.path.join(repo_abs_path, 'data', '.pipeline.lock')
+        self.name = name
+        self._connection = None
+        self._file = None
+
+    def acquire(self):
+        try:
+            if self.database_manager.db_type == 'mariadb':
+                # GET_LOCK 与连接绑定，整个流水线期间一直持有该连接
+                self._connection = self.database_manager.get_engine('user').connect()
+                acquired = self._connection.execute(text("SELECT GET_LOCK(:name, 0)"), {'name': self.name}).scalar() == 1
+            else:
+                os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+                self._file = open(self.lock_path, 'a+')
+                self._file.seek(0)
+                if fcntl:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    # 记录持有者，便于排查
+                    self._file.truncate()
+                    self._file.write(f"{os.getpid()} {datetime.now(pytz.timezone('Asia/Shanghai')).isoformat()}\n")
+                    self._file.flush()
+                else:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                acquired = True
+        except OSError:
+            acquired = False
+        except Exception as e:
+            logger.error(f"acquire pipeline lock failed: {e}")
+            acquired = False
+
+        if not acquired:
+            self._close()
+        return acquired
+
+    def release(self):
+        try:
+            if self._connection is not None:
+                self._connection.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': self.name})
+            elif self._file is not None:
+                if fcntl:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                else:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        except Exception as e:
+            logger.error(f"release pipeline lock failed: {e}")
+        finally:
+            self._close()
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _run_locked(lock, kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, station_list,
+                api_user=None, api_password=None, process_date=None, stages=None, resume=False):
+    try:
+        # 流水线依赖 torch/pypots/sklearn/umap 等，执行时才导入
+        from process.index import run_process_schedule, run_process_manual
+        if process_date is None:
+            return run_process_schedule(kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, station_list, api_user, api_password)
+        return run_process_manual(process_date, kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, station_list,
+                                  api_user, api_password, stages=stages, resume=resume)
+    finally:
+        lock.release()
+
+
+def run_pipeline_once(kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, station_list, api_user=None, api_password=None,
+                      process_date=None, stages=None, resume=False):
+    """
+    获得全局锁后执行一次流水线；锁被占用时跳过，返回 False
+
+    Args:
+        process_date: 处理日期，为空时处理前一天（定时任务）
+        stages: 需要执行的阶段子集，默认全部
+        resume: 续跑模式，跳过已成功且输入未变化的阶段
+    """
+    lock = PipelineLock(database_manager, repo_abs_path)
+    if not lock.acquire():
+        logger.warning("流水线已在其他进程中运行，本次跳过")
+        return False
+    _run_locked(lock, kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, station_list,
+                api_user, api_password, process_date, stages, resume)
+    return True
+
+
+def run_queued_requests(kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, api_user=None, api_password=None):
+    """
+    依次执行 /api/admin/pipeline/run 写入的排队请求；全局锁被占用时把请求放回队列，等下次轮询再执行
+
+    Returns:
+        int: 执行的请求数
+    """
+    from schema.ledger import claim_pipeline_request, finish_pipeline_request
+
+    count = 0
+    while True:
+        try:
+            pending = claim_pipeline_request(database_manager)
+        except Exception as e:
+            logger.error(f"claim pipeline request failed: {e}")
+            return count
+        if pending is None:
+            return count
+        logger.info(f"run pipeline request {pending['id']}: {pending['process_date']} {pending['station_list']} {pending['stages']}")
+        try:
+            ran = run_pipeline_once(kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, pending['station_list'],
+                                    api_user, api_password, process_date=pending['process_date'], stages=pending['stages'], resume=pending['resume'])
+        except Exception as e:
+            logger.error(f"pipeline request {pending['id']} failed: {e}")
+            finish_pipeline_request(database_manager, pending['id'], 'failed', error=e)
+            count += 1
+            continue
+        if not ran:
+            finish_pipeline_request(database_manager, pending['id'], 'queued')
+            return count
+        finish_pipeline_request(database_manager, pending['id'], 'success')
+        count += 1
+
+
+def _setup_logging(repo_abs_path):
+    logs_dir = os.path.join(repo_abs_path, "logs")
+    os.makedirs(logs_dir, exist_ok=True)
+    log_time_str = datetime.now(pytz.timezone("Asia/Shanghai")).strftime("%Y%m%d_%H%M%S")
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    file_handler = logging.FileHandler(os.path.join(logs_dir, f"scheduler_{log_time_str}.log"), encoding="utf-8")
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.handlers = [file_handler, stream_handler]
+
+
+def main():
+    from dotenv import load_dotenv
+    from apscheduler.schedulers.blocking import BlockingScheduler
+    from schema.session import DatabaseManager
+    from schema.registry import StationModelRegistry, get_station_models, get_impute_model
+
+    # 与 app.py 相同的项目根目录与配置文件
+    env_name = os.getenv("APP_ENV", "development").strip()
+    if env_name == "production" or env_name == "local":
+        repo_abs_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'app')
+    else:
+        repo_abs_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _setup_logging(repo_abs_path)
+    load_dotenv(os.path.join(repo_abs_path, 'setting', f".env.{env_name}"))
+
+    parser = argparse.ArgumentParser(description="定时流水线独立运行入口")
+    parser.add_argument('--once', action='store_true', help="立即执行一次后退出")
+    parser.add_argument('--resume', action='store_true', help="续跑 --date 指定的日期后退出")
+    parser.add_argument('--date', default=None, help="处理日期，形如 2025-05-20")
+    parser.add_argument('--stations', default=None, help="场站子集，逗号分隔，默认 STATION_LIST")
+    parser.add_argument('--stages', default=None, help="阶段子集，逗号分隔，默认全部")
+    args = parser.parse_args()
+
+    kairosdb_url = os.getenv('KAIROSDB_URL', 'http://localhost:8080/api/v1/datapoints/query').strip()
+    time_window = int(os.getenv('TIME_WINDOW', '30').strip())
+    station_list = os.getenv('STATION_LIST', 'datu').strip().split(',')
+    run_stations = args.stations.split(',') if args.stations else station_list
+    unknown = [name for name in run_stations if name not in station_list]
+    if unknown:
+        parser.error(f"场站不在 STATION_LIST 中: {unknown}")
+    run_stages = args.stages.split(',') if args.stages else None
+    schedule_time = os.getenv('SCHEDULE_TIME', '1,0').strip().split(',')
+    api_user = os.getenv('API_USERNAME', 'dtzhejiang').strip()
+    api_password = os.getenv('API_PASSWORD', 'zkYs!23').strip()
+    request_poll_seconds = int(os.getenv('PIPELINE_REQUEST_POLL_SECONDS', '30').strip())
+
+    database_manager = DatabaseManager(repo_abs_path)
+    station_models = StationModelRegistry(get_station_models, station_list)
+    impute_models = StationModelRegistry(get_impute_model, station_list)
+    pipeline_args = [kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, station_list, api_user, api_password]
+
+    def queued_task():
+        try:
+            run_queued_requests(kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, api_user, api_password)
+        except Exception as e:
+            logger.error(f"Error in queued_task: {e}")
+
+    def scheduled_task():
+        try:
+            logger.info(f"\t定时器函数于 {datetime.now(pytz.timezone('Asia/Shanghai'))} 开始执行，正在创建前一天的数据...")
+            if run_pipeline_once(*pipeline_args):
+                logger.info(f"\t定时器函数于 {datetime.now(pytz.timezone('Asia/Shanghai'))} 执行完成！")
+        except Exception as e:
+            logger.error(f"Error in scheduled_task: {e}")
+
+    logger.info("当前运行模式：{} 项目根目录：{} 场站列表：{}".format(env_name, repo_abs_path, station_list))
+    try:
+        if args.resume or args.date:
+            if not args.date:
+                parser.error("--resume 需要同时指定 --date")
+            manual_args = [kairosdb_url, repo_abs_path, time_window, database_manager, station_models, impute_models, run_stations, api_user, api_password]
+            run_pipeline_once(*manual_args, process_date=args.date, stages=run_stages, resume=args.resume)
+            return
+        if args.once:
+            scheduled_task()
+            return
+        scheduler = BlockingScheduler()
+        scheduler.add_job(func=scheduled_task, trigger='cron', hour=int(schedule_time[0]), minute=int(schedule_time[1]),
+                          timezone=pytz.timezone('Asia/Shanghai'), max_instances=1, coalesce=True)
+        # 轮询接口写入的手动触发请求
+        scheduler.add_job(func=queued_task, trigger='interval', seconds=request_poll_seconds, max_instances=1, coalesce=True)
+        logger.info(f"pipeline runner started, schedule at {schedule_time[0]}:{int(schedule_time[1]):02d}")
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        database_manager.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# File: backend/database/columnar.py
+# 列式读取：Core select() 列投影 + 服务端游标（stream_results）分批读取，直接构造 numpy 数组 / DataFrame，
+# 不经过 ORM 对象与 identity map，适用于几十万行级别的分析查询
+import logging
+
+import numpy as np
+import pandas as pd
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+FETCH_BATCH_SIZE = 50000
+
+
+def _to_array(values, dtype):
+    if dtype is None or dtype is object:
+        return np.array(values, dtype=object)
+    try:
+        return np.array(values, dtype=dtype)
+    except (TypeError, ValueError):
+        # 整型列中出现 NULL 时退化为 float64（NULL -> nan）
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def fetch_columns(session, stmt, dtypes=None, batch_size=FETCH_BATCH_SIZE):
+    """
+    执行 select 语句并按列返回 numpy 数组
+
+    Args:
+        session: 数据库会话（Session 或 Connection）
+        stmt: sqlalchemy select() 语句，只投影需要的列
+        dtypes: {列名: numpy 类型}，未指定的列为 object；浮点列中的 NULL 读为 nan
+        batch_size: 每批读取的行数
+    Returns:
+        dict: {列名: np.ndarray}，列顺序与 select 一致
+    """
+    dtypes = dtypes or {}
+    result = session.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    keys = list(result.keys())
+    chunks = {key: [] for key in keys}
+
+    for partition in result.partitions(batch_size):
+        if not partition:
+            continue
+        for key, values in zip(keys, zip(*partition)):
+            chunks[key].append(_to_array(values, dtypes.get(key)))
+
+    columns = {}
+    for key in keys:
+        if chunks[key]:
+            columns[key] = np.concatenate(chunks[key])
+        else:
+            columns[key] = np.array([], dtype=dtypes.get(key) or object)
+    return columns
+
+
+def fetch_dataframe(session, stmt, dtypes=None, batch_size=FETCH_BATCH_SIZE):
+    """
+    执行 select 语句并返回 DataFrame，参数同 fetch_columns
+    """
+    return pd.DataFrame(fetch_columns(session, stmt, dtypes, batch_size))
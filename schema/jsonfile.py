@@ -0,0 +1,136 @@
+# File: backend/database/jsonfile.py
+# JSON 文件的原子写入：先写同目录下的临时文件，fsync 后 rename 覆盖目标文件，
+# 读者（Web 进程）不加锁，任何时刻读到的都是完整的旧文件或新文件，不会读到写了一半的文件；
+# 写者之间通过每个文件一把的建议锁（<文件名>.lock）排队，读-改-写使用乐观版本校验
+import os
+import json
+import time
+import tempfile
+import logging
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境
+    fcntl = None
+    import msvcrt
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+JSON_UPDATE_RETRIES = 5
+
+
+class JsonWriteConflict(RuntimeError):
+    """读-改-写期间文件被其他写者反复修改，重试后仍未写入"""
+
+
+def _lock_path(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f'.{name}.lock')
+
+
+@contextmanager
+def file_lock(path):
+    """
+    文件写锁（阻塞获取），只在写者之间互斥，不影响读者
+    """
+    lock_path = _lock_path(path)
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    lock_file = open(lock_path, 'a+')
+    try:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        try:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            lock_file.close()
+
+
+def file_version(path):
+    """
+    文件版本：(inode, 修改时间, 大小)；rename 覆盖后 inode 改变，文件不存在时返回 None
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _replace(path, data, dump_kwargs):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    # rename 本身也需要落盘
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def write_json(path, data, ensure_ascii=False, **dump_kwargs):
+    """
+    原子写入整个 JSON 文件
+    """
+    with file_lock(path):
+        _replace(path, data, {'ensure_ascii': ensure_ascii, **dump_kwargs})
+
+
+def read_json(path):
+    """
+    读取 JSON 文件，返回 (数据, 版本)；读者不加锁
+    """
+    version = file_version(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data, version
+
+
+def update_json(path, modify, default=None, retries=JSON_UPDATE_RETRIES, ensure_ascii=False, **dump_kwargs):
+    """
+    读-改-写：不持锁读取并修改，写入前持锁检查版本，期间文件被其他写者修改时重新读取并修改
+
+    Args:
+        modify: 修改函数 modify(data) -> 新数据
+        default: 文件不存在或损坏时的初始数据（函数，返回新对象），为 None 时直接抛出读取异常
+    Returns:
+        写入的数据
+    """
+    for attempt in range(retries):
+        try:
+            data, version = read_json(path)
+        except (FileNotFoundError, ValueError) as e:
+            if default is None:
+                raise
+            logger.warning(f"{path} 文件不存在或损坏，使用初始数据: {e}")
+            data, version = default(), file_version(path)
+        new_data = modify(data)
+        with file_lock(path):
+            if file_version(path) == version:
+                _replace(path, new_data, {'ensure_ascii': ensure_ascii, **dump_kwargs})
+                return new_data
+        logger.info(f"{path} 已被其他写者修改，重新读取（第 {attempt + 1} 次）")
+        time.sleep(0.05 * (attempt + 1))
+    raise JsonWriteConflict(f"{path} 在 {retries} 次重试后仍有并发修改")
@@ -0,0 +1,245 @@
+# File: backend/database/ledger.py
+# 流水线运行记录：记录每个 (日期, 场站, 阶段) 的状态、输入指纹和耗时，用于断点续跑
+import os
+import time
+import json
+import hashlib
+import logging
+
+from sqlalchemy import func
+
+from schema.models import Base
+from schema.registry import get_pipeline_ledger_model, get_pipeline_request_model
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+LEDGER_DB_NAME = 'pipeline'
+_created = set()
+_request_created = set()
+
+
+def ensure_ledger_table(database_manager):
+    """
+    运行记录表不存在时自动创建
+    """
+    ledger = get_pipeline_ledger_model()
+    if database_manager.db_type not in _created:
+        engine = database_manager.get_engine(LEDGER_DB_NAME)
+        Base.metadata.create_all(engine, tables=[ledger.__table__], checkfirst=True)
+        _created.add(database_manager.db_type)
+    return ledger
+
+
+def make_fingerprint(*parts):
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def string_data_signature(database_manager, station_name, string_info, start_timestamp, end_timestamp):
+    """
+    某天组串原始数据的签名（行数、最大时间戳、电流电压合计），原始数据被重新写入后签名随之变化
+    """
+    try:
+        with database_manager.get_session(station_name) as session:
+            row = (
+                session.query(
+                    func.count(string_info.timestamp),
+                    func.max(string_info.timestamp),
+                    func.sum(string_info.intensity),
+                    func.sum(string_info.voltage),
+                )
+                .filter(string_info.timestamp >= start_timestamp)
+                .filter(string_info.timestamp <= end_timestamp)
+                .one()
+            )
+        return [row[0], row[1], round(float(row[2] or 0), 3), round(float(row[3] or 0), 3)]
+    except Exception as e:
+        logger.error(f"{station_name}: string data signature failed: {e}")
+        return None
+
+
+def get_stage_record(database_manager, process_date, station_name, stage):
+    ledger = ensure_ledger_table(database_manager)
+    with database_manager.get_session(LEDGER_DB_NAME) as session:
+        record = session.get(ledger, (process_date, station_name, stage))
+        if record is None:
+            return None
+        return {column.name: getattr(record, column.name) for column in ledger.__table__.columns}
+
+
+def record_stage(database_manager, process_date, station_name, stage, status, fingerprint=None, started_at=None, duration=None, error=None):
+    """
+    写入（覆盖）某个阶段的运行记录；写入失败只记录日志，不影响流水线
+    """
+    session = None
+    try:
+        ledger = ensure_ledger_table(database_manager)
+        session = database_manager.get_session(LEDGER_DB_NAME)
+        session.merge(ledger(
+            process_date=process_date,
+            station_name=station_name,
+            stage=stage,
+            status=status,
+            fingerprint=fingerprint,
+            started_at=started_at,
+            finished_at=None if status == 'running' else int(time.time()),
+            duration=None if duration is None else round(duration, 2),
+            error=None if error is None else str(error)[:1024],
+        ))
+        session.commit()
+    except Exception as e:
+        logger.error(f"record pipeline ledger failed: {process_date} {station_name} {stage}: {e}")
+        if session:
+            session.rollback()
+    finally:
+        if session:
+            session.close()
+
+
+def list_stage_records(database_manager, process_date=None, station_name=None):
+    """
+    查询运行记录，按日期、场站、开始时间排序
+    """
+    ledger = ensure_ledger_table(database_manager)
+    with database_manager.get_session(LEDGER_DB_NAME) as session:
+        query = session.query(ledger)
+        if process_date:
+            query = query.filter(ledger.process_date == process_date)
+        if station_name:
+            query = query.filter(ledger.station_name == station_name)
+        rows = query.order_by(ledger.process_date, ledger.station_name, ledger.started_at).all()
+        return [{column.name: getattr(row, column.name) for column in ledger.__table__.columns} for row in rows]
+
+
+def latest_finished_at(database_manager, station_name, stages=None):
+    """
+    场站（指定阶段）最近一次运行结束的时间戳，用作接口缓存的数据版本；没有记录或查询失败时返回 None
+    """
+    try:
+        ledger = ensure_ledger_table(database_manager)
+        with database_manager.get_session(LEDGER_DB_NAME) as session:
+            query = session.query(func.max(ledger.finished_at)).filter(ledger.station_name == station_name)
+            if stages:
+                query = query.filter(ledger.stage.in_(stages))
+            return query.scalar()
+    except Exception as e:
+        logger.error(f"{station_name}: query pipeline ledger failed: {e}")
+        return None
+
+
+def ensure_request_table(database_manager):
+    """
+    手动触发请求表不存在时自动创建（与运行记录表位于同一数据库）
+    """
+    request_model = get_pipeline_request_model()
+    if database_manager.db_type not in _request_created:
+        engine = database_manager.get_engine(LEDGER_DB_NAME)
+        Base.metadata.create_all(engine, tables=[request_model.__table__], checkfirst=True)
+        _request_created.add(database_manager.db_type)
+    return request_model
+
+
+def _request_dict(request_model, row):
+    item = {column.name: getattr(row, column.name) for column in request_model.__table__.columns}
+    item['station_list'] = item['station_list'].split(',') if item['station_list'] else []
+    item['stages'] = item['stages'].split(',') if item['stages'] else None
+    return item
+
+
+def enqueue_pipeline_request(database_manager, process_date, station_list, stages=None, resume=True, requested_by=None):
+    """
+    写入一条手动触发请求，由流水线进程领取执行
+
+    Returns:
+        dict: 写入的请求
+    """
+    request_model = ensure_request_table(database_manager)
+    with database_manager.get_session(LEDGER_DB_NAME) as session:
+        row = request_model(
+            process_date=process_date,
+            station_list=','.join(station_list),
+            stages=','.join(stages) if stages else None,
+            resume=bool(resume),
+            status='queued',
+            requested_by=requested_by,
+            created_at=int(time.time()),
+        )
+        session.add(row)
+        session.commit()
+        return _request_dict(request_model, row)
+
+
+def claim_pipeline_request(database_manager, timeout_seconds=None):
+    """
+    领取最早的一条排队请求并标记为 running；没有排队请求时返回 None。
+    以 status 条件更新作为领取，多个流水线进程同时领取时只有一个成功。
+    领取前先把开始时间早于 timeout_seconds（默认 PIPELINE_REQUEST_TIMEOUT_SECONDS）的 running 请求标记为 failed，
+    避免流水线进程中途退出后请求一直停留在 running
+    """
+    if timeout_seconds is None:
+        timeout_seconds = int(os.getenv('PIPELINE_REQUEST_TIMEOUT_SECONDS', '21600').strip())
+    request_model = ensure_request_table(database_manager)
+    with database_manager.get_session(LEDGER_DB_NAME) as session:
+        now = int(time.time())
+        expired = (session.query(request_model)
+                   .filter(request_model.status == 'running')
+                   .filter(request_model.started_at < now - timeout_seconds)
+                   .update({'status': 'failed', 'finished_at': now,
+                            'error': f"no result within {timeout_seconds}s, the pipeline process may have exited"},
+                           synchronize_session=False))
+        session.commit()
+        if expired:
+            logger.warning(f"marked {expired} stale running pipeline request(s) as failed")
+        while True:
+            row = (session.query(request_model)
+                   .filter(request_model.status == 'queued')
+                   .order_by(request_model.id)
+                   .first())
+            if row is None:
+                return None
+            claimed = (session.query(request_model)
+                       .filter(request_model.id == row.id)
+                       .filter(request_model.status == 'queued')
+                       .update({'status': 'running', 'started_at': int(time.time())}, synchronize_session=False))
+            session.commit()
+            if claimed:
+                session.refresh(row)
+                return _request_dict(request_model, row)
+
+
+def finish_pipeline_request(database_manager, request_id, status, error=None):
+    """
+    更新请求状态：success / failed，或锁被占用时改回 queued 等待下次领取
+    """
+    session = None
+    try:
+        request_model = ensure_request_table(database_manager)
+        session = database_manager.get_session(LEDGER_DB_NAME)
+        values = {'status': status, 'error': None if error is None else str(error)[:1024]}
+        if status == 'queued':
+            values['started_at'] = None
+        else:
+            values['finished_at'] = int(time.time())
+        session.query(request_model).filter(request_model.id == request_id).update(values, synchronize_session=False)
+        session.commit()
+    except Exception as e:
+        logger.error(f"update pipeline request {request_id} failed: {e}")
+        if session:
+            session.rollback()
+    finally:
+        if session:
+            session.close()
+
+
+def list_pipeline_requests(database_manager, status=None, limit=50):
+    """
+    查询最近的手动触发请求，按 id 倒序
+    """
+    request_model = ensure_request_table(database_manager)
+    with database_manager.get_session(LEDGER_DB_NAME) as session:
+        query = session.query(request_model)
+        if status:
+            query = query.filter(request_model.status == status)
+        rows = query.order_by(request_model.id.desc()).limit(limit).all()
+        return [_request_dict(request_model, row) for row in rows]
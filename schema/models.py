@@ -76,9 +76,13 @@ def create_station_models(station_prefix):
             "fixed_intensity": Column(Float),
             "fixed_voltage": Column(Float),
             "is_valid": Column(Boolean, default=True),
+            # 主键 (timestamp, device_id) 已覆盖按时间的范围扫描，另建逆变器/组串维度的覆盖索引
+            # MariaDB 下按月对 timestamp 分区，分区的拆分与归档见 schema/partition.py
             "__table_args__": (
-                Index(f'idx_str_td', 'timestamp', 'device_id'),
-                {'mysql_engine': 'InnoDB'}
+                Index('idx_str_inv_ts', 'box_id', 'inverter_id', 'timestamp', 'intensity', 'voltage'),
+                Index('idx_str_dev_ts', 'device_id', 'timestamp', 'intensity', 'voltage'),
+                {'mysql_engine': 'InnoDB',
+                 'mysql_partition_by': 'RANGE (`timestamp`) (PARTITION p_future VALUES LESS THAN MAXVALUE)'}
             ),
         }
     )
@@ -106,6 +110,58 @@ def create_impute_model(station_prefix):
     )
     return StringOverview
 
+# 日汇总模型：每个设备每天一行，由写入流程增量维护（见 schema/rollup.py）
+def create_rollup_models(station_prefix):
+    StringDaily = type(
+        f"{station_prefix.capitalize()}StringDaily",
+        (Base,),
+        {
+            "__tablename__": f"{station_prefix}StringDaily",
+            "day": Column(BigInteger, primary_key=True),  # 当天0点（北京时间）的时间戳
+            "device_id": Column(String(50), primary_key=True),
+            "box_id": Column(String(50)),
+            "inverter_id": Column(String(50)),
+            "string_id": Column(String(50)),
+            "energy": Column(Float),  # sum(intensity * voltage / 6)
+            "intensity_max": Column(Float),
+            "intensity_min": Column(Float),
+            "voltage_max": Column(Float),
+            "voltage_min": Column(Float),
+            "valid_hours": Column(Integer),  # 电流、电压均非空的小时数
+            "error_count_intensity": Column(Integer),
+            "missing_count_intensity": Column(Integer),
+            "error_count_voltage": Column(Integer),
+            "missing_count_voltage": Column(Integer),
+            "__table_args__": (
+                Index('idx_str_daily_inv', 'day', 'box_id', 'inverter_id'),
+                {'mysql_engine': 'InnoDB'}
+            ),
+        }
+    )
+
+    InverterDaily = type(
+        f"{station_prefix.capitalize()}InverterDaily",
+        (Base,),
+        {
+            "__tablename__": f"{station_prefix}InverterDaily",
+            "day": Column(BigInteger, primary_key=True),
+            "device_id": Column(String(50), primary_key=True),
+            "box_id": Column(String(50)),
+            "inverter_id": Column(String(50)),
+            "generated_energy_max": Column(Float),
+            "sum_energy_max": Column(Float),
+            "month_energy_max": Column(Float),
+            "power_max": Column(Float),
+            "valid_hours": Column(Integer),  # power 非空的小时数
+            "alarm_bits": Column(Integer),  # 当天出现过的告警位，位序见 schema/rollup.py ALARM_FIELDS
+            "__table_args__": (
+                {'mysql_engine': 'InnoDB'},
+            ),
+        }
+    )
+
+    return StringDaily, InverterDaily
+
 def create_user_model():
     """
     创建用户模型
@@ -124,6 +180,50 @@ def create_user_model():
         )
     return UserInfo
 
+def create_pipeline_ledger_model():
+    """
+    创建流水线运行记录模型：每个 (日期, 场站, 阶段) 一行
+    """
+    class PipelineLedger(Base):
+        __tablename__ = 'PipelineLedger'
+        process_date = Column(String(10), primary_key=True)
+        station_name = Column(String(50), primary_key=True)
+        stage = Column(String(32), primary_key=True)
+        status = Column(String(16))  # running / success / failed / skipped
+        fingerprint = Column(String(64))  # 阶段输入指纹
+        started_at = Column(BigInteger)
+        finished_at = Column(BigInteger)
+        duration = Column(Float)
+        error = Column(String(1024))
+        __table_args__ = (
+            Index('idx_ledger_status', 'process_date', 'status'),
+            {'mysql_engine': 'InnoDB'}
+        )
+    return PipelineLedger
+
+def create_pipeline_request_model():
+    """
+    创建流水线手动触发请求模型：接口只写入请求，由流水线进程（process.runner）领取执行
+    """
+    class PipelineRequest(Base):
+        __tablename__ = 'PipelineRequest'
+        id = Column(Integer, primary_key=True, autoincrement=True)
+        process_date = Column(String(10))
+        station_list = Column(String(1024))  # 逗号分隔
+        stages = Column(String(256))  # 逗号分隔，为空表示全部阶段
+        resume = Column(Boolean, default=True)
+        status = Column(String(16))  # queued / running / success / failed
+        requested_by = Column(String(50))
+        created_at = Column(BigInteger)
+        started_at = Column(BigInteger)
+        finished_at = Column(BigInteger)
+        error = Column(String(1024))
+        __table_args__ = (
+            Index('idx_request_status', 'status', 'id'),
+            {'mysql_engine': 'InnoDB'}
+        )
+    return PipelineRequest
+
 # 功率损失和预测模型
 def create_power_models(station_prefix):
     class PowerLoss(Base):
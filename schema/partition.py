@@ -0,0 +1,237 @@
+# File: backend/database/partition.py
+# StringInfo 表的存储布局管理：MariaDB 下按月对 timestamp 做 RANGE 分区，去除冗余索引并建立覆盖索引
+#
+# 用法（在项目根目录下）：
+#   python -m schema.partition migrate --stations datu,daxue --start 2023-01   # 一次性迁移已有表
+#   python -m schema.partition rotate --stations datu,daxue                    # 预建未来分区并归档过期分区
+import os
+import argparse
+import logging
+from datetime import datetime
+
+import pytz
+from sqlalchemy import text
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+SHANGHAI_TZ = pytz.timezone('Asia/Shanghai')
+FUTURE_PARTITION = 'p_future'
+# 冗余索引：与主键 (timestamp, device_id) 完全相同
+REDUNDANT_INDEXES = ['idx_str_td']
+# 覆盖索引：逆变器某天的数据、单个组串一段时间的数据（InnoDB 二级索引自带主键列）
+COVERING_INDEXES = {
+    'idx_str_inv_ts': ['box_id', 'inverter_id', 'timestamp', 'intensity', 'voltage'],
+    'idx_str_dev_ts': ['device_id', 'timestamp', 'intensity', 'voltage'],
+}
+
+
+def partition_months_ahead():
+    # 配置在使用时读取，模块可能在 load_dotenv 之前被导入
+    return int(os.getenv('STRING_PARTITION_MONTHS_AHEAD', '3').strip())
+
+
+def partition_retention_months():
+    # 在线保留的月数，超过的分区交换到归档表后删除；0 表示不归档
+    return int(os.getenv('STRING_PARTITION_RETENTION_MONTHS', '0').strip())
+
+
+def string_table_name(station_name):
+    return f"{station_name}StringInfo"
+
+
+def _shift_month(year, month, offset):
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+
+def month_start_timestamp(year, month):
+    """北京时间某月1日0点的时间戳"""
+    return int(SHANGHAI_TZ.localize(datetime(year, month, 1)).timestamp())
+
+
+def partition_name(year, month):
+    return f"p{year}{month:02d}"
+
+
+def partition_definition(year, month):
+    # 分区 pYYYYMM 存放该月（及更早）的数据，上界为下个月1日0点
+    next_year, next_month = _shift_month(year, month, 1)
+    return f"PARTITION {partition_name(year, month)} VALUES LESS THAN ({month_start_timestamp(next_year, next_month)})"
+
+
+def _parse_partition_month(name):
+    try:
+        return int(name[1:5]), int(name[5:7])
+    except (ValueError, IndexError):
+        return None
+
+
+def get_partitions(connection, table):
+    rows = connection.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {'table': table}).fetchall()
+    return [row[0] for row in rows]
+
+
+def _get_indexes(connection, table, db_type):
+    if db_type == 'sqlite':
+        rows = connection.execute(text(f"PRAGMA index_list('{table}')")).fetchall()
+        return {row[1] for row in rows}
+    rows = connection.execute(text(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+    ), {'table': table}).fetchall()
+    return {row[0] for row in rows}
+
+
+def migrate_string_table(database_manager, station_name, start_month='2023-01', months_ahead=None):
+    """
+    将已有的 StringInfo 表迁移到新的存储布局（可重复执行）
+
+    Args:
+        database_manager: 数据库管理器
+        station_name: 场站名称
+        start_month: 第一个分区的月份，形如 "2023-01"，更早的数据也落在该分区
+        months_ahead: 预建的未来月份数，默认 STRING_PARTITION_MONTHS_AHEAD
+    """
+    if months_ahead is None:
+        months_ahead = partition_months_ahead()
+    table = string_table_name(station_name)
+    db_type = database_manager.db_type
+    engine = database_manager.get_engine(station_name)
+
+    with engine.begin() as connection:
+        indexes = _get_indexes(connection, table, db_type)
+
+        for index_name in REDUNDANT_INDEXES:
+            if index_name in indexes:
+                if db_type == 'sqlite':
+                    connection.execute(text(f"DROP INDEX {index_name}"))
+                else:
+                    connection.execute(text(f"ALTER TABLE `{table}` DROP INDEX {index_name}"))
+                logger.info(f"{table}: dropped redundant index {index_name}")
+
+        for index_name, columns in COVERING_INDEXES.items():
+            if index_name not in indexes:
+                column_sql = ", ".join(f"`{column}`" for column in columns)
+                connection.execute(text(f"CREATE INDEX {index_name} ON `{table}` ({column_sql})"))
+                logger.info(f"{table}: created covering index {index_name}")
+
+        if db_type == 'sqlite':
+            logger.info(f"{table}: sqlite does not support partitioning, only indexes migrated")
+            return
+
+        if get_partitions(connection, table):
+            logger.info(f"{table}: already partitioned")
+        else:
+            start_year, start_mon = (int(part) for part in start_month.split('-'))
+            now = datetime.now(SHANGHAI_TZ)
+            end_year, end_mon = _shift_month(now.year, now.month, months_ahead)
+            definitions = []
+            year, month = start_year, start_mon
+            while (year, month) <= (end_year, end_mon):
+                definitions.append(partition_definition(year, month))
+                year, month = _shift_month(year, month, 1)
+            definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+            connection.execute(text(f"ALTER TABLE `{table}` PARTITION BY RANGE (`timestamp`) ({', '.join(definitions)})"))
+            logger.info(f"{table}: partitioned by month from {start_month}, {len(definitions)} partitions")
+
+    rotate_string_partitions(database_manager, station_name, months_ahead=months_ahead)
+
+
+def rotate_string_partitions(database_manager, station_name, months_ahead=None, retention_months=None):
+    """
+    分区轮转：从 p_future 中拆出未来 months_ahead 个月的分区；
+    retention_months > 0 时，将更早的分区交换到归档表 <table>_<分区名> 后删除
+
+    Args:
+        database_manager: 数据库管理器
+        station_name: 场站名称
+        months_ahead: 默认 STRING_PARTITION_MONTHS_AHEAD
+        retention_months: 默认 STRING_PARTITION_RETENTION_MONTHS
+    """
+    if database_manager.db_type == 'sqlite':
+        return
+    if months_ahead is None:
+        months_ahead = partition_months_ahead()
+    if retention_months is None:
+        retention_months = partition_retention_months()
+
+    table = string_table_name(station_name)
+    engine = database_manager.get_engine(station_name)
+    now = datetime.now(SHANGHAI_TZ)
+
+    try:
+        with engine.begin() as connection:
+            partitions = get_partitions(connection, table)
+            if not partitions:
+                logger.warning(f"{table}: not partitioned, run `python -m schema.partition migrate` first")
+                return
+
+            # 1. 预建未来分区
+            missing = []
+            for offset in range(0, months_ahead + 1):
+                year, month = _shift_month(now.year, now.month, offset)
+                if partition_name(year, month) not in partitions:
+                    missing.append((year, month))
+            month_partitions = [_parse_partition_month(name) for name in partitions if name != FUTURE_PARTITION]
+            latest = max((m for m in month_partitions if m), default=None)
+            missing = [m for m in missing if latest is None or m > latest]
+            if missing and FUTURE_PARTITION in partitions:
+                definitions = [partition_definition(year, month) for year, month in missing]
+                definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+                connection.execute(text(
+                    f"ALTER TABLE `{table}` REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(definitions)})"
+                ))
+                logger.info(f"{table}: added partitions {[partition_name(y, m) for y, m in missing]}")
+
+            # 2. 归档过期分区
+            if retention_months <= 0:
+                return
+            oldest_kept = _shift_month(now.year, now.month, -retention_months)
+            expired = [name for name in partitions
+                       if name != FUTURE_PARTITION and _parse_partition_month(name) and _parse_partition_month(name) < oldest_kept]
+            for name in expired:
+                archive_table = f"{table}_{name}"
+                exists = connection.execute(text(
+                    "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+                ), {'table': archive_table}).scalar()
+                if exists:
+                    logger.warning(f"{table}: archive table {archive_table} already exists, skip partition {name}")
+                    continue
+                connection.execute(text(f"CREATE TABLE `{archive_table}` LIKE `{table}`"))
+                connection.execute(text(f"ALTER TABLE `{archive_table}` REMOVE PARTITIONING"))
+                connection.execute(text(f"ALTER TABLE `{table}` EXCHANGE PARTITION {name} WITH TABLE `{archive_table}`"))
+                connection.execute(text(f"ALTER TABLE `{table}` DROP PARTITION {name}"))
+                logger.info(f"{table}: partition {name} archived to {archive_table}")
+    except Exception as e:
+        logger.error(f"rotate partitions of {table} failed: {e}")
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from schema.session import DatabaseManager
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    repo_abs_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env_name = os.getenv("APP_ENV", "development").strip()
+    load_dotenv(os.path.join(repo_abs_path, 'setting', f".env.{env_name}"))
+
+    parser = argparse.ArgumentParser(description="StringInfo 分区布局迁移与轮转")
+    parser.add_argument('command', choices=['migrate', 'rotate'])
+    parser.add_argument('--stations', default=os.getenv('STATION_LIST', 'datu').strip())
+    parser.add_argument('--start', default='2023-01', help="第一个分区的月份，形如 2023-01")
+    parser.add_argument('--months-ahead', type=int, default=partition_months_ahead())
+    parser.add_argument('--retention-months', type=int, default=partition_retention_months())
+    args = parser.parse_args()
+
+    database_manager = DatabaseManager(repo_abs_path)
+    for station_name in args.stations.split(','):
+        if args.command == 'migrate':
+            migrate_string_table(database_manager, station_name, args.start, args.months_ahead)
+        else:
+            rotate_string_partitions(database_manager, station_name, args.months_ahead, args.retention_months)
+    database_manager.close_all()
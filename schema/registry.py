@@ -0,0 +1,76 @@
+# File: backend/database/registry.py
+# 表模型注册表：按场站懒加载表模型，第一次访问某个场站时才创建，同一场站在进程内只创建一次
+import threading
+import logging
+from collections.abc import Mapping
+
+from schema.models import create_station_models, create_impute_model, create_user_model, create_power_models, create_pipeline_ledger_model, create_pipeline_request_model
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+_model_cache = {}
+_lock = threading.Lock()
+
+
+def _cached(factory, key):
+    """同一个 (factory, key) 只调用一次 factory，避免在 Base.metadata 上重复定义同名表"""
+    cache_key = (factory.__name__, key)
+    if cache_key not in _model_cache:
+        with _lock:
+            if cache_key not in _model_cache:
+                _model_cache[cache_key] = factory(key) if key is not None else factory()
+    return _model_cache[cache_key]
+
+
+def get_station_models(station_name):
+    return _cached(create_station_models, station_name)
+
+
+def get_impute_model(station_name):
+    return _cached(create_impute_model, station_name)
+
+
+def get_power_models(station_name):
+    return _cached(create_power_models, station_name)
+
+
+def get_user_model():
+    return _cached(create_user_model, None)
+
+
+def get_pipeline_ledger_model():
+    return _cached(create_pipeline_ledger_model, None)
+
+
+def get_pipeline_request_model():
+    return _cached(create_pipeline_request_model, None)
+
+
+class StationModelRegistry(Mapping):
+    """
+    以字典方式使用的场站模型集合，用法与 {station_name: create_xxx(station_name)} 相同，
+    但只有在 get / [] 访问某个场站时才创建该场站的模型
+
+    Args:
+        getter: 单个场站的模型获取函数，如 get_station_models
+        station_list: 场站列表，只有列表中的场站可以访问
+    """
+
+    def __init__(self, getter, station_list):
+        self._getter = getter
+        self._stations = list(station_list)
+
+    def __getitem__(self, station_name):
+        if station_name not in self._stations:
+            raise KeyError(station_name)
+        return self._getter(station_name)
+
+    def __iter__(self):
+        return iter(self._stations)
+
+    def __len__(self):
+        return len(self._stations)
+
+    def __contains__(self, station_name):
+        return station_name in self._stations
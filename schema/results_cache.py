@@ -0,0 +1,170 @@
+# File: backend/database/results_cache.py
+# 接口读取结果的进程内缓存：按 (场站, 日期) 缓存 load_results 组装好的结果和由其派生的索引，
+# 以结果库 / 原 JSON 文件的 (路径, 修改时间, 大小) 作为版本，流水线写入后自动失效；
+# 按估算的内存占用做 LRU 淘汰。缓存中的数据为只读，调用方需要修改时先复制
+import os
+import threading
+import logging
+from collections import OrderedDict
+
+from schema.results_store import load_results, results_version
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+
+def results_cache_max_bytes():
+    """
+    缓存内存上限 RESULTS_CACHE_MAX_MB（字节）；使用时读取，模块可能在 load_dotenv 之前被导入
+    """
+    return int(os.getenv('RESULTS_CACHE_MAX_MB', '256').strip()) * 1024 * 1024
+
+
+def _approx_size(obj):
+    """
+    估算解析后对象的内存占用（字节），只用于缓存淘汰
+    """
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            size += 64 + 16 * len(item)
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            size += 56 + 8 * len(item)
+            stack.extend(item)
+        elif isinstance(item, str):
+            size += 49 + len(item)
+        else:
+            size += 24
+    return size
+
+
+class ResultsCache:
+    """
+    结果缓存
+
+    Args:
+        max_bytes: 缓存的估算内存上限，超过时淘汰最久未使用的日期；默认读取 RESULTS_CACHE_MAX_MB
+    """
+
+    def __init__(self, max_bytes=None):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_bytes(self):
+        return results_cache_max_bytes() if self._max_bytes is None else self._max_bytes
+
+    def _entry(self, repo_abs_path, station_name, date):
+        key = (os.path.abspath(repo_abs_path), station_name, date)
+        version = results_version(repo_abs_path, station_name, date)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['version'] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # 在锁外读取，避免一个慢查询阻塞其他日期的请求
+        data = load_results(repo_abs_path, station_name, date)
+        if data is None:
+            return None
+        entry = {'version': version, 'data': data, 'size': _approx_size(data), 'derived': {}}
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous['size']
+            max_bytes = self.max_bytes
+            if entry['size'] <= max_bytes:
+                self._entries[key] = entry
+                self._size += entry['size']
+                while self._size > max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= evicted['size']
+        return entry
+
+    def get(self, repo_abs_path, station_name, date):
+        entry = self._entry(repo_abs_path, station_name, date)
+        return entry['data'] if entry is not None else None
+
+    def derive(self, repo_abs_path, station_name, date, name, builder):
+        """
+        由结果派生的数据（索引、树结构等），同一版本的结果只构建一次
+        """
+        entry = self._entry(repo_abs_path, station_name, date)
+        if entry is None:
+            return None
+        derived = entry['derived']
+        if name not in derived:
+            derived[name] = builder(entry['data'])
+        return derived[name]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'size_mb': round(self._size / 1024 / 1024, 2),
+                    'max_mb': round(self.max_bytes / 1024 / 1024, 2), 'hits': self.hits, 'misses': self.misses}
+
+
+_cache = ResultsCache()
+
+
+def get_results(repo_abs_path, station_name, date):
+    """
+    读取某天的结果（结构同 load_results），命中缓存时不再查询；返回的数据为只读
+    """
+    return _cache.get(repo_abs_path, station_name, date)
+
+
+def get_string_result(repo_abs_path, station_name, date, device_id):
+    """
+    读取单个组串的结果，没有时返回 None；返回的数据为只读
+    """
+    data = _cache.get(repo_abs_path, station_name, date)
+    if data is None:
+        return None
+    return data['results'].get(device_id)
+
+
+def get_results_index(repo_abs_path, station_name, date, name, builder):
+    """
+    读取由结果派生的索引，builder(data) 只在结果版本变化后重新执行；返回的数据为只读
+    """
+    return _cache.derive(repo_abs_path, station_name, date, name, builder)
+
+
+def pid_index(data):
+    """
+    前端组串编号 BTxxx-Ixxx-PVx 到 device_id 的索引
+    """
+    index = {}
+    for device_id in data.get('results', {}):
+        parts = device_id.split('-')
+        if len(parts) != 3:
+            continue
+        box_id, inverter_id, string_id = parts
+        try:
+            index[f"BT{box_id}-I{inverter_id}-PV{int(string_id)}"] = device_id
+        except ValueError:
+            continue
+    return index
+
+
+def results_cache_stats():
+    return _cache.stats()
+
+
+def clear_results_cache():
+    _cache.clear()
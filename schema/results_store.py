@@ -0,0 +1,358 @@
+# File: backend/database/results_store.py
+# 组串结果存储：替代 data/<场站>/results/<日期>.json 的整文件读写
+#
+# 每个场站一个 SQLite 文件 data/<场站>/results/results.db（与原 JSON 同目录，部署方式不变）：
+#   string_results: (date, device_id) 一行一个组串，每个结果字段一列，各阶段只写入自己的列
+#   daily_results:  (date) 场站级统计（原 JSON 顶层的 statistics）
+# load_results 按原 JSON 的结构 {'date', 'results', 'statistics'} 组装结果，供接口兼容使用；
+# 迁移前的历史日期仍从原 JSON 文件读取，第一次写入某个历史日期时先把原文件导入；
+# 结果库只在写入时创建，读取时库不存在则直接回退到原 JSON 文件；场站名须在 STATION_LIST 中
+import os
+import json
+import time
+import threading
+import logging
+from collections import defaultdict
+
+from sqlalchemy import MetaData, Table, Column, String, Float, Integer, JSON, select, update, and_, bindparam, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from schema.sqlite import get_sqlite_engine
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+RESULTS_DB_FILE = 'results.db'
+# 单条 SQL 中 IN 列表的最大长度
+_IN_CHUNK_SIZE = 500
+
+# 组串结果字段及类型，未列出的字段写入 extra 列
+STRING_RESULT_COLUMNS = {
+    # 组串标识（merge）
+    'box_id': String(50),
+    'inverter_id': String(50),
+    'string_id': String(50),
+    'location_id': String(64),
+    # diagnose
+    'anomaly_identifier': String(16),
+    'history_intensity': JSON,
+    'diagnosis_results': JSON,
+    # predict
+    'history_loss': JSON,
+    'future_loss': JSON,
+    'degradation_score': Float,
+    'accumulated_loss': Float,
+    # detect（历史版本的结果字段）
+    'degredation_rate': Float,
+    'anomaly_score': Float,
+    'anomaly_dates': JSON,
+    'rdc_posistion': JSON,
+    'loss_volume': JSON,
+}
+
+_metadata = MetaData()
+
+string_results = Table(
+    'string_results', _metadata,
+    Column('date', String(10), primary_key=True),
+    Column('device_id', String(50), primary_key=True),
+    *[Column(name, column_type) for name, column_type in STRING_RESULT_COLUMNS.items()],
+    Column('extra', JSON),
+    Column('updated_at', Integer),
+)
+
+daily_results = Table(
+    'daily_results', _metadata,
+    Column('date', String(10), primary_key=True),
+    Column('statistics', JSON),
+    Column('updated_at', Integer),
+)
+
+_ready = set()
+_imported = set()
+_lock = threading.Lock()
+
+
+def _check_station(station_name):
+    """
+    场站名须在 STATION_LIST 中，避免接口传入的任意名称在 data/ 下（或 data/ 之外）拼出路径
+    """
+    if station_name not in os.getenv('STATION_LIST', 'datu').strip().split(','):
+        raise ValueError(f"unknown station: {station_name!r}")
+
+
+def results_dir(repo_abs_path, station_name):
+    _check_station(station_name)
+    return os.path.join(repo_abs_path, 'data', station_name, 'results')
+
+
+def legacy_results_path(repo_abs_path, station_name, date):
+    return os.path.join(results_dir(repo_abs_path, station_name), f'{date}.json')
+
+
+def _get_engine(repo_abs_path, station_name, create=False):
+    """
+    获取场站结果库的引擎。create 为 True 时（仅写入）创建目录和表；
+    否则结果库文件不存在时返回 None，读取不会创建任何文件
+    """
+    db_path = os.path.abspath(os.path.join(results_dir(repo_abs_path, station_name), RESULTS_DB_FILE))
+    if not create:
+        return get_sqlite_engine(db_path) if os.path.exists(db_path) else None
+    engine = get_sqlite_engine(db_path)
+    if db_path not in _ready:
+        with _lock:
+            if db_path not in _ready:
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                _metadata.create_all(engine, checkfirst=True)
+                _ready.add(db_path)
+    return engine
+
+
+def _plain(value):
+    # numpy 标量转为 Python 类型，sqlite3 无法直接绑定 np.float32 / np.int64
+    if hasattr(value, 'item') and not isinstance(value, (list, dict, str)):
+        try:
+            return value.item()
+        except (TypeError, ValueError):
+            return value
+    return value
+
+
+def _read_legacy(repo_abs_path, station_name, date):
+    path = legacy_results_path(repo_abs_path, station_name, date)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"{path} 文件损坏或无法读取: {e}")
+        return None
+
+
+def _has_date(conn, date):
+    in_strings = conn.execute(select(string_results.c.date).where(string_results.c.date == date).limit(1)).first()
+    in_daily = conn.execute(select(daily_results.c.date).where(daily_results.c.date == date).limit(1)).first()
+    return in_strings is not None or in_daily is not None
+
+
+def _prepare_write(repo_abs_path, station_name, date):
+    """
+    写入前的准备：该日期在结果库中还没有数据而原 JSON 文件存在时，先导入原文件，避免只写入部分字段后丢失其余字段
+    """
+    engine = _get_engine(repo_abs_path, station_name, create=True)
+    key = (engine.url.database, date)
+    if key in _imported:
+        return engine
+    with engine.connect() as conn:
+        has_date = _has_date(conn, date)
+    if not has_date:
+        legacy = _read_legacy(repo_abs_path, station_name, date)
+        if legacy:
+            logger.info(f"import legacy results of {station_name} {date} into results store")
+            _upsert_rows(engine, date, legacy.get('results', {}))
+            if legacy.get('statistics') is not None:
+                _upsert_statistics(engine, date, legacy['statistics'])
+    _imported.add(key)
+    return engine
+
+
+def _upsert_rows(engine, date, rows):
+    now = int(time.time())
+    groups = defaultdict(list)
+    extras = {}
+    for device_id, fields in rows.items():
+        known = {name: _plain(value) for name, value in fields.items() if name in STRING_RESULT_COLUMNS}
+        unknown = {name: value for name, value in fields.items() if name not in STRING_RESULT_COLUMNS}
+        if unknown:
+            extras[device_id] = unknown
+        groups[tuple(sorted(known))].append({'date': date, 'device_id': device_id, 'updated_at': now, **known})
+
+    with engine.begin() as conn:
+        # 同一组字段的组串一次批量写入，冲突时只更新给出的列
+        for columns, values in groups.items():
+            stmt = sqlite_insert(string_results)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['date', 'device_id'],
+                set_={name: stmt.excluded[name] for name in columns + ('updated_at',)},
+            )
+            conn.execute(stmt, values)
+
+        if extras:
+            # 未定义列的字段合并进 extra
+            device_ids = list(extras)
+            existing = {}
+            for i in range(0, len(device_ids), _IN_CHUNK_SIZE):
+                chunk = device_ids[i:i + _IN_CHUNK_SIZE]
+                result = conn.execute(select(string_results.c.device_id, string_results.c.extra)
+                                      .where(string_results.c.date == date)
+                                      .where(string_results.c.device_id.in_(chunk)))
+                existing.update({device_id: extra or {} for device_id, extra in result})
+            stmt = (update(string_results)
+                    .where(and_(string_results.c.date == bindparam('b_date'), string_results.c.device_id == bindparam('b_device_id')))
+                    .values(extra=bindparam('b_extra')))
+            conn.execute(stmt, [{'b_date': date, 'b_device_id': device_id, 'b_extra': {**existing.get(device_id, {}), **fields}}
+                                for device_id, fields in extras.items()])
+
+
+def _upsert_statistics(engine, date, statistics):
+    with engine.begin() as conn:
+        stmt = sqlite_insert(daily_results).values(date=date, statistics=statistics, updated_at=int(time.time()))
+        stmt = stmt.on_conflict_do_update(index_elements=['date'],
+                                          set_={'statistics': stmt.excluded.statistics, 'updated_at': stmt.excluded.updated_at})
+        conn.execute(stmt)
+
+
+def upsert_string_fields(repo_abs_path, station_name, date, rows):
+    """
+    按字段写入组串结果，只更新给出的字段，其余字段保持不变；组串不存在时新建
+
+    Args:
+        date: 日期，形如 "2025-05-20"
+        rows: {device_id: {字段: 值}}
+    Returns:
+        int: 写入的组串数
+    """
+    if not rows:
+        return 0
+    engine = _prepare_write(repo_abs_path, station_name, date)
+    _upsert_rows(engine, date, rows)
+    return len(rows)
+
+
+def save_statistics(repo_abs_path, station_name, date, statistics):
+    """
+    写入场站当日统计（原 JSON 顶层的 statistics）
+    """
+    engine = _prepare_write(repo_abs_path, station_name, date)
+    _upsert_statistics(engine, date, statistics)
+
+
+def _row_fields(row, fields, include_extra):
+    item = {}
+    for name in fields:
+        value = row[name]
+        if value is not None:
+            item[name] = value
+    if include_extra and row['extra']:
+        item.update(row['extra'])
+    return item
+
+
+def load_string_fields(repo_abs_path, station_name, date, fields=None, device_ids=None):
+    """
+    读取组串结果
+
+    Args:
+        fields: 需要的字段，默认全部（含 extra 中的字段）；只读部分字段时不解析其余列
+        device_ids: 需要的组串，默认全部
+    Returns:
+        dict: {device_id: {字段: 值}}，值为空的字段不返回；没有结果时返回 {}
+    """
+    include_extra = fields is None
+    fields = list(STRING_RESULT_COLUMNS) if fields is None else [name for name in fields if name in STRING_RESULT_COLUMNS]
+    engine = _get_engine(repo_abs_path, station_name)
+    if device_ids is not None:
+        device_ids = list(device_ids)
+    if engine is not None:
+        columns = [string_results.c.device_id] + [string_results.c[name] for name in fields]
+        if include_extra:
+            columns.append(string_results.c.extra)
+        stmt = select(*columns).where(string_results.c.date == date).order_by(string_results.c.device_id)
+        with engine.connect() as conn:
+            if device_ids is None:
+                result = [row._mapping for row in conn.execute(stmt)]
+            else:
+                result = []
+                for i in range(0, len(device_ids), _IN_CHUNK_SIZE):
+                    chunk = device_ids[i:i + _IN_CHUNK_SIZE]
+                    result.extend(row._mapping for row in conn.execute(stmt.where(string_results.c.device_id.in_(chunk))))
+            has_date = bool(result) or _has_date(conn, date)
+        if has_date:
+            return {row['device_id']: _row_fields(row, fields, include_extra) for row in result}
+
+    # 迁移前的日期：从原 JSON 文件读取
+    legacy = _read_legacy(repo_abs_path, station_name, date)
+    if not legacy:
+        return {}
+    wanted = set(device_ids) if device_ids is not None else None
+    return {device_id: {name: value for name, value in values.items() if name in fields or (include_extra and name not in STRING_RESULT_COLUMNS)}
+            for device_id, values in legacy.get('results', {}).items() if wanted is None or device_id in wanted}
+
+
+def list_device_ids(repo_abs_path, station_name, date):
+    return list(load_string_fields(repo_abs_path, station_name, date, fields=[]))
+
+
+def load_statistics(repo_abs_path, station_name, date):
+    """
+    读取场站当日统计，没有时返回 None
+    """
+    engine = _get_engine(repo_abs_path, station_name)
+    if engine is not None:
+        with engine.connect() as conn:
+            row = conn.execute(select(daily_results.c.statistics).where(daily_results.c.date == date)).first()
+            has_date = row is not None or _has_date(conn, date)
+        if has_date:
+            return row[0] if row is not None else None
+    legacy = _read_legacy(repo_abs_path, station_name, date)
+    return legacy.get('statistics') if legacy else None
+
+
+def results_exist(repo_abs_path, station_name, date):
+    engine = _get_engine(repo_abs_path, station_name)
+    if engine is not None:
+        with engine.connect() as conn:
+            if _has_date(conn, date):
+                return True
+    return os.path.exists(legacy_results_path(repo_abs_path, station_name, date))
+
+
+def results_version(repo_abs_path, station_name, date):
+    """
+    某天结果的版本：结果库文件、WAL 文件和原 JSON 文件的 (路径, 修改时间, 大小)，任一写入提交后都会变化
+    """
+    db_path = os.path.join(results_dir(repo_abs_path, station_name), RESULTS_DB_FILE)
+    version = []
+    for path in (db_path, db_path + '-wal', legacy_results_path(repo_abs_path, station_name, date)):
+        try:
+            stat = os.stat(path)
+            version.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append((path, None, None))
+    return tuple(version)
+
+
+def latest_results_date(repo_abs_path, station_name, date):
+    """
+    不晚于 date 的最近一个有结果的日期，没有时返回 None
+    """
+    engine = _get_engine(repo_abs_path, station_name)
+    latest = None
+    if engine is not None:
+        with engine.connect() as conn:
+            latest = conn.execute(select(func.max(string_results.c.date)).where(string_results.c.date <= date)).scalar()
+    folder = results_dir(repo_abs_path, station_name)
+    legacy_dates = [name[:-5] for name in os.listdir(folder) if name.endswith('.json') and name[:-5] <= date] if os.path.isdir(folder) else []
+    candidates = [value for value in [latest] + legacy_dates if value]
+    return max(candidates) if candidates else None
+
+
+def load_results(repo_abs_path, station_name, date, fields=None):
+    """
+    兼容视图：按原 data/<场站>/results/<日期>.json 的结构返回结果
+
+    Args:
+        fields: 组串需要的字段，默认全部
+    Returns:
+        dict: {'date': date, 'results': {device_id: {...}}, 'statistics': {...}}（没有统计时不含 statistics），
+              该日期没有任何结果时返回 None
+    """
+    results = load_string_fields(repo_abs_path, station_name, date, fields=fields)
+    statistics = load_statistics(repo_abs_path, station_name, date)
+    if not results and statistics is None and not results_exist(repo_abs_path, station_name, date):
+        return None
+    data = {'date': date, 'results': results}
+    if statistics is not None:
+        data['statistics'] = statistics
+    return data
@@ -0,0 +1,240 @@
+# File: backend/database/rollup.py
+# 日汇总表的维护与读取：写入原始小时数据后，只对发生变化的日期重新汇总
+import threading
+import logging
+
+from sqlalchemy import func, case, and_
+
+from schema.models import Base, create_rollup_models
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+TZ_OFFSET_SECONDS = 8 * 3600  # 北京时间
+# alarm_bits 的位序，第 i 位对应 ALARM_FIELDS[i]
+ALARM_FIELDS = [
+    "sig_overvoltage", "sig_undervoltage", "sig_overfrequency", "sig_underfrequency",
+    "sig_gridless", "sig_imbalance", "sig_overcurrent", "sig_midpoint_grounding",
+    "sig_insulation_failure", "sig_excessive_DC", "sig_arc_self_protection", "sig_arc_failure",
+]
+QUALITY_FIELDS = ["error_count_intensity", "missing_count_intensity", "error_count_voltage", "missing_count_voltage"]
+
+_rollup_models = {}
+_created_tables = set()
+_lock = threading.Lock()
+
+
+def get_rollup_models(station_name):
+    """
+    获取场站的日汇总模型 (StringDaily, InverterDaily)，同一场站只创建一次
+    """
+    with _lock:
+        if station_name not in _rollup_models:
+            _rollup_models[station_name] = create_rollup_models(station_name)
+        return _rollup_models[station_name]
+
+
+def ensure_rollup_tables(database_manager, station_name):
+    """
+    日汇总表不存在时自动创建
+    """
+    key = (database_manager.db_type, station_name)
+    if key in _created_tables:
+        return get_rollup_models(station_name)
+    models = get_rollup_models(station_name)
+    engine = database_manager.get_engine(station_name)
+    Base.metadata.create_all(engine, tables=[model.__table__ for model in models], checkfirst=True)
+    _created_tables.add(key)
+    return models
+
+
+def day_start_timestamp(timestamp):
+    """时间戳所在日（北京时间）0点的时间戳"""
+    timestamp = int(timestamp)
+    return timestamp - (timestamp + TZ_OFFSET_SECONDS) % DAY_SECONDS
+
+
+def alarm_fields_from_bits(bits):
+    return [field for i, field in enumerate(ALARM_FIELDS) if bits and bits >> i & 1]
+
+
+def refresh_string_daily(session, string_info, string_daily, day):
+    valid = and_(string_info.intensity.isnot(None), string_info.voltage.isnot(None))
+    rows = (
+        session.query(
+            string_info.device_id,
+            func.max(string_info.box_id).label('box_id'),
+            func.max(string_info.inverter_id).label('inverter_id'),
+            func.max(string_info.string_id).label('string_id'),
+            func.sum(case((valid, string_info.intensity * string_info.voltage / 6), else_=0)).label('energy'),
+            func.max(string_info.intensity).label('intensity_max'),
+            func.min(string_info.intensity).label('intensity_min'),
+            func.max(string_info.voltage).label('voltage_max'),
+            func.min(string_info.voltage).label('voltage_min'),
+            func.sum(case((valid, 1), else_=0)).label('valid_hours'),
+        )
+        .filter(string_info.timestamp >= day)
+        .filter(string_info.timestamp < day + DAY_SECONDS)
+        .group_by(string_info.device_id)
+        .all()
+    )
+
+    # 数据质量统计由填补流程写入，重新汇总时保留
+    quality = {
+        row.device_id: row
+        for row in session.query(string_daily.device_id, *[getattr(string_daily, f) for f in QUALITY_FIELDS])
+        .filter(string_daily.day == day).all()
+    }
+
+    records = []
+    for row in rows:
+        record = dict(row._mapping)
+        record['day'] = day
+        record['valid_hours'] = int(record['valid_hours'] or 0)
+        previous = quality.get(row.device_id)
+        for field in QUALITY_FIELDS:
+            record[field] = getattr(previous, field) if previous is not None else None
+        records.append(record)
+
+    session.query(string_daily).filter(string_daily.day == day).delete(synchronize_session=False)
+    if records:
+        session.bulk_insert_mappings(string_daily, records)
+    return len(records)
+
+
+def refresh_inverter_daily(session, inverter_info, inverter_daily, day):
+    alarm_columns = [
+        func.max(case((getattr(inverter_info, field) == 1, 1), else_=0)).label(field)
+        for field in ALARM_FIELDS
+    ]
+    rows = (
+        session.query(
+            inverter_info.device_id,
+            func.max(inverter_info.box_id).label('box_id'),
+            func.max(inverter_info.inverter_id).label('inverter_id'),
+            func.max(inverter_info.generated_energy).label('generated_energy_max'),
+            func.max(inverter_info.sum_energy).label('sum_energy_max'),
+            func.max(inverter_info.month_energy).label('month_energy_max'),
+            func.max(inverter_info.power).label('power_max'),
+            func.sum(case((inverter_info.power.isnot(None), 1), else_=0)).label('valid_hours'),
+            *alarm_columns,
+        )
+        .filter(inverter_info.timestamp >= day)
+        .filter(inverter_info.timestamp < day + DAY_SECONDS)
+        .group_by(inverter_info.device_id)
+        .all()
+    )
+
+    records = []
+    for row in rows:
+        mapping = row._mapping
+        alarm_bits = 0
+        for i, field in enumerate(ALARM_FIELDS):
+            if mapping[field]:
+                alarm_bits |= 1 << i
+        records.append({
+            'day': day,
+            'device_id': mapping['device_id'],
+            'box_id': mapping['box_id'],
+            'inverter_id': mapping['inverter_id'],
+            'generated_energy_max': mapping['generated_energy_max'],
+            'sum_energy_max': mapping['sum_energy_max'],
+            'month_energy_max': mapping['month_energy_max'],
+            'power_max': mapping['power_max'],
+            'valid_hours': int(mapping['valid_hours'] or 0),
+            'alarm_bits': alarm_bits,
+        })
+
+    session.query(inverter_daily).filter(inverter_daily.day == day).delete(synchronize_session=False)
+    if records:
+        session.bulk_insert_mappings(inverter_daily, records)
+    return len(records)
+
+
+def refresh_daily_rollups(database_manager, station_name, station_model, timestamps, tables=('string', 'inverter')):
+    """
+    重新汇总 timestamps 所在日期的日汇总数据；汇总失败只记录日志，不影响原始数据写入
+
+    Args:
+        database_manager: 数据库管理器
+        station_name: 场站名称
+        station_model: (StationInfo, InverterInfo, StringInfo)
+        timestamps: 发生变化的时间戳（秒）
+        tables: 需要重新汇总的表，'string' 和/或 'inverter'
+    """
+    days = sorted({day_start_timestamp(ts) for ts in timestamps})
+    if not days:
+        return
+    _, inverter_info, string_info = station_model
+
+    session = None
+    try:
+        string_daily, inverter_daily = ensure_rollup_tables(database_manager, station_name)
+        session = database_manager.get_session(station_name)
+        for day in days:
+            if 'string' in tables:
+                refresh_string_daily(session, string_info, string_daily, day)
+            if 'inverter' in tables:
+                refresh_inverter_daily(session, inverter_info, inverter_daily, day)
+        session.commit()
+        logger.info(f"{station_name}: daily rollups refreshed for {len(days)} day(s)")
+    except Exception as e:
+        logger.error(f"{station_name}: refresh daily rollups failed: {e}")
+        if session:
+            session.rollback()
+    finally:
+        if session:
+            session.close()
+
+
+def update_string_quality(database_manager, station_name, day, records):
+    """
+    写入某天各组串的数据质量统计（error/missing 计数）
+
+    Args:
+        records: [{'device_id': ..., 'error_count_intensity': ..., ...}]
+    """
+    if not records:
+        return
+    session = None
+    try:
+        string_daily, _ = ensure_rollup_tables(database_manager, station_name)
+        session = database_manager.get_session(station_name)
+        day = day_start_timestamp(day)
+        mappings = [{'day': day, 'device_id': r['device_id'], **{f: r[f] for f in QUALITY_FIELDS}} for r in records]
+        session.bulk_update_mappings(string_daily, mappings)
+        session.commit()
+    except Exception as e:
+        logger.error(f"{station_name}: update string quality rollup failed: {e}")
+        if session:
+            session.rollback()
+    finally:
+        if session:
+            session.close()
+
+
+def rollup_covered_days(session, model, start_day, end_day):
+    """
+    [start_day, end_day] 内已有汇总数据的日期（当日0点时间戳）集合
+    """
+    rows = session.query(model.day).filter(model.day >= start_day).filter(model.day <= end_day).distinct().all()
+    return {int(row[0]) for row in rows}
+
+
+def missing_day_ranges(covered_days, start_day, end_day):
+    """
+    [start_day, end_day] 内没有汇总数据的日期，合并为连续的时间段
+
+    Returns:
+        list[tuple]: [(起始时间戳, 结束时间戳（不含）)]，需要回退到原始小时数据查询的时间段
+    """
+    ranges = []
+    for day in range(day_start_timestamp(start_day), int(end_day) + 1, DAY_SECONDS):
+        if day in covered_days:
+            continue
+        if ranges and ranges[-1][1] == day:
+            ranges[-1] = (ranges[-1][0], day + DAY_SECONDS)
+        else:
+            ranges.append((day, day + DAY_SECONDS))
+    return ranges
@@ -2,11 +2,16 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 import os
+import threading
+from schema.sqlite import get_sqlite_engine
+
+MARIADB_ENGINE_KEY = '__mariadb__'
 
 class DatabaseManager:
     def __init__(self, repo_path=None):
         self.engines = {}
         self.Session = {}
+        self._lock = threading.RLock()
         self._init_config(repo_path)
 
     def _init_config(self, repo_path):
@@ -25,24 +30,34 @@ class DatabaseManager:
         self.db_pass = os.getenv('MARIADB_PASSWORD', '').strip()
         self.db_schema = os.getenv('MARIADB_SCHEMA', '').strip()
 
+        # MariaDB连接池配置（所有场站共用一个连接池）
+        self.pool_size = int(os.getenv('MARIADB_POOL_SIZE', '10').strip())
+        self.max_overflow = int(os.getenv('MARIADB_MAX_OVERFLOW', '10').strip())
+        self.pool_timeout = int(os.getenv('MARIADB_POOL_TIMEOUT', '30').strip())
+        self.pool_recycle = int(os.getenv('MARIADB_POOL_RECYCLE', '3600').strip())
+
+    def _engine_key(self, db_name):
+        # MariaDB 下所有场站、impute 和 user 的表都在同一个 schema 中（表名带场站前缀），共用一个引擎
+        return db_name if self.db_type == 'sqlite' else MARIADB_ENGINE_KEY
+
     def get_engine(self, db_name):
-        if db_name not in self.engines:
-            if self.db_type == 'sqlite':
-                engine = self._create_sqlite_engine(db_name)
-            else:
-                engine = self._create_mariadb_engine(db_name)
+        engine_key = self._engine_key(db_name)
+        if engine_key not in self.engines:
+            with self._lock:
+                if engine_key not in self.engines:
+                    if self.db_type == 'sqlite':
+                        engine = self._create_sqlite_engine(db_name)
+                    else:
+                        engine = self._create_mariadb_engine(db_name)
 
-            self.engines[db_name] = engine
-        return self.engines[db_name]
+                    self.engines[engine_key] = engine
+        return self.engines[engine_key]
 
     def _create_sqlite_engine(self, db_name):
         """创建SQLite引擎"""
         db_path = os.path.join(self.db_dir, f"{db_name}.db")
-        return create_engine(
-            f"sqlite:///{db_path}",
-            pool_size=10,
-            connect_args={"check_same_thread": False}
-        )
+        # WAL、pragma 与连接池配置见 schema/sqlite.py，与原生 sqlite3 调用共用
+        return get_sqlite_engine(db_path)
 
     def _create_mariadb_engine(self, db_name):
         station_name = db_name
@@ -55,24 +70,41 @@ class DatabaseManager:
         )
         return create_engine(
             connection_str,
-            pool_size=20,
-            max_overflow=10,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_timeout=self.pool_timeout,
             pool_pre_ping=True,
-            pool_recycle=3600,
+            pool_recycle=self.pool_recycle,
             isolation_level="READ COMMITTED"
         )
 
     def get_session(self, db_name):
         if db_name not in self.Session:
-            engine = self.get_engine(db_name)
-            session_factory = sessionmaker(
-                bind=engine,
-                autoflush=False,
-                autocommit=False
-            )
-            self.Session[db_name] = scoped_session(session_factory)
+            with self._lock:
+                if db_name not in self.Session:
+                    engine = self.get_engine(db_name)
+                    session_factory = sessionmaker(
+                        bind=engine,
+                        autoflush=False,
+                        autocommit=False
+                    )
+                    self.Session[db_name] = scoped_session(session_factory)
         return self.Session[db_name]()
 
+    def get_pool_stats(self):
+        """连接池使用情况，键为引擎名（sqlite 为数据库名，mariadb 为共用引擎）"""
+        stats = {}
+        for engine_key, engine in self.engines.items():
+            pool = engine.pool
+            stats[engine_key] = {
+                'status': pool.status(),
+                'size': pool.size() if hasattr(pool, 'size') else None,
+                'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+                'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+                'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+            }
+        return stats
+
     def close_all(self):
         for session in self.Session.values():
             session.remove()
@@ -0,0 +1,82 @@
+# File: backend/database/sqlite.py
+# SQLite 性能模式：WAL + pragma 调优 + 连接池；ORM 引擎与原生 sqlite3 调用共用同一个连接池
+import os
+import threading
+import logging
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+# 日志配置（只需在模块顶部配置一次即可）
+logger = logging.getLogger(__name__)
+
+def sqlite_settings():
+    """
+    读取 SQLite 配置；在创建引擎 / 建立连接时调用而不是在导入时读取，
+    保证 load_dotenv 之后的 setting/.env.* 配置生效
+    """
+    return {
+        'pool_size': int(os.getenv('SQLITE_POOL_SIZE', '8').strip()),
+        'max_overflow': int(os.getenv('SQLITE_MAX_OVERFLOW', '8').strip()),
+        'cache_size_kb': int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536').strip()),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)).strip()),
+        'busy_timeout_ms': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '10000').strip()),
+    }
+
+
+_engines = {}
+_lock = threading.Lock()
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """
+    每个新连接建立时执行：
+    WAL 让读写互不阻塞（多个读者 + 一个写者），写者之间通过 busy_timeout 排队
+    """
+    settings = sqlite_settings()
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{settings['cache_size_kb']}")
+        cursor.execute(f"PRAGMA mmap_size={settings['mmap_size']}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute(f"PRAGMA busy_timeout={settings['busy_timeout_ms']}")
+    finally:
+        cursor.close()
+
+
+def get_sqlite_engine(db_path):
+    """
+    获取数据库文件对应的引擎，同一个文件在进程内只创建一个引擎（连接池）
+    """
+    db_path = os.path.abspath(db_path)
+    if db_path not in _engines:
+        with _lock:
+            if db_path not in _engines:
+                settings = sqlite_settings()
+                engine = create_engine(
+                    f"sqlite:///{db_path}",
+                    poolclass=QueuePool,
+                    pool_size=settings['pool_size'],
+                    max_overflow=settings['max_overflow'],
+                    pool_pre_ping=False,
+                    connect_args={"check_same_thread": False, "timeout": settings['busy_timeout_ms'] / 1000}
+                )
+                event.listen(engine, "connect", apply_sqlite_pragmas)
+                _engines[db_path] = engine
+    return _engines[db_path]
+
+
+def sqlite_connect(db_path):
+    """
+    替代 sqlite3.connect：从连接池借出一个已调优的连接，close() 时归还连接池
+    """
+    return get_sqlite_engine(db_path).raw_connection()
+
+
+def dispose_sqlite_engines():
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
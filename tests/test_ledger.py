@@ -0,0 +1,61 @@
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from schema.models import Base
+from schema.registry import get_pipeline_request_model
+from schema.ledger import enqueue_pipeline_request, claim_pipeline_request, finish_pipeline_request, list_pipeline_requests, LEDGER_DB_NAME
+
+
+class SqliteManager:
+    """内存 sqlite 的最小数据库管理器（接口同 schema.session.DatabaseManager）"""
+    db_type = 'sqlite'
+
+    def __init__(self):
+        self.engine = create_engine('sqlite://')
+        self.Session = sessionmaker(bind=self.engine)
+        # ensure_request_table 在进程内只建一次表，这里显式创建
+        Base.metadata.create_all(self.engine, tables=[get_pipeline_request_model().__table__])
+
+    def get_engine(self, db_name):
+        return self.engine
+
+    def get_session(self, db_name):
+        return self.Session()
+
+
+def _status(database_manager):
+    return {item['id']: item['status'] for item in list_pipeline_requests(database_manager)}
+
+
+def test_claim_and_finish():
+    database_manager = SqliteManager()
+    enqueue_pipeline_request(database_manager, '2025-05-20', ['datu'])
+
+    request = claim_pipeline_request(database_manager)
+    assert request['status'] == 'running'
+    assert claim_pipeline_request(database_manager) is None
+
+    finish_pipeline_request(database_manager, request['id'], 'success')
+    assert _status(database_manager) == {request['id']: 'success'}
+
+
+def test_stale_running_request_is_failed():
+    database_manager = SqliteManager()
+    enqueue_pipeline_request(database_manager, '2025-05-20', ['datu'])
+    stale = claim_pipeline_request(database_manager)
+    # 模拟流水线进程在执行中退出：请求停留在 running 且开始时间已超时
+    request_model = get_pipeline_request_model()
+    with database_manager.get_session(LEDGER_DB_NAME) as session:
+        session.query(request_model).filter(request_model.id == stale['id']).update({'started_at': int(time.time()) - 7200})
+        session.commit()
+    enqueue_pipeline_request(database_manager, '2025-05-21', ['datu'])
+
+    request = claim_pipeline_request(database_manager, timeout_seconds=3600)
+    assert request['process_date'] == '2025-05-21'
+    assert _status(database_manager) == {stale['id']: 'failed', request['id']: 'running'}
+
+    # 未超时的 running 请求保持不变
+    claim_pipeline_request(database_manager, timeout_seconds=3600)
+    assert _status(database_manager)[request['id']] == 'running'
@@ -0,0 +1,44 @@
+import threading
+
+from process.pipeline import StationDagExecutor
+
+
+def test_inline_stages_run_in_dedicated_thread():
+    stages = ('preprocess', 'impute', 'predict')
+    calls = []
+    lock = threading.Lock()
+
+    def run_stage(stage, station_name):
+        with lock:
+            calls.append((station_name, stage, threading.current_thread().name))
+
+    executor = StationDagExecutor(run_stage, stages=stages, io_workers=2, cpu_workers=2,
+                                  stage_backends={'impute': 'inline', 'predict': 'inline'})
+    results = executor.run(['a', 'b'])
+
+    assert all(result['status'] == 'success' for result in results.values())
+    for station_name, stage, thread_name in calls:
+        if stage == 'preprocess':
+            assert thread_name.startswith('pipeline-io')
+        else:
+            assert thread_name.startswith('pipeline-inline')
+    assert len(calls) == 6
+
+
+def test_failed_inline_stage_skips_remaining_stages():
+    calls = []
+
+    def run_stage(stage, station_name):
+        calls.append((station_name, stage))
+        if station_name == 'a' and stage == 'impute':
+            raise RuntimeError('boom')
+
+    executor = StationDagExecutor(run_stage, stages=('preprocess', 'impute', 'predict'),
+                                  stage_backends={'impute': 'inline'})
+    results = executor.run(['a', 'b'])
+
+    assert results['a']['status'] == 'failed'
+    assert results['a']['failed_stage'] == 'impute'
+    assert results['a']['error'] == 'boom'
+    assert ('a', 'predict') not in calls
+    assert results['b']['status'] == 'success'
@@ -0,0 +1,65 @@
+import json
+import struct
+
+import numpy as np
+
+from connect.response import pack_f32, F32_MIN_ARRAY_LENGTH
+
+
+def unpack_f32(payload):
+    """按 connect/response.py 中的格式还原数据（与前端解码方式一致）"""
+    header_length = struct.unpack('<I', payload[:4])[0]
+    header = json.loads(payload[4:4 + header_length].decode('utf-8'))
+    values = np.frombuffer(payload, dtype='<f4', offset=4 + header_length)
+
+    def walk(obj):
+        if isinstance(obj, dict):
+            if set(obj) == {'$f32'}:
+                start, length = obj['$f32']
+                return [None if np.isnan(v) else float(v) for v in values[start:start + length]]
+            return {key: walk(value) for key, value in obj.items()}
+        if isinstance(obj, list):
+            return [walk(value) for value in obj]
+        return obj
+
+    return walk(header)
+
+
+def test_pack_f32_round_trip():
+    data = {
+        'device_id': '001-001-001',
+        'intensity': [0.5 * i for i in range(24)],
+        'voltage': [None if i % 5 == 0 else float(i) for i in range(24)],
+        'short': [1.0, 2.0],
+        'nested': {'series': [np.arange(F32_MIN_ARRAY_LENGTH, dtype=np.float64)], 'labels': ['a', 'b']},
+    }
+    payload = pack_f32(data)
+    header_length = struct.unpack('<I', payload[:4])[0]
+    assert header_length % 4 == 0
+
+    decoded = unpack_f32(payload)
+    assert decoded['device_id'] == data['device_id']
+    assert decoded['intensity'] == data['intensity']
+    assert decoded['voltage'] == data['voltage']
+    # 短数组和非数值数组保持 JSON
+    assert decoded['short'] == [1.0, 2.0]
+    assert decoded['nested']['labels'] == ['a', 'b']
+    assert decoded['nested']['series'] == [list(map(float, range(F32_MIN_ARRAY_LENGTH)))]
+
+
+def test_pack_f32_without_arrays():
+    data = {'message': 'ok', 'values': [1, 2]}
+    assert unpack_f32(pack_f32(data)) == data
+
+
+def test_pack_f32_keeps_int_arrays_as_json():
+    # 大于 2^24 的整数（如时间戳）转 float32 会丢精度，整数数组保持 JSON
+    timestamps = [1716000000 + i for i in range(F32_MIN_ARRAY_LENGTH)]
+    data = {'time': timestamps, 'ids': np.arange(F32_MIN_ARRAY_LENGTH, dtype=np.int64) + 2 ** 24 + 1}
+    payload = pack_f32(data)
+    header_length = struct.unpack('<I', payload[:4])[0]
+    assert len(payload) == 4 + header_length
+
+    decoded = unpack_f32(payload)
+    assert decoded['time'] == timestamps
+    assert decoded['ids'] == [2 ** 24 + 1 + i for i in range(F32_MIN_ARRAY_LENGTH)]
@@ -0,0 +1,124 @@
+import json
+import os
+
+import pytest
+
+from schema.results_store import (upsert_string_fields, load_string_fields, load_results, save_statistics, legacy_results_path,
+                                  results_exist, latest_results_date, results_dir, RESULTS_DB_FILE)
+from schema.results_cache import ResultsCache
+
+STATION = 'teststation'
+DATE = '2025-05-20'
+
+LEGACY = {
+    'date': DATE,
+    'results': {
+        '001-001-001': {
+            'box_id': '001', 'inverter_id': '001', 'string_id': '001',
+            'anomaly_identifier': 'normal',
+            'history_intensity': [1.0, 2.0, 3.0],
+            'degradation_score': 0.12,
+            'custom_note': 'legacy extra field',
+        },
+        '001-001-002': {
+            'box_id': '001', 'inverter_id': '001', 'string_id': '002',
+            'anomaly_identifier': 'zero',
+            'diagnosis_results': {'遮挡': 0.5},
+        },
+    },
+    'statistics': {'anomaly_count': 1, 'total': 2},
+}
+
+
+@pytest.fixture(autouse=True)
+def station_list(monkeypatch):
+    monkeypatch.setenv('STATION_LIST', f'datu,{STATION}')
+
+
+def write_legacy(repo, data=LEGACY):
+    path = legacy_results_path(repo, STATION, DATE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def test_upsert_merges_fields_and_extra(tmp_path):
+    repo = str(tmp_path)
+    upsert_string_fields(repo, STATION, DATE, {'001-001-001': {'box_id': '001', 'anomaly_score': 1.5, 'note': 'a'}})
+    upsert_string_fields(repo, STATION, DATE, {'001-001-001': {'degradation_score': 0.3, 'flag': True}})
+    upsert_string_fields(repo, STATION, DATE, {'001-001-001': {'anomaly_score': 2.5, 'note': 'b'}})
+
+    row = load_string_fields(repo, STATION, DATE)['001-001-001']
+    assert row == {'box_id': '001', 'anomaly_score': 2.5, 'degradation_score': 0.3, 'note': 'b', 'flag': True}
+
+
+def test_partial_field_read(tmp_path):
+    repo = str(tmp_path)
+    upsert_string_fields(repo, STATION, DATE, {'001-001-001': {'box_id': '001', 'anomaly_score': 1.5, 'note': 'a'},
+                                               '001-001-002': {'box_id': '001'}})
+    rows = load_string_fields(repo, STATION, DATE, fields=['anomaly_score'], device_ids=['001-001-001'])
+    assert rows == {'001-001-001': {'anomaly_score': 1.5}}
+
+
+def test_legacy_json_read_without_import(tmp_path):
+    repo = str(tmp_path)
+    write_legacy(repo)
+    assert load_results(repo, STATION, DATE) == LEGACY
+
+
+def test_legacy_json_imported_on_first_write(tmp_path):
+    repo = str(tmp_path)
+    write_legacy(repo)
+    upsert_string_fields(repo, STATION, DATE, {'001-001-002': {'future_loss': [0.1, 0.2]}})
+    # 导入后删除原文件，结果只来自结果库
+    os.remove(legacy_results_path(repo, STATION, DATE))
+
+    data = load_results(repo, STATION, DATE)
+    expected = json.loads(json.dumps(LEGACY))
+    expected['results']['001-001-002']['future_loss'] = [0.1, 0.2]
+    assert data == expected
+
+
+def test_load_results_matches_json_shape(tmp_path):
+    repo = str(tmp_path)
+    upsert_string_fields(repo, STATION, DATE, LEGACY['results'])
+    save_statistics(repo, STATION, DATE, LEGACY['statistics'])
+    assert load_results(repo, STATION, DATE) == LEGACY
+    assert load_results(repo, STATION, '2025-05-21') is None
+
+
+def test_results_cache_invalidated_after_write(tmp_path):
+    repo = str(tmp_path)
+    cache = ResultsCache(max_bytes=1024 * 1024)
+    upsert_string_fields(repo, STATION, DATE, {'001-001-001': {'anomaly_score': 1.0}})
+
+    assert cache.get(repo, STATION, DATE)['results']['001-001-001']['anomaly_score'] == 1.0
+    assert cache.get(repo, STATION, DATE)['results']['001-001-001']['anomaly_score'] == 1.0
+    assert cache.stats()['hits'] == 1
+
+    upsert_string_fields(repo, STATION, DATE, {'001-001-001': {'anomaly_score': 2.0}})
+    assert cache.get(repo, STATION, DATE)['results']['001-001-001']['anomaly_score'] == 2.0
+    assert cache.stats()['misses'] == 2
+
+
+def test_read_does_not_create_store(tmp_path):
+    repo = str(tmp_path)
+    assert load_results(repo, STATION, DATE) is None
+    assert not results_exist(repo, STATION, DATE)
+    assert latest_results_date(repo, STATION, DATE) is None
+    assert not os.path.exists(os.path.join(repo, 'data'))
+
+    # 只有原 JSON 文件时读取也不创建结果库
+    write_legacy(repo)
+    assert load_results(repo, STATION, DATE) == LEGACY
+    assert not os.path.exists(os.path.join(results_dir(repo, STATION), RESULTS_DB_FILE))
+
+
+@pytest.mark.parametrize('station_name', ['unknown', '../../escaped', ''])
+def test_unknown_station_rejected(tmp_path, station_name):
+    repo = str(tmp_path / 'repo')
+    with pytest.raises(ValueError):
+        load_results(repo, station_name, DATE)
+    with pytest.raises(ValueError):
+        upsert_string_fields(repo, station_name, DATE, {'001-001-001': {'anomaly_score': 1.0}})
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from schema.models import Base, create_station_models
+from schema.rollup import (refresh_daily_rollups, ensure_rollup_tables, get_rollup_models, rollup_covered_days, missing_day_ranges,
+                           alarm_fields_from_bits, day_start_timestamp, ALARM_FIELDS, DAY_SECONDS)
+from process.overview.energy import query_generation
+
+STATION = 'rolluptest'
+DAYS = 5
+
+
+class SqliteManager:
+    """内存 sqlite 的最小数据库管理器（接口同 schema.session.DatabaseManager）"""
+    db_type = 'sqlite'
+
+    def __init__(self):
+        self.engine = create_engine('sqlite://')
+        self.Session = sessionmaker(bind=self.engine)
+
+    def get_engine(self, db_name):
+        return self.engine
+
+    def get_session(self, db_name):
+        return self.Session()
+
+
+@pytest.fixture(scope='module')
+def station_models():
+    return create_station_models(STATION)
+
+
+@pytest.fixture
+def station(station_models):
+    database_manager = SqliteManager()
+    # 每个用例一个新的内存库；ensure_rollup_tables 在进程内只建一次表，这里显式创建
+    tables = [model.__table__ for model in (*station_models, *get_rollup_models(STATION))]
+    Base.metadata.create_all(database_manager.engine, tables=tables)
+    _, inverter_info, string_info = station_models
+    day0 = day_start_timestamp(1716000000)
+    rng = random.Random(0)
+    session = database_manager.get_session(STATION)
+    for day in range(DAYS):
+        for hour in range(24):
+            timestamp = day0 + day * DAY_SECONDS + hour * 3600
+            for inverter in ('001', '002'):
+                alarms = {field: int(rng.random() < 0.05) for field in ALARM_FIELDS}
+                session.add(inverter_info(timestamp=timestamp, device_id=f'001-{inverter}', box_id='001', inverter_id=inverter,
+                                          generated_energy=rng.random() * 100, sum_energy=rng.random() * 1000,
+                                          month_energy=rng.random() * 500, power=rng.random(), **alarms))
+                for string in ('001', '002'):
+                    missing = rng.random() < 0.1
+                    session.add(string_info(timestamp=timestamp, device_id=f'001-{inverter}-{string}', box_id='001',
+                                            inverter_id=inverter, string_id=string,
+                                            intensity=None if missing else rng.random() * 10, voltage=rng.random() * 800))
+    session.commit()
+    session.close()
+    # 汇总表由写入流程维护，此处先不汇总
+    return database_manager, station_models, day0
+
+
+def day_timestamps(day0, days):
+    return [day0 + day * DAY_SECONDS for day in days]
+
+
+def test_missing_day_ranges():
+    day0 = day_start_timestamp(1716000000)
+    covered = set(day_timestamps(day0, [1, 2, 4]))
+    assert missing_day_ranges(covered, day0, day0 + 5 * DAY_SECONDS) == [
+        (day0, day0 + DAY_SECONDS), (day0 + 3 * DAY_SECONDS, day0 + 4 * DAY_SECONDS), (day0 + 5 * DAY_SECONDS, day0 + 6 * DAY_SECONDS)]
+    assert missing_day_ranges(set(day_timestamps(day0, range(3))), day0, day0 + 2 * DAY_SECONDS) == []
+
+
+@pytest.mark.parametrize('rolled_days', [[], [1, 3], list(range(DAYS))])
+def test_query_generation_matches_raw(station, rolled_days):
+    database_manager, station_models, day0 = station
+    start, end = day0, day0 + DAYS * DAY_SECONDS - 1
+    raw = query_generation(start, end, database_manager, station_models, STATION)
+
+    if rolled_days:
+        refresh_daily_rollups(database_manager, STATION, station_models, day_timestamps(day0, rolled_days), tables=('inverter',))
+    with database_manager.get_session(STATION) as session:
+        _, inverter_daily = ensure_rollup_tables(database_manager, STATION)
+        assert rollup_covered_days(session, inverter_daily, day0, end) == set(day_timestamps(day0, rolled_days))
+    assert query_generation(start, end, database_manager, station_models, STATION) == pytest.approx(raw)
+
+
+def test_string_daily_matches_raw(station):
+    database_manager, station_models, day0 = station
+    _, _, string_info = station_models
+    refresh_daily_rollups(database_manager, STATION, station_models, day_timestamps(day0, range(DAYS)), tables=('string',))
+    string_daily, _ = ensure_rollup_tables(database_manager, STATION)
+
+    with database_manager.get_session(STATION) as session:
+        for day in day_timestamps(day0, range(DAYS)):
+            raw = dict(
+                session.query(string_info.device_id, func.sum(string_info.intensity * string_info.voltage / 6))
+                .filter(string_info.timestamp >= day).filter(string_info.timestamp < day + DAY_SECONDS)
+                .filter(string_info.intensity.isnot(None)).filter(string_info.voltage.isnot(None))
+                .group_by(string_info.device_id).all()
+            )
+            rolled = dict(session.query(string_daily.device_id, string_daily.energy).filter(string_daily.day == day).all())
+            assert rolled.keys() == raw.keys()
+            for device_id, energy in raw.items():
+                assert rolled[device_id] == pytest.approx(energy)
+
+
+def test_inverter_alarm_bits_match_raw(station):
+    database_manager, station_models, day0 = station
+    _, inverter_info, _ = station_models
+    refresh_daily_rollups(database_manager, STATION, station_models, day_timestamps(day0, range(DAYS)), tables=('inverter',))
+    _, inverter_daily = ensure_rollup_tables(database_manager, STATION)
+
+    with database_manager.get_session(STATION) as session:
+        for row in session.query(inverter_daily).all():
+            raw_rows = (session.query(inverter_info)
+                        .filter(inverter_info.device_id == row.device_id)
+                        .filter(inverter_info.timestamp >= row.day).filter(inverter_info.timestamp < row.day + DAY_SECONDS).all())
+            fired = {field for raw in raw_rows for field in ALARM_FIELDS if getattr(raw, field) == 1}
+            assert set(alarm_fields_from_bits(row.alarm_bits)) == fired
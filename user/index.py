@@ -1,5 +1,6 @@
 import sqlite3
 import os
+from schema.sqlite import sqlite_connect
 
 from user.jwt_handler import generate_token
 
@@ -198,7 +199,7 @@ def reset_password_orm(username, password, database_manager, user_model):
 # sqlite3版本
 def validate_username_exists(username,repo_abs_path):
     database_path = os.path.join(repo_abs_path, 'database','user.db')
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
     query_string = '''
         SELECT * FROM UserInfo
@@ -214,7 +215,7 @@ def validate_username_exists(username,repo_abs_path):
 
 def user_register(username, password, email, phone, repo_abs_path):
     database_path = os.path.join(repo_abs_path, 'database','user.db')
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
 
     # 创建一个带参数的SQL插入语句
@@ -243,7 +244,7 @@ def user_register(username, password, email, phone, repo_abs_path):
 
 def user_login(username, password, repo_abs_path):
     database_path = os.path.join(repo_abs_path, 'database','user.db')
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
 
     # 查询用户名是否存在
@@ -279,7 +280,7 @@ def user_login(username, password, repo_abs_path):
 
 def get_all_user(repo_abs_path):
     database_path = os.path.join(repo_abs_path, 'database','user.db')
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
 
     cursor.execute('SELECT user_name, user_type, user_email, user_phone, user_validated FROM UserInfo')
@@ -292,7 +293,7 @@ def get_all_user(repo_abs_path):
 
 def get_user_by_name(username, repo_abs_path):
     database_path = os.path.join(repo_abs_path, 'database','user.db')
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
     cursor.execute('SELECT user_name, user_type, user_email, user_phone, user_validated FROM UserInfo WHERE user_name LIKE ?', ('%' + username + '%',))
     result = cursor.fetchall()
@@ -303,7 +304,7 @@ def get_user_by_name(username, repo_abs_path):
 
 def change_user_status(username, status, repo_abs_path):
     database_path = os.path.join(repo_abs_path, 'database','user.db')
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
     ret = 1
     try:
@@ -321,7 +322,7 @@ def change_user_status(username, status, repo_abs_path):
 
 def delete_user(username, repo_abs_path):
     database_path = os.path.join(repo_abs_path, 'database','user.db')
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
     ret = 1
     try:
@@ -340,7 +341,7 @@ def delete_user(username, repo_abs_path):
 
 def edit_user(username, user_type, email, phone, repo_abs_path):
     database_path = os.path.join(repo_abs_path, 'database','user.db')
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
     ret = 1
     try:
@@ -359,7 +360,7 @@ def edit_user(username, user_type, email, phone, repo_abs_path):
 
 def reset_password(username, password, repo_abs_path):
     database_path = os.path.join(repo_abs_path, 'database','user.db')
-    conn = sqlite3.connect(database_path)
+    conn = sqlite_connect(database_path)
     cursor = conn.cursor()
     ret = 1
     try: